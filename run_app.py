@@ -5,9 +5,10 @@ Mini Microcosmos - Ana Başlatma Script
 Optimize edilmiş versiyon - Terminal: python run_app.py
 """
 
-import subprocess
 import sys
 import os
+import time
+from collections import Counter
 from pathlib import Path
 
 
@@ -50,17 +51,10 @@ def check_api_keys():
     from dotenv import load_dotenv
     load_dotenv(dotenv_path='config/.env')
 
-    # Gemini API kontrolü
-    gemini_keys = []
-    main_key = os.getenv("GEMINI_API_KEY")
-    if main_key:
-        gemini_keys.append(main_key)
+    from src.utils.key_pool import load_gemini_keys
 
-    # Çoklu API key kontrolü
-    for i in range(1, 15):
-        key = os.getenv(f"GEMINI_API_KEY_{i}")
-        if key:
-            gemini_keys.append(key)
+    # Gemini API kontrolü (GEMINI_API_KEY ve GEMINI_API_KEY_1..N)
+    gemini_keys = load_gemini_keys()
 
     if not gemini_keys:
         print("❌ GEMINI_API_KEY bulunamadı!")
@@ -76,11 +70,69 @@ def check_api_keys():
     else:
         print("⚠️ Smithery API Key yok (Web arama kapalı)")
 
+    return preflight_api_keys()
+
+
+def preflight_api_keys():
+    """
+    Tüm Gemini key'lerini eşzamanlı dene ve çalışma zamanı key havuzunu sonuçla başlat.
+    Quota'sı dolan key'ler cooldown'a, geçersiz key'ler havuz dışına alınır; böylece
+    bozuk key'ler kullanıcı isteklerinde tek tek keşfedilmez. KEY_PREFLIGHT=0 ile kapatılır.
+    """
+    if os.getenv("KEY_PREFLIGHT", "1").lower() in ("0", "false", "no"):
+        return True
+
+    from src.utils.event_loop import get_background_loop
+    from src.utils.gemini_client import KEY_INVALID, KEY_OK, get_gemini_client
+
+    print("🔑 API key'leri deneniyor...")
+    started = time.perf_counter()
+    # İstemcinin HTTP oturumu uygulamanın da kullandığı arka plan loop'unda açılır
+    health = get_background_loop().run(get_gemini_client().preflight())
+    counts = Counter(health.values())
+
+    print(f"🔑 {len(health)} key {time.perf_counter() - started:.1f} sn'de denendi: "
+          f"✅ {counts['ok']} çalışıyor | ⏳ {counts['quota']} quota dolu | "
+          f"❌ {counts['invalid']} geçersiz | ⚠️ {counts['error']} ulaşılamadı")
+    invalid = [label for label, status in health.items() if status == KEY_INVALID]
+    if invalid:
+        print(f"💡 Geçersiz key'ler: {', '.join(invalid)}")
+
+    if counts[KEY_INVALID] == len(health):
+        print("❌ Çalışan Gemini API key'i yok!")
+        return False
+    if not counts[KEY_OK]:
+        print("⚠️ Şu anda yanıt veren key yok; quota'lar açıldıkça kullanılacak")
     return True
 
 
+def launch_streamlit():
+    """
+    Streamlit'i aynı process'te başlat; böylece arka planda yapılan ısınma
+    (importlar, key havuzu, persona promptları, MCP bağlantısı) uygulama tarafından kullanılır.
+    """
+    from src.utils.warmup import start_warmup
+
+    start_warmup()
+
+    from streamlit.web import cli as stcli
+
+    sys.argv = [
+        "streamlit", "run",
+        "src/ui/app.py",
+        "--server.port=8501",
+        "--server.headless=false",
+        "--server.enableCORS=false",
+        "--server.enableXsrfProtection=false"
+    ]
+    stcli.main()
+
+
 def main():
     """Ana fonksiyon"""
+    # Isınma raporundaki "ilk cevaba kadar geçen süre" bu andan ölçülür
+    os.environ.setdefault("MICROCOSMOS_STARTED_AT", str(time.time()))
+
     print("🎭 Mini Microcosmos - AI Persona Simulator")
     print("=" * 50)
     print("🧠 Sequential Thinking mimarisi ile güvenli persona simülasyonu")
@@ -108,15 +160,7 @@ def main():
     print("-" * 50)
 
     try:
-        # Optimize edilmiş path ile başlat
-        subprocess.run([
-            sys.executable, "-m", "streamlit", "run",
-            "src/ui/app.py",
-            "--server.port=8501",
-            "--server.headless=false",
-            "--server.enableCORS=false",
-            "--server.enableXsrfProtection=false"
-        ])
+        launch_streamlit()
     except KeyboardInterrupt:
         print("\n\n👋 Uygulama güvenli şekilde kapatıldı.")
         print("🎭 Mini Microcosmos'u kullandığınız için teşekkürler!")
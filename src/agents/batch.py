@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Toplu Anket Modu
+Soru dosyası × persona seti, key havuzu hız limitleri içinde eşzamanlı çalıştırılır.
+Sonuçlar JSONL olarak akıtılır; çıktı dosyası aynı zamanda checkpoint'tir.
+Devamda yalnızca başarılı işler atlanır; hatalı işler yeniden denenir ve yeni
+kayıt "attempt" alanı artırılarak eklenir. Bir job_id için geçerli sonuç,
+attempt'i en yüksek (dosyadaki son) kayıttır; bkz. load_checkpoint.
+
+Kullanım:
+    python -m src.agents.batch --questions sorular.txt --personas all --output sonuclar.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from src.utils.gemini_client import DEFAULT_MODEL, GeminiClient
+from src.utils.key_pool import STORE_FLUSH_TIMEOUT_SECONDS, KeyPool, QuotaExhaustedError
+from src.utils.key_store import open_key_store
+from src.utils.personas import build_system_prompt, list_personas, load_persona
+
+# Kaç kayıtta bir çıktı dosyası diske zorla yazılsın (fsync)
+FSYNC_EVERY = 25
+
+
+def load_questions(path):
+    """
+    Soru dosyasını oku.
+    .jsonl: her satır {"id": ..., "question": ...}
+    diğer: her boş olmayan satır bir soru (id = satır numarası)
+    """
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+
+            if path.endswith('.jsonl'):
+                item = json.loads(line)
+                questions.append({
+                    "id": str(item.get("id", line_no)),
+                    "question": item["question"]
+                })
+            else:
+                questions.append({"id": str(line_no), "question": line})
+
+    return questions
+
+
+def load_checkpoint(output_path):
+    """
+    Checkpoint'teki her job_id için geçerli (en son denemeye ait) kaydı oku.
+    attempt alanı olmayan eski kayıtlar ilk deneme sayılır.
+    Returns:
+        {job_id: kayıt}
+    """
+    latest = {}
+    if not os.path.exists(output_path):
+        return latest
+
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Kesintide yarım kalmış son satır
+                continue
+            job_id = record.get("job_id")
+            if job_id is None:
+                continue
+            previous = latest.get(job_id)
+            if previous is None or record.get("attempt", 1) >= previous.get("attempt", 1):
+                latest[job_id] = record
+
+    return latest
+
+
+def load_completed(output_path):
+    """Daha önce başarıyla tamamlanan job_id'leri checkpoint'ten oku"""
+    return {job_id for job_id, record in load_checkpoint(output_path).items() if record.get("status") == "ok"}
+
+
+def build_answer_prompt(persona, question, current_date):
+    """Tek çağrılık persona cevap promptu"""
+    return f"""{build_system_prompt(persona)}
+
+BUGÜNÜN TARİHİ: {current_date}
+
+Kullanıcı: "{question}"
+
+Karakterine uygun, detaylı cevap ver:"""
+
+
+class BatchSurvey:
+    """Sorular × persona'lar anketini eşzamanlı çalıştıran yürütücü"""
+
+    def __init__(self, questions, persona_names, output_path, client: GeminiClient, concurrency=None):
+        self.questions = questions
+        self.persona_names = persona_names
+        self.output_path = output_path
+        self.client = client
+        self.concurrency = concurrency or min(32, len(client.key_pool) * 2)
+
+        self.personas = {name: load_persona(name, strict=True) for name in persona_names}
+        self.current_date = datetime.now().strftime("%d %B %Y, %A")
+
+        self.stats = {"ok": 0, "error": 0, "skipped": 0}
+        self._written = 0
+
+    def _jobs(self, checkpoint):
+        for question in self.questions:
+            for persona_name in self.persona_names:
+                job_id = f"{question['id']}:{persona_name}"
+                previous = checkpoint.get(job_id)
+                if previous is not None and previous.get("status") == "ok":
+                    self.stats["skipped"] += 1
+                    continue
+                attempt = 1 if previous is None else previous.get("attempt", 1) + 1
+                yield job_id, question, persona_name, attempt
+
+    def _write(self, out, record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        out.flush()
+        self._written += 1
+        if self._written % FSYNC_EVERY == 0:
+            os.fsync(out.fileno())
+
+    async def _run_job(self, job_id, question, persona_name, attempt=1):
+        persona = self.personas[persona_name]
+        prompt = build_answer_prompt(persona, question["question"], self.current_date)
+
+        record = {
+            "job_id": job_id,
+            "attempt": attempt,
+            "question_id": question["id"],
+            "question": question["question"],
+            "persona": persona_name,
+            "persona_name": persona["name"],
+        }
+
+        started = time.monotonic()
+        try:
+            record["answer"] = await self.client.generate(prompt, stage="BATCH")
+            record["status"] = "ok"
+        except QuotaExhaustedError:
+            # Tüm key'ler tükendi: anket durur, bu iş checkpoint'e yazılmaz ve devamda yeniden denenir
+            raise
+        except Exception as e:
+            record["answer"] = ""
+            record["status"] = "error"
+            record["error"] = str(e)[:300]
+
+        record["latency_ms"] = int((time.monotonic() - started) * 1000)
+        record["timestamp"] = datetime.now().isoformat(timespec="seconds")
+        return record
+
+    async def run(self):
+        """Anketi çalıştır; kesintiden sonra aynı çıktı dosyasıyla devam eder"""
+        checkpoint = load_checkpoint(self.output_path)
+        queue = asyncio.Queue()
+        for job in self._jobs(checkpoint):
+            queue.put_nowait(job)
+
+        total = queue.qsize()
+        print(f"📋 {len(self.questions)} soru × {len(self.persona_names)} persona")
+        print(f"⏭️ Checkpoint'ten atlanan: {self.stats['skipped']} | Kalan: {total}")
+        print(f"⚙️ Eşzamanlılık: {self.concurrency} | "
+              f"Key: {len(self.client.key_pool)} × {self.client.key_pool.rpm_per_key} RPM")
+
+        if total == 0:
+            print("✅ Yapılacak iş kalmadı")
+            return self.stats
+
+        started = time.monotonic()
+
+        with open(self.output_path, 'a', encoding='utf-8') as out:
+            async def worker():
+                while True:
+                    try:
+                        job = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+
+                    record = await self._run_job(*job)
+                    self._write(out, record)
+                    self.stats[record["status"]] += 1
+
+                    done = self.stats["ok"] + self.stats["error"]
+                    if done % 10 == 0 or done == total:
+                        elapsed = time.monotonic() - started
+                        rate = done / elapsed if elapsed else 0
+                        print(f"📊 {done}/{total} | ✅ {self.stats['ok']} ❌ {self.stats['error']} | "
+                              f"{rate:.1f} cevap/s")
+
+                    # Tüm key'ler geçersizse kalan işleri boşuna deneme
+                    pool_stats = self.client.key_pool.stats()
+                    if record["status"] == "error" and pool_stats["invalid"] == pool_stats["total"]:
+                        return
+
+            workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                # Bir worker hata verdiyse diğerleri dosya kapanmadan durdurulur
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                out.flush()
+                os.fsync(out.fileno())
+
+        return self.stats
+
+
+def parse_personas(value):
+    """'all' veya virgülle ayrılmış persona listesi"""
+    available = list_personas()
+    if value == "all":
+        return available
+
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"Bilinmeyen persona(lar): {', '.join(unknown)} (mevcut: {', '.join(available)})"
+        )
+    return names
+
+
+async def run_batch(args):
+    questions = load_questions(args.questions)
+    if not questions:
+        print(f"❌ {args.questions} içinde soru bulunamadı")
+        return 1
+
+    # Diğer process'lerde tükenen/geçersiz key'ler burada da atlanır
+    store = open_key_store()
+    try:
+        pool = KeyPool(rpm_per_key=args.rpm, store=store)
+    except ValueError as e:
+        print(e)
+        if store is not None:
+            store.close()
+        return 1
+
+    client = GeminiClient(key_pool=pool, model=args.model)
+    survey = BatchSurvey(questions, args.personas, args.output, client, concurrency=args.concurrency)
+
+    try:
+        stats = await survey.run()
+    except QuotaExhaustedError as e:
+        print(f"❌ Key havuzu tükendi: {e}")
+        print("💡 Tamamlanan kayıtlar checkpoint'te; aynı komutla kaldığı yerden devam edebilirsiniz")
+        return 1
+    finally:
+        await client.close()
+        if store is not None:
+            pool.flush(STORE_FLUSH_TIMEOUT_SECONDS)
+            store.close()
+
+    print(f"🏁 Bitti: ✅ {stats['ok']} ❌ {stats['error']} ⏭️ {stats['skipped']}")
+    if stats["error"]:
+        print("💡 Hatalı kayıtlar aynı komutla tekrar çalıştırıldığında yeniden denenir")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mini Microcosmos - toplu anket modu")
+    parser.add_argument("--questions", required=True, help="Soru dosyası (.txt satır başına bir soru veya .jsonl)")
+    parser.add_argument("--personas", type=parse_personas, default="all",
+                        help="'all' veya virgülle ayrılmış persona adları (ör. elif,kenan_bey)")
+    parser.add_argument("--output", required=True, help="JSONL çıktı/checkpoint dosyası")
+    parser.add_argument("--concurrency", type=int, default=None, help="Eşzamanlı istek sayısı")
+    parser.add_argument("--rpm", type=int, default=None, help="Key başına dakikalık istek limiti")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help=f"Gemini model adı (varsayılan: {DEFAULT_MODEL})")
+    args = parser.parse_args(argv)
+
+    if isinstance(args.personas, str):
+        args.personas = parse_personas(args.personas)
+
+    load_dotenv(dotenv_path='config/.env')
+
+    try:
+        return asyncio.run(run_batch(args))
+    except KeyboardInterrupt:
+        print("\n⏸️ Kesildi. Aynı komutla kaldığı yerden devam edebilirsiniz.")
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,20 +5,101 @@ Mini Microcosmos - AI Persona Simulator
 Sequential Thinking mimarisi ile güvenli ve yapılandırılmış persona simülasyonu
 """
 
-import json
 import os
+import argparse
 import asyncio
+import contextlib
+import contextvars
+import hashlib
+import sqlite3
 import sys
+import time
 import locale
 from datetime import datetime
 from dotenv import load_dotenv
-import google.generativeai as genai
-from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
+
+# Path setup
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from src.agents.search_plan import (MIN_SEARCHES, CoverageTracker, build_search_plan, classify_question,
+                                    plan_stats)
+from src.agents.tiers import TIER_DEEP, TIER_FAST, TIER_STANDARD, TIERS, record_tier, resolve_tier, tier_deadline
+from src.utils.deadline import (DeadlineExceeded, deadline_scope, has_budget, remaining, run_within,
+                                stage_timeout)
+from src.utils.circuit_breaker import CircuitOpenError
+from src.utils.exa_search import get_search_client
+from src.utils.gemini_client import QUOTA_FALLBACK_TEXT, GeminiError, get_gemini_client
+from src.utils.key_pool import QuotaExhaustedError
+from src.utils.news_corpus import get_news_corpus
+from src.utils.news_prefetch import get_news_prefetcher, prefetch_summary_enabled
+from src.utils.personas import cached_system_prompt, fallback_persona, list_personas, load_persona
+from src.utils.profiling import profile_request
+from src.utils.singleflight import SingleFlight, normalize_query
+from src.utils.token_usage import SESSION_DEGRADED, SESSION_EXHAUSTED, usage_scope
 
 # Environment değişkenlerini yükle
 load_dotenv()
 
+# Sohbet başına olay dinleyicisi (aşama ilerlemesi, token akışı).
+# Agent'lar istekler arasında paylaşıldığından istek kapsamlı durum self'e yazılmaz.
+_chat_listener = contextvars.ContextVar("chat_listener", default=None)
+
+
+@contextlib.contextmanager
+def chat_listener(listener):
+    """Bu bağlamda (ve içinden başlatılan task'larda) sohbet olaylarını listener'a yönlendir"""
+    token = _chat_listener.set(listener)
+    try:
+        yield
+    finally:
+        _chat_listener.reset(token)
+
+
+# Süre bütçesi: final cevap için ayrılan pay ve aşamaların çalışması için gereken en az süre (saniye)
+FINAL_ANSWER_RESERVE = 10.0
+FINAL_ANSWER_MIN_SECONDS = 5.0
+SEARCH_MIN_BUDGET = 20.0
+SUMMARY_MIN_BUDGET = 6.0
+
+# Güncel bilgi gerektiren sorular (deep: web araması, standard: arşivden haber)
+SEARCH_TRIGGERS = [
+    "son", "güncel", "yeni", "bugün", "haber", "gündem", "olay",
+    "ne oluyor", "neler oldu", "ekonomi", "politika", "seçim",
+    "2024", "2025"
+]
+
+# standard katmanında arşivden alınan haber sayısı ve haber başına metin
+CACHED_NEWS_ARTICLES = 5
+CACHED_NEWS_CHARS = 300
+
+# Aynı anahtar kelimelerle eşzamanlı gelen aramalar + haber özeti tek seferde yapılır
+_news_flight = SingleFlight("haber araması")
+
+# Aynı ham arama sonuçları için eşzamanlı özetleme çağrıları birleştirilir
+_summary_flight = SingleFlight("haber özeti")
+
+
+def coalescing_stats(search_client=None):
+    """Singleflight birleştirme sayaçları (lider / paylaşılan çağrı sayısı)"""
+    search_client = search_client or get_search_client()
+    return {
+        "news": dict(_news_flight.stats),
+        "summary": dict(_summary_flight.stats),
+        "exa": dict(search_client.flight_stats),
+    }
+
+
+def search_plan_stats():
+    """Uyarlanabilir arama planı sayaçları (yapılan/atlanan arama, tasarruf edilen bayt)"""
+    return plan_stats.snapshot()
+
+
+async def emit_chat_event(event: str, data: dict):
+    """Aktif sohbetin dinleyicisine olay gönder (dinleyici yoksa sessizce geç)"""
+    listener = _chat_listener.get()
+    if listener is not None:
+        await listener(event, data)
+
 
 # Encoding yapılandırması
 def setup_encoding():
@@ -44,73 +125,48 @@ def setup_encoding():
 
 
 class PersonaAgent:
-    def __init__(self, persona_name="tugrul_bey"):
+    def __init__(self, persona_name="tugrul_bey", client=None, search_client=None):
         """
         Persona tabanlı AI agent
         Args:
-            persona_name: personas/ klasöründeki JSON dosya adı
+            persona_name: src/personas/ klasöründeki JSON dosya adı
+            client: Paylaşılan GeminiClient (varsayılan: process geneli istemci)
+            search_client: Paylaşılan ExaSearchClient (varsayılan: process geneli istemci)
         """
         setup_encoding()
 
-        # API keys'leri environment'tan al
-        self.api_keys = self._load_api_keys()
-        self.current_api_index = 0
+        # Paylaşılan key havuzu üzerinden çalışan Gemini istemcisi
+        self.client = client or get_gemini_client()
+        self.api_keys = self.client.key_pool.keys
 
-        # Smithery API yapılandırması
-        self.smithery_api_key = os.getenv("SMITHERY_API_KEY")
-        self.smithery_profile = os.getenv("SMITHERY_PROFILE")
+        # Smithery API yapılandırması (MCP oturumu agent'lar arasında paylaşılır)
+        self.search_client = search_client or get_search_client()
+        self.smithery_api_key = self.search_client.api_key
+        self.smithery_profile = self.search_client.profile
 
         if not self.smithery_api_key or not self.smithery_profile:
             print("⚠️ SMITHERY API bilgileri .env dosyasında bulunamadı!")
             print("💡 Web arama işlevselliği çalışmayabilir")
 
-        # Gemini modelini başlat
-        self._initialize_model()
-
         # Persona'yı yükle
+        self.persona_name = persona_name
         self.persona = self._load_persona(persona_name)
 
-        # Konuşma geçmişi
-        self.conversation_history = []
-
-    def _load_api_keys(self):
-        """Environment'tan API keys'leri güvenli şekilde yükle"""
-        api_keys = []
-
-        # Tek key varsa
-        single_key = os.getenv("GEMINI_API_KEY")
-        if single_key:
-            api_keys.append(single_key)
-
-        # Çoklu key varsa (GEMINI_API_KEY_1, GEMINI_API_KEY_2, ...)
-        i = 1
-        while True:
-            key = os.getenv(f"GEMINI_API_KEY_{i}")
-            if key:
-                api_keys.append(key)
-                i += 1
-            else:
-                break
-
-        if not api_keys:
-            raise ValueError("❌ Hiçbir GEMINI API key bulunamadı! .env dosyasını kontrol edin.")
-
-        return api_keys
+        # Statik sistem promptu bir kez kaydedilir; final istekler yalnızca tutamaç + değişken kısmı taşır
+        self.prompt_prefix = self.client.prompt_cache.register(f"persona:{persona_name}",
+                                                               self.create_system_prompt())
 
-    def _initialize_model(self):
-        """Gemini modelini başlat"""
-        genai.configure(api_key=self.api_keys[self.current_api_index])
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        # Konuşma geçmişi (chat'e history verilmezse kullanılır)
+        self.conversation_history = []
 
     def _load_persona(self, persona_name):
         """Persona JSON dosyasını yükle"""
         try:
-            with open(f'personas/{persona_name}.json', 'r', encoding='utf-8') as f:
-                persona = json.load(f)
-                print(f"✅ {persona['name']} persona'sı yüklendi")
-                return persona
+            persona = load_persona(persona_name, strict=True)
+            print(f"✅ {persona['name']} persona'sı yüklendi")
+            return persona
         except FileNotFoundError:
-            print(f"❌ personas/{persona_name}.json dosyası bulunamadı!")
+            print(f"❌ src/personas/{persona_name}.json dosyası bulunamadı!")
             return self._get_fallback_persona(persona_name)
         except Exception as e:
             print(f"⚠️ Persona yükleme hatası: {e}")
@@ -118,70 +174,75 @@ class PersonaAgent:
 
     def _get_fallback_persona(self, persona_name):
         """Fallback persona"""
-        return {
-            "name": persona_name.replace('_', ' ').title(),
-            "bio": ["Genel bir persona"],
-            "style": {"chat": ["Normal konuşur"]},
-            "lore": [""],
-            "knowledge": [""]
-        }
+        return fallback_persona(persona_name)
 
     def switch_api_key(self):
-        """API key'i değiştir"""
-        self.current_api_index = (self.current_api_index + 1) % len(self.api_keys)
-        self._initialize_model()
-        print(f"🔄 API KEY DEĞİŞTİRİLDİ: #{self.current_api_index + 1}")
-
-    def try_with_api_rotation(self, prompt, max_retries=None):
-        """API rotasyonu ile güvenli deneme"""
-        if max_retries is None:
-            max_retries = len(self.api_keys)
-
-        for attempt in range(max_retries):
-            try:
-                response = self.model.generate_content(prompt)
-                return response.text.strip()
-            except Exception as e:
-                if "429" in str(e) or "quota" in str(e).lower():
-                    print(f"❌ API #{self.current_api_index + 1} quota aşıldı")
-                    if attempt < max_retries - 1:
-                        self.switch_api_key()
-                        continue
-                else:
-                    raise e
+        """Son kullanılan API key'i dinlendir; sonraki istek başka bir key ile yapılır"""
+        key = self.client.last_key
+        if key is None:
+            print("🔄 Henüz kullanılan key yok, havuz en az kullanılan key'i seçecek")
+            return
+        self.client.key_pool.cool_down(key)
+        print(f"🔄 API KEY DEĞİŞTİRİLDİ: {self.client.key_pool.label(key)} dinlendiriliyor")
+
+    async def try_with_api_rotation(self, prompt, max_retries=None, reserve=FINAL_ANSWER_RESERVE, timeout=None,
+                                    stage=None, prefix=None):
+        """
+        API rotasyonu ile güvenli deneme
+        Args:
+            reserve: Sohbet süre bütçesinden sonraki aşamalar için ayrılacak pay
+            timeout: Verilirse reserve yerine doğrudan bu süre kullanılır
+            stage: Yönlendirme tablosu ve token muhasebesinde kullanılacak aşama adı
+            prefix: Kayıtlı statik ön ek (persona sistem promptu); prompt yalnızca değişken kısımdır
+        Raises:
+            DeadlineExceeded: Süre bütçesi yetmiyorsa veya istek zamanında bitmezse
+        """
+        if timeout is None:
+            timeout = stage_timeout(reserve)
+        try:
+            return await run_within(
+                self.client.generate(prompt, max_retries=max_retries, acquire_timeout=timeout, stage=stage,
+                                     prefix=prefix), timeout
+            )
+        except QuotaExhaustedError as e:
+            print(f"❌ Tüm API denemeleri başarısız: {e}")
+            return QUOTA_FALLBACK_TEXT
 
-        return "Sistem yoğunluğu nedeniyle geçici olarak hizmet veremiyorum. Lütfen biraz sonra tekrar deneyin."
+    async def stream_with_api_rotation(self, prompt, timeout=None, stage=None, prefix=None):
+        """
+        Token akışlı üretim; her parça sohbet dinleyicisine 'token' olayı olarak gider.
+        Süre dolarsa o ana kadar gelen kısmi cevap döner.
+        """
+        chunks = []
+        try:
+            async with asyncio.timeout(timeout):
+                async for chunk in self.client.stream(prompt, stage=stage, prefix=prefix):
+                    chunks.append(chunk)
+                    await emit_chat_event("token", {"persona": self.persona_name, "text": chunk})
+        except QuotaExhaustedError as e:
+            print(f"❌ Tüm API denemeleri başarısız: {e}")
+            if not chunks:
+                await emit_chat_event("token", {"persona": self.persona_name, "text": QUOTA_FALLBACK_TEXT})
+                return QUOTA_FALLBACK_TEXT
+        except TimeoutError:
+            print(f"⏱️ CEVAP AKIŞI SÜRE AŞIMI: {len(chunks)} parça alındı")
+            if not chunks:
+                raise DeadlineExceeded("cevap akışı başlamadan süre doldu")
+        except GeminiError as e:
+            # Akış başladıktan sonraki hata (quota, geçersiz key): istemciye gitmiş kısmi cevap korunur
+            if not chunks:
+                raise
+            print(f"⚠️ CEVAP AKIŞI YARIDA KESİLDİ ({e}): {len(chunks)} parça alındı")
+        return "".join(chunks).strip()
 
     def create_system_prompt(self):
         """Persona'dan sistem promptu oluştur"""
-        bio_text = "\n- ".join(self.persona.get("bio", ["Bilinmiyor"]))
-        style_text = "\n- ".join(self.persona.get("style", {}).get("chat", ["Normal konuşur"]))
-        lore_text = "\n- ".join(self.persona.get("lore", [""])[:15])
-        knowledge_text = "\n- ".join(self.persona.get("knowledge", [""])[:8])
-
-        return f"""Sen {self.persona["name"]}'sin. Aşağıdaki kimliğin:
-
-BİOGRAFİ:
-- {bio_text}
-
-KONUŞMA TARZI:
-- {style_text}
+        return cached_system_prompt(self.persona_name)
 
-HAYATA BAKIŞ:
-- {lore_text}
-
-BİLGİN:
-- {knowledge_text}
-
-ÖNEMLİ KURALLAR:
-- Karakterine uygun davran
-- Güncel olayları web aramalarından öğreniyorsun
-- Kendi görüşlerini belirt ama saygılı ol
-- Detaylı bilgi ver ama çok uzun olma"""
-
-    def sequential_think(self, prompt: str, stage_name: str):
+    async def sequential_think(self, prompt: str, stage_name: str):
         """Sequential Thinking adımı"""
         print(f"🧠 {stage_name.upper()} DÜŞÜNÜLÜYOR...")
+        await emit_chat_event("stage", {"persona": self.persona_name, "stage": stage_name})
 
         thinking_prompt = f"""Sen {self.persona['name']}'sin. Aşağıdaki konuyu adım adım düşün:
 
@@ -195,7 +256,7 @@ DÜŞÜNME SÜRECİN:
 Kısa ve net düşünceni söyle (2-3 cümle):"""
 
         try:
-            result = self.try_with_api_rotation(thinking_prompt)
+            result = await self.try_with_api_rotation(thinking_prompt, stage=stage_name)
             print(f"💭 {stage_name.upper()} SONUCU: {result}")
             return result
         except Exception as e:
@@ -224,8 +285,19 @@ Kısa ve net düşünceni söyle (2-3 cümle):"""
             print(f"📅 FALLBACK TARİH: {fallback_date}")
             return fallback_date
 
-    def summarize_comprehensive_news(self, raw_search_results: str, search_count: int, sites_count: int):
+    async def summarize_comprehensive_news(self, raw_search_results: str, search_count: int, sites_count: int):
         """Kapsamlı haber özetleme - çoklu kaynak analizi"""
+        digest = hashlib.sha1(raw_search_results[:20000].encode("utf-8")).hexdigest()
+        return await _summary_flight.do(
+            ("summary", digest, search_count, sites_count),
+            lambda: self._summarize_comprehensive_news(raw_search_results, search_count, sites_count)
+        )
+
+    async def _summarize_comprehensive_news(self, raw_search_results: str, search_count: int, sites_count: int):
+        if not has_budget(FINAL_ANSWER_RESERVE + SUMMARY_MIN_BUDGET):
+            print(f"⏱️ SÜRE KISITLI: haber özeti yerine ham veri özeti kullanılıyor ({remaining():.1f} sn)")
+            return self._create_fallback_summary(raw_search_results, search_count, sites_count)
+
         print(f"📰 KAPSAMLI HABER ANALİZİ: {search_count} arama, {sites_count} site")
 
         summary_prompt = f"""Sen profesyonel bir HABER ANALİZ UZMANISSIN. Görevin:
@@ -264,7 +336,7 @@ DETAYLI ANALİZ GEREKSİNİMLERİ:
 Kapsamlı ve detaylı analiz yap:"""
 
         try:
-            summary = self.try_with_api_rotation(summary_prompt)
+            summary = await self.try_with_api_rotation(summary_prompt, stage="HABER_OZETI")
             if not summary or "quota" in summary.lower():
                 return self._create_fallback_summary(raw_search_results, search_count, sites_count)
 
@@ -290,8 +362,181 @@ Kapsamlı ve detaylı analiz yap:"""
 - Sistem yoğunluğu nedeniyle detaylı analiz yapılamadı
 - Ham veriler mevcut, manuel inceleme gerekebilir"""
 
-    async def search_web_detailed(self, keywords: str):
-        """Kapsamlı web araması - 10+ site taraması"""
+    async def _collect_news(self, keywords: str, categories=()):
+        """
+        Aramaları yap ve kapsamlı haber özetini çıkar (persona'dan bağımsız kısım).
+        Eşzamanlı aynı anahtar kelimeli sohbetler bu işi singleflight ile paylaşır.
+        Returns:
+            {"search_result", "search_count", "sites_found", "news_summary", "plan"} veya sonuç yoksa None
+        """
+        all_results = []
+
+        # Sabit gündem aramaları arka planda ön belleğe alınıyorsa sıcak görüntüyü kullan
+        snapshot = get_news_prefetcher().snapshot()
+
+        # Soru kategorisine göre uyarlanmış arama planı (orijinali 8 sabit arama)
+        search_queries = build_search_plan(keywords, categories, include_general=not snapshot)
+        baseline_count = 4 if snapshot else 8
+        category = categories[0] if categories else "genel"
+
+        if snapshot:
+            all_results.extend(text for _, text in snapshot["results"])
+            print(f"🗞️ GÜNDEM ÖN BELLEĞİNDEN {len(snapshot['results'])} ARAMA ALINDI")
+
+        print(f"🎯 KATEGORİ: {category} | PLANLANAN ARAMA: {len(search_queries)}")
+
+        coverage = CoverageTracker()
+        keyword_results = []
+        executed = 0
+        local_hits = 0
+        fetched_bytes = 0
+
+        # Daha önce çekilmiş haberlerin yerel arşivi; yeterli ve taze sonuç varsa Exa'ya gidilmez
+        corpus = get_news_corpus()
+
+        for i, search_config in enumerate(search_queries, 1):
+            if executed and not has_budget(SEARCH_MIN_BUDGET):
+                print(f"⏱️ SÜRE KISITLI: kalan {len(search_queries) - i + 1} arama atlandı")
+                break
+
+            if executed + local_hits >= MIN_SEARCHES and coverage.sufficient():
+                print(f"✋ KAPSAM YETERLİ: {len(coverage.sources)} kaynak, {len(coverage.articles)} haber "
+                      f"- kalan {len(search_queries) - i + 1} arama atlandı")
+                break
+
+            try:
+                print(f"🔍 {i}. {search_config['label']}: '{search_config['query']}'")
+
+                # Arama parametreleri
+                search_params = {
+                    "query": search_config["query"],
+                    "num_results": search_config["num_results"]
+                }
+
+                # Tarih filtresi ekle (sadece spesifik aramalar için)
+                explicit_range = "2023" in keywords.lower() or "2024" in keywords.lower()
+                if explicit_range:
+                    search_params["start_published_date"] = "2023-01-01"
+                    search_params["end_published_date"] = "2025-12-31"
+                elif search_config["recent"]:
+                    search_params["start_published_date"] = "2024-01-01"
+                    search_params["end_published_date"] = "2025-12-31"
+
+                result_text = None
+                # Belirli bir yıl aralığı istenen aramalar arşivin tazelik penceresine uymaz; Exa'ya gider
+                if corpus is not None and not explicit_range:
+                    result_text = corpus.lookup(search_config["query"], search_config["num_results"],
+                                                exclude_urls=coverage.articles)
+                    if result_text:
+                        local_hits += 1
+                        print(f"🗄️ {i}. ARŞİVDEN: {search_config['num_results']} haber")
+
+                from_search = not result_text
+                if from_search:
+                    executed += 1
+                    result_text = await self.search_client.call(search_params)
+
+                if result_text:
+                    all_results.append(result_text)
+                    if not search_config["general"]:
+                        keyword_results.append(result_text)
+                    coverage.add(result_text)
+                    # Ortalama yalnızca Exa aramalarına bölünür; arşiv sonuçları eklenmez
+                    if from_search:
+                        fetched_bytes += len(result_text.encode("utf-8"))
+                    print(f"✅ {i}. ARAMA: {len(result_text)} karakter")
+                else:
+                    print(f"⚠️ {i}. ARAMA: Sonuç bulunamadı")
+
+                # API rate limiting için kısa bekleyiş
+                await asyncio.sleep(0.2)
+
+            except CircuitOpenError:
+                print(f"🔴 WEB ARAMASI DEVRE DIŞI: kalan {len(search_queries) - i + 1} arama atlandı")
+                break
+
+            except Exception as e:
+                print(f"❌ {i}. ARAMA HATASI: {e}")
+                continue
+
+        # Tasarruf: orijinal plana göre yapılmayan aramalar, ortalama sonuç boyutuyla tahmini veri
+        searches_saved = max(0, baseline_count - executed)
+        bytes_saved = searches_saved * (fetched_bytes // executed) if executed else 0
+        plan_stats.record(category, executed, searches_saved, bytes_saved)
+        plan = {
+            "category": category,
+            "executed": executed,
+            "local_hits": local_hits,
+            "searches_saved": searches_saved,
+            "bytes_saved": bytes_saved,
+            "sources": len(coverage.sources),
+            "articles": len(coverage.articles),
+        }
+        print(f"💾 ARAMA TASARRUFU: {searches_saved} arama, ~{bytes_saved} bayt")
+
+        # Sonuçları birleştir
+        search_result = "\n\n--- ARAMA SONUCU AYIRICI ---\n\n".join(all_results)
+
+        if search_result:
+            print(f"📊 TOPLAM ARAMA SONUCU: {len(search_result)} karakter")
+            print(f"📊 BAŞARILI ARAMA SAYISI: {len(all_results)}")
+
+            # Kapsamlı site analizi
+            turkish_domains = [
+                "trthaber.com", "hurriyet.com.tr", "milliyet.com.tr",
+                "sabah.com.tr", "cnnturk.com", "ntv.com.tr",
+                "haberturk.com", "sozcu.com.tr", "ensonhaber.com",
+                "cumhuriyet.com.tr", "yenisakaryahaber.com.tr", "gazetevatan.com",
+                "aksam.com.tr", "star.com.tr", "yenisafak.com",
+                "takvim.com.tr", "posta.com.tr", "turkiyegazetesi.com.tr",
+                "dunya.com", "aa.com.tr", "bbc.com/turkce"
+            ]
+
+            sites_found = [domain for domain in turkish_domains
+                           if domain in search_result.lower()]
+
+            # Site çeşitliliği analizi
+            print(f"🌐 TARANAN SİTE SAYISI: {len(sites_found)}")
+            if sites_found:
+                print(f"🔗 BULUNAN SİTELER: {', '.join(sites_found)}")
+            else:
+                print("🔗 BULUNAN SİTELER: Site analizi yapılamadı")
+
+            # İçerik analizi için sample göster
+            print(f"📄 İÇERİK ÖRNEĞİ (İLK 2000 KARAKTER):")
+            print(f"{search_result[:2000]}...")
+            print("=" * 80)
+
+            # Kapsamlı haber özetleme
+            print("📰 KAPSAMLI HABER ÖZETLEMESİ BAŞLANIYOR...")
+            if snapshot and snapshot["summary"]:
+                # Genel gündem özeti hazır; yalnızca anahtar kelimeye bağlı sonuçlar özetlenir
+                news_summary = snapshot["summary"]
+                if keyword_results:
+                    keyword_text = "\n\n--- ARAMA SONUCU AYIRICI ---\n\n".join(keyword_results)
+                    keyword_summary = await self.summarize_comprehensive_news(keyword_text, len(keyword_results),
+                                                                              len(sites_found))
+                    news_summary = f"{keyword_summary}\n\n=== GENEL GÜNDEM ===\n{news_summary}"
+            else:
+                news_summary = await self.summarize_comprehensive_news(search_result, len(all_results),
+                                                                       len(sites_found))
+
+            return {
+                "search_result": search_result,
+                "search_count": len(all_results),
+                "sites_found": sites_found,
+                "news_summary": news_summary,
+                "plan": plan
+            }
+
+        return None
+
+    async def search_web_detailed(self, keywords: str, question: str = ""):
+        """
+        Kapsamlı web araması - 10+ site taraması
+        Args:
+            question: Kullanıcının sorusu; arama planının kategorisini belirlemekte kullanılır
+        """
         if not self.smithery_api_key or not self.smithery_profile:
             print("❌ Web arama yapılandırması eksik")
             return {
@@ -303,127 +548,42 @@ Kapsamlı ve detaylı analiz yap:"""
                 "search_count": 0
             }
 
+        if not self.search_client.available:
+            print("🔴 WEB ARAMASI DEVRE DIŞI: aramasız cevap verilecek")
+            return {
+                "raw_results": "",
+                "news_summary": "",
+                "analysis": "",
+                "current_date": self.get_current_date(),
+                "sites_count": 0,
+                "search_count": 0
+            }
+
         print(f"🔍 KAPSAMLI WEB ARAMASI BAŞLANIYOR: '{keywords}'")
         current_date = self.get_current_date()
 
-        exa_url = f"https://server.smithery.ai/exa/mcp?api_key={self.smithery_api_key}&profile={self.smithery_profile}"
+        await emit_chat_event("stage", {"persona": self.persona_name, "stage": "WEB_ARAMASI"})
 
         try:
-            async with streamablehttp_client(exa_url) as (read_stream, write_stream, _):
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-
-                    all_results = []
-
-                    # Çoklu arama stratejisi - 8 farklı arama
-                    search_queries = [
-                        # 1. Ana arama
-                        {"query": keywords, "num_results": 8, "label": "ANA ARAMA"},
-
-                        # 2. Güncel Türkiye haberleri
-                        {"query": "Türkiye haberleri gündem", "num_results": 6, "label": "GÜNCEL HABERLER"},
-
-                        # 3. Ekonomi odaklı
-                        {"query": f"{keywords} ekonomi", "num_results": 5, "label": "EKONOMİ ARAMASI"},
-
-                        # 4. Politik gelişmeler
-                        {"query": f"{keywords} siyaset politik", "num_results": 5, "label": "SİYASET ARAMASI"},
-
-                        # 5. Sosyal gelişmeler
-                        {"query": f"{keywords} toplum sosyal", "num_results": 4, "label": "SOSYAL ARAMASI"},
-
-                        # 6. Son dakika haberleri
-                        {"query": "son dakika Türkiye", "num_results": 6, "label": "SON DAKİKA"},
-
-                        # 7. Özel tarih araması (eğer tarih belirtilmişse)
-                        {"query": f"Türkiye 2023 2024 2025 haber", "num_results": 5, "label": "TARİH ARAMASI"},
-
-                        # 8. Genel gündem
-                        {"query": "Türkiye gündem analiz", "num_results": 4, "label": "GÜNDEM ANALİZİ"}
-                    ]
-
-                    print(f"🎯 TOPLAM {len(search_queries)} FARKLI ARAMA YAPILACAK")
-
-                    for i, search_config in enumerate(search_queries, 1):
-                        try:
-                            print(f"🔍 {i}. {search_config['label']}: '{search_config['query']}'")
-
-                            # Arama parametreleri
-                            search_params = {
-                                "query": search_config["query"],
-                                "num_results": search_config["num_results"]
-                            }
-
-                            # Tarih filtresi ekle (sadece spesifik aramalar için)
-                            if "2023" in keywords.lower() or "2024" in keywords.lower():
-                                search_params["start_published_date"] = "2023-01-01"
-                                search_params["end_published_date"] = "2025-12-31"
-                            elif i <= 4:  # İlk 4 arama için tarih filtresi
-                                search_params["start_published_date"] = "2024-01-01"
-                                search_params["end_published_date"] = "2025-12-31"
-
-                            result = await session.call_tool("web_search_exa", search_params)
-
-                            if result.content and len(result.content) > 0:
-                                all_results.append(result.content[0].text)
-                                print(f"✅ {i}. ARAMA: {len(result.content[0].text)} karakter")
-                            else:
-                                print(f"⚠️ {i}. ARAMA: Sonuç bulunamadı")
-
-                            # API rate limiting için kısa bekleyiş
-                            await asyncio.sleep(0.2)
-
-                        except Exception as e:
-                            print(f"❌ {i}. ARAMA HATASI: {e}")
-                            continue
-
-                    # Sonuçları birleştir
-                    search_result = "\n\n--- ARAMA SONUCU AYIRICI ---\n\n".join(all_results)
-
-                    if search_result:
-                        print(f"📊 TOPLAM ARAMA SONUCU: {len(search_result)} karakter")
-                        print(f"📊 BAŞARILI ARAMA SAYISI: {len(all_results)}")
-
-                        # Kapsamlı site analizi
-                        turkish_domains = [
-                            "trthaber.com", "hurriyet.com.tr", "milliyet.com.tr",
-                            "sabah.com.tr", "cnnturk.com", "ntv.com.tr",
-                            "haberturk.com", "sozcu.com.tr", "ensonhaber.com",
-                            "cumhuriyet.com.tr", "yenisakaryahaber.com.tr", "gazetevatan.com",
-                            "aksam.com.tr", "star.com.tr", "yenisafak.com",
-                            "takvim.com.tr", "posta.com.tr", "turkiyegazetesi.com.tr",
-                            "dunya.com", "aa.com.tr", "bbc.com/turkce"
-                        ]
-
-                        sites_found = [domain for domain in turkish_domains
-                                       if domain in search_result.lower()]
-
-                        # Site çeşitliliği analizi
-                        print(f"🌐 TARANAN SİTE SAYISI: {len(sites_found)}")
-                        if sites_found:
-                            print(f"🔗 BULUNAN SİTELER: {', '.join(sites_found)}")
-                        else:
-                            print("🔗 BULUNAN SİTELER: Site analizi yapılamadı")
-
-                        # İçerik analizi için sample göster
-                        print(f"📄 İÇERİK ÖRNEĞİ (İLK 2000 KARAKTER):")
-                        print(f"{search_result[:2000]}...")
-                        print("=" * 80)
-
-                        # Kapsamlı haber özetleme
-                        print("📰 KAPSAMLI HABER ÖZETLEMESİ BAŞLANIYOR...")
-                        news_summary = self.summarize_comprehensive_news(search_result, len(all_results),
-                                                                         len(sites_found))
-
-                        # Detaylı persona analizi
-                        analysis_prompt = f"""Bu kapsamlı araştırma sonuçlarını {self.persona['name']} olarak analiz et:
+            categories = tuple(classify_question(f"{question} {keywords}"))
+            # Uçuştaki iş paylaşıldığından süre dolması yalnızca bu sohbetin beklemesini keser;
+            # başka bekleyen yoksa aramalar da iptal edilir (çekilen haberler arşivde kalır)
+            news = await run_within(
+                _news_flight.do(("news", normalize_query(keywords), categories),
+                                lambda: self._collect_news(keywords, categories)),
+                stage_timeout(FINAL_ANSWER_RESERVE)
+            )
+
+            if news:
+                # Detaylı persona analizi
+                analysis_prompt = f"""Bu kapsamlı araştırma sonuçlarını {self.persona['name']} olarak analiz et:
 
 BUGÜN: {current_date}
-TOPLAM ARAMA: {len(all_results)} farklı arama
-BULUNAN SİTE: {len(sites_found)} farklı haber sitesi
+TOPLAM ARAMA: {news["search_count"]} farklı arama
+BULUNAN SİTE: {len(news["sites_found"])} farklı haber sitesi
 
 KAPSAMLI HABER ÖZETİ:
-{news_summary[:2000]}
+{news["news_summary"][:2000]}
 
 Detaylı analiz yap (150 kelimeye kadar):
 1. En dikkat çeken gelişme nedir?
@@ -431,26 +591,27 @@ Detaylı analiz yap (150 kelimeye kadar):
 3. Bu gelişmelerin ülkeye etkisi nedir?
 4. Genel değerlendirmen ve yorumun?"""
 
-                        analysis = self.sequential_think(analysis_prompt, "DETAYLI_ANALIZ")
-
-                        return {
-                            "raw_results": search_result[:15000],  # Daha fazla veri
-                            "news_summary": news_summary,
-                            "analysis": analysis,
-                            "current_date": current_date,
-                            "sites_count": len(sites_found),
-                            "search_count": len(all_results)
-                        }
-                    else:
-                        print("❌ TÜM ARAMALAR BAŞARISIZ")
-                        return {
-                            "raw_results": "",
-                            "news_summary": "",
-                            "analysis": "",
-                            "current_date": current_date,
-                            "sites_count": 0,
-                            "search_count": 0
-                        }
+                analysis = await self.sequential_think(analysis_prompt, "DETAYLI_ANALIZ")
+
+                return {
+                    "raw_results": news["search_result"][:15000],  # Daha fazla veri
+                    "news_summary": news["news_summary"],
+                    "analysis": analysis,
+                    "current_date": current_date,
+                    "sites_count": len(news["sites_found"]),
+                    "search_count": news["search_count"],
+                    "plan": news["plan"]
+                }
+            else:
+                print("❌ TÜM ARAMALAR BAŞARISIZ")
+                return {
+                    "raw_results": "",
+                    "news_summary": "",
+                    "analysis": "",
+                    "current_date": current_date,
+                    "sites_count": 0,
+                    "search_count": 0
+                }
 
         except Exception as e:
             print(f"❌ Web arama hatası: {e}")
@@ -463,126 +624,309 @@ Detaylı analiz yap (150 kelimeye kadar):
                 "search_count": 0
             }
 
-    async def chat(self, user_input: str):
-        """Ana sohbet fonksiyonu"""
+    async def chat(self, user_input: str, history: list = None, listener=None, deadline: float = None,
+                   profile: bool = None, tier: str = None):
+        """
+        Ana sohbet fonksiyonu
+        Args:
+            history: Oturuma ait konuşma geçmişi (verilmezse agent'ın kendi geçmişi)
+            listener: async (event, data) çağrılabiliri; aşama ve token olaylarını alır
+            deadline: Sohbetin süre bütçesi (saniye, varsayılan: CHAT_DEADLINE_SECONDS ile sınırlı katman
+                süresi, 0 = sınırsız)
+            profile: True ise sohbetin profili çıkarılır; None ise PROFILE_SAMPLE_RATE uygulanır
+            tier: "fast", "standard" veya "deep" (varsayılan: PERSONA_TIER, bkz. src/agents/tiers.py)
+        Token kullanımı çağıranın usage_scope ile belirlediği oturuma yazılır.
+        Raises:
+            ValueError: Bilinmeyen katman
+        """
+        tier = resolve_tier(tier)
+        if history is None:
+            history = self.conversation_history
+        if deadline is None:
+            deadline = tier_deadline(tier)
+
+        run = {TIER_FAST: self._run_fast, TIER_STANDARD: self._run_standard}.get(tier, self._run_chat)
+        started = time.monotonic()
+        with profile_request(f"persona:{self.persona_name}", profile), deadline_scope(deadline), \
+                usage_scope(persona=self.persona_name):
+            try:
+                if listener is None:
+                    return await run(user_input, history)
+
+                with chat_listener(listener):
+                    return await run(user_input, history)
+            finally:
+                record_tier(tier, time.monotonic() - started)
+
+    def _session_budget(self):
+        """
+        Oturumun token bütçesi durumu.
+        Returns:
+            (durum, bütçe dolduysa kullanıcıya gösterilecek metin veya None)
+        """
+        usage = self.client.usage
+        session_state = usage.session_state()
+        if session_state == SESSION_EXHAUSTED:
+            usage.note("throttled")
+            print("🪙 OTURUM TOKEN BÜTÇESİ DOLDU: istek reddedildi")
+            return session_state, usage.budget_text()
+        return session_state, None
+
+    @staticmethod
+    def _print_request(user_input: str, tier: str):
         print(f"\n{'=' * 60}")
         print(f"📝 KULLANICI: {user_input}")
+        print(f"🎚️ KATMAN: {tier} ({TIERS[tier]['description']})")
         print("=" * 60)
 
+    @staticmethod
+    def _needs_news(user_input: str):
+        user_lower = user_input.lower()
+        return any(trigger in user_lower for trigger in SEARCH_TRIGGERS)
+
+    def _build_final_prompt(self, user_input: str, history: list, current_date: str, question_analysis="",
+                            response_plan="", news_summary="", analysis=""):
+        """Final cevap promptu; persona sistem promptu prefix olarak (önbellek tutamacıyla) gönderilir"""
+        history_text = ""
+        if history:
+            recent = history[-1:]
+            for h in recent:
+                history_text += f"Önceki: Sen: {h['user'][:100]}... | Ben: {h['assistant'][:100]}...\n"
+
+        thinking = []
+        if question_analysis:
+            thinking.append(f"Soru Analizi: {question_analysis[:300]}")
+        if response_plan:
+            thinking.append(f"Cevap Planı: {response_plan[:300]}")
+        thinking_text = "DÜŞÜNME SÜRECİ:\n" + "\n".join(thinking) if thinking else ""
+
+        return f"""BUGÜNÜN TARİHİ: {current_date}
+
+{thinking_text}
+
+{"GÜNCEL HABERLER:" if news_summary else ""}
+{news_summary[:1500] if news_summary else ""}
+
+{"KİŞİSEL ANALİZ:" if analysis else ""}
+{analysis[:1500] if analysis else ""}
+
+{history_text}
+
+Kullanıcı: "{user_input}"
+
+Karakterine uygun, detaylı cevap ver:"""
+
+    async def _final_answer(self, user_input: str, history: list, final_prompt: str):
+        """Final cevabı üret (dinleyici varsa akışlı) ve geçmişe ekle"""
+        try:
+            print("🤖 CEVAP ÜRETİLİYOR...")
+            await emit_chat_event("stage", {"persona": self.persona_name, "stage": "CEVAP"})
+            # Final cevap kalan sürenin tamamını kullanır; süre dolmuş olsa bile kısa bir şans verilir
+            left = remaining()
+            final_timeout = None if left is None else max(left, FINAL_ANSWER_MIN_SECONDS)
+            if _chat_listener.get() is not None:
+                response_text = await self.stream_with_api_rotation(final_prompt, timeout=final_timeout,
+                                                                    stage="CEVAP", prefix=self.prompt_prefix)
+            else:
+                response_text = await self.try_with_api_rotation(final_prompt, timeout=final_timeout,
+                                                                 stage="CEVAP", prefix=self.prompt_prefix)
+            print(f"✅ CEVAP HAZIR: {len(response_text)} karakter")
+
+            # Geçmişe ekle
+            history.append({
+                'user': user_input,
+                'assistant': response_text
+            })
+
+            # Son 3 konuşma tut (liste oturumla paylaşıldığı için yerinde kırp)
+            del history[:-3]
+
+            return response_text
+
+        except Exception as e:
+            print(f"❌ CEVAP ÜRETME HATASI: {e}")
+            return "Özür dilerim, şu anda teknik bir sorun yaşıyorum. Lütfen biraz sonra tekrar deneyin."
+
+    async def _run_fast(self, user_input: str, history: list):
+        """fast katmanı: tek LLM çağrısı, arama yok"""
+        self._print_request(user_input, TIER_FAST)
+        _, budget_text = self._session_budget()
+        if budget_text:
+            return budget_text
+
+        final_prompt = self._build_final_prompt(user_input, history, self.get_current_date())
+        return await self._final_answer(user_input, history, final_prompt)
+
+    def _cached_news(self, user_input: str):
+        """
+        Web'e gitmeden eldeki haberler: gündem ön belleğinin özeti ve yerel arşivde
+        soruyla en ilgili haberler.
+        """
+        parts = []
+        snapshot = get_news_prefetcher().snapshot()
+        if snapshot and snapshot["summary"]:
+            parts.append(snapshot["summary"])
+
+        corpus = get_news_corpus()
+        if corpus is not None:
+            try:
+                articles = corpus.search(user_input, limit=CACHED_NEWS_ARTICLES)
+            except sqlite3.Error as e:
+                print(f"⚠️ Haber arşivi okunamadı: {e}")
+                articles = []
+            for article in articles:
+                parts.append(f"- {article['title']} ({article['domain']}, {article['published'] or '?'}): "
+                             f"{article['text'][:CACHED_NEWS_CHARS]}")
+            print(f"🗄️ ARŞİVDEN {len(articles)} HABER")
+
+        return "\n".join(parts)
+
+    async def _run_standard(self, user_input: str, history: list):
+        """standard katmanı: arşivden haber (Exa yok) + cevap planı + final cevap"""
+        self._print_request(user_input, TIER_STANDARD)
+        session_state, budget_text = self._session_budget()
+        if budget_text:
+            return budget_text
+
+        news_summary = ""
+        if self._needs_news(user_input):
+            await emit_chat_event("stage", {"persona": self.persona_name, "stage": "ARSIV"})
+            news_summary = self._cached_news(user_input)
+
+        response_plan = ""
+        if session_state == SESSION_DEGRADED:
+            self.client.usage.note("degraded")
+            print("🪙 OTURUM TOKEN BÜTÇESİ AZALDI: cevap planı atlandı")
+        else:
+            response_plan = await self.sequential_think(
+                f"Soru: '{user_input}' | Güncel bilgi: {'Var' if news_summary else 'Yok'} | Nasıl cevap vereyim?",
+                "CEVAP_PLANLAMA"
+            )
+
+        final_prompt = self._build_final_prompt(user_input, history, self.get_current_date(),
+                                                response_plan=response_plan, news_summary=news_summary)
+        return await self._final_answer(user_input, history, final_prompt)
+
+    async def _run_chat(self, user_input: str, history: list):
+        """deep katmanı: Sequential Thinking pipeline'ı ve taze web araması"""
+        self._print_request(user_input, TIER_DEEP)
+
+        # Oturumun token bütçesi: dolduysa LLM çağrısı yapılmaz, dolmak üzereyse sohbet hafifletilir
+        usage = self.client.usage
+        session_state, budget_text = self._session_budget()
+        if budget_text:
+            return budget_text
+
         # Sequential Thinking pipeline
-        question_analysis = self.sequential_think(
+        question_analysis = await self.sequential_think(
             f"Kullanıcı '{user_input}' diyor. Bu soruya nasıl yaklaşmalısın?",
             "SORU_ANALIZI"
         )
 
-        search_decision = self.sequential_think(
+        search_decision = await self.sequential_think(
             f"'{user_input}' için web araması gerekli mi? Bu güncel bir konu mu?",
             "ARAMA_KARARI"
         )
 
-        # Arama tetikleyicileri
-        search_triggers = [
-            "son", "güncel", "yeni", "bugün", "haber", "gündem", "olay",
-            "ne oluyor", "neler oldu", "ekonomi", "politika", "seçim",
-            "2024", "2025"
-        ]
-
-        user_lower = user_input.lower()
-        needs_search = any(trigger in user_lower for trigger in search_triggers) or \
-                       "arama gerek" in search_decision.lower()
+        needs_search = self._needs_news(user_input) or "arama gerek" in search_decision.lower()
 
         current_date = self.get_current_date()
         analysis = ""
         news_summary = ""
 
+        if needs_search and self.search_client.configured and not self.search_client.available:
+            print("🔴 WEB ARAMASI DEVRE DIŞI: arama aşamaları atlandı")
+            needs_search = False
+
+        if needs_search and not has_budget(SEARCH_MIN_BUDGET):
+            print(f"⏱️ SÜRE KISITLI: web araması atlandı ({remaining():.1f} sn kaldı)")
+            needs_search = False
+
+        if needs_search and session_state == SESSION_DEGRADED:
+            # En pahalı aşamalar (haber özeti, analiz) arama ile gelir
+            usage.note("degraded")
+            print("🪙 OTURUM TOKEN BÜTÇESİ AZALDI: web araması atlandı")
+            needs_search = False
+
         if needs_search:
             print("🎯 GÜNCEL BİLGİ ARANACAK")
 
-            search_terms = self.sequential_think(
+            search_terms = await self.sequential_think(
                 f"'{user_input}' için en iyi arama terimleri neler?",
                 "ARAMA_TERIMLERI"
             )
 
-            search_data = await self.search_web_detailed(search_terms.strip())
+            search_data = await self.search_web_detailed(search_terms.strip(), question=user_input)
             analysis = search_data["analysis"]
             news_summary = search_data["news_summary"]
 
             print(f"📊 ARAMA ÖZETİ: {search_data['search_count']} arama, {search_data['sites_count']} site")
+            plan = search_data.get("plan")
+            if plan:
+                print(f"💾 PLAN: {plan['category']} | {plan['executed']} arama yapıldı, "
+                      f"{plan['local_hits']} arşivden | {plan['searches_saved']} arama ve "
+                      f"~{plan['bytes_saved']} bayt tasarruf")
         else:
             print("⚡ GENEL SOHBET")
 
         # Cevap planlama
-        response_plan = self.sequential_think(
+        response_plan = await self.sequential_think(
             f"Soru: '{user_input}' | Güncel bilgi: {'Var' if analysis else 'Yok'} | Nasıl cevap vereyim?",
             "CEVAP_PLANLAMA"
         )
 
         # Final cevap
         print("💬 CEVAP HAZIRLANIYOR...")
+        final_prompt = self._build_final_prompt(user_input, history, current_date,
+                                                question_analysis=question_analysis, response_plan=response_plan,
+                                                news_summary=news_summary, analysis=analysis)
+        return await self._final_answer(user_input, history, final_prompt)
 
-        # Geçmiş ekle
-        history_text = ""
-        if self.conversation_history:
-            recent = self.conversation_history[-1:]
-            for h in recent:
-                history_text += f"Önceki: Sen: {h['user'][:100]}... | Ben: {h['assistant'][:100]}...\n"
-
-        final_prompt = f"""{self.create_system_prompt()}
-
-BUGÜNÜN TARİHİ: {current_date}
-
-DÜŞÜNME SÜRECİ:
-Soru Analizi: {question_analysis[:300]}
-Cevap Planı: {response_plan[:300]}
-
-{"GÜNCEL HABERLER:" if news_summary else ""}
-{news_summary[:1500] if news_summary else ""}
-
-{"KİŞİSEL ANALİZ:" if analysis else ""}
-{analysis[:1500] if analysis else ""}
-
-{history_text}
 
-Kullanıcı: "{user_input}"
+class PersonaSession:
+    """
+    Paylaşılan bir PersonaAgent üzerinde oturuma ait konuşma geçmişi taşıyan
+    hafif sarmalayıcı. PersonaPanel'in beklediği agent arayüzünü sağlar.
+    """
 
-Karakterine uygun, detaylı cevap ver:"""
+    def __init__(self, agent: PersonaAgent, history: list = None):
+        self.agent = agent
+        self.persona = agent.persona
+        self.conversation_history = history if history is not None else []
 
-        try:
-            print("🤖 CEVAP ÜRETİLİYOR...")
-            response_text = self.try_with_api_rotation(final_prompt)
-            print(f"✅ CEVAP HAZIR: {len(response_text)} karakter")
+    def create_system_prompt(self):
+        return self.agent.create_system_prompt()
 
-            # Geçmişe ekle
-            self.conversation_history.append({
-                'user': user_input,
-                'assistant': response_text
-            })
+    async def chat(self, user_input: str, listener=None, deadline: float = None, tier: str = None):
+        return await self.agent.chat(user_input, history=self.conversation_history, listener=listener,
+                                     deadline=deadline, tier=tier)
 
-            # Son 3 konuşma tut
-            if len(self.conversation_history) > 3:
-                self.conversation_history = self.conversation_history[-3:]
 
-            return response_text
+def start_news_prefetch(agent: PersonaAgent):
+    """
+    Gündem ön belleğini çalışan loop'ta başlat.
+    NEWS_PREFETCH_SUMMARY açıksa genel gündem özeti de arka planda hazırlanır.
+    """
+    prefetcher = get_news_prefetcher()
+    if prefetch_summary_enabled() and prefetcher.summarize is None:
+        async def summarize(raw_text, search_count):
+            return await agent.summarize_comprehensive_news(raw_text, search_count, 0)
 
-        except Exception as e:
-            print(f"❌ CEVAP ÜRETME HATASI: {e}")
-            return "Özür dilerim, şu anda teknik bir sorun yaşıyorum. Lütfen biraz sonra tekrar deneyin."
+        prefetcher.summarize = summarize
+    return prefetcher.start()
 
 
 def get_available_personas():
     """Mevcut persona'ları listele"""
-    try:
-        personas = []
-        for file in os.listdir('personas'):
-            if file.endswith('.json'):
-                personas.append(file[:-5])  # .json uzantısını çıkar
-        return personas
-    except:
-        return ['tugrul_bey']
+    return list_personas() or ['tugrul_bey']
 
 
-async def main():
-    """Ana program"""
+async def main(tier: str = None):
+    """
+    Ana program
+    Args:
+        tier: Başlangıç cevap katmanı (varsayılan: PERSONA_TIER); sohbet sırasında 'tier <ad>' ile değişir
+    """
     print("🎭 Mini Microcosmos - AI Persona Simulator")
     print("🧠 Sequential Thinking mimarisi aktif")
     print("🔧 Güvenli ve yapılandırılmış sistem\n")
@@ -595,10 +939,13 @@ async def main():
     selected_persona = "tugrul_bey"
     print(f"🎯 Aktif Persona: {selected_persona}")
 
+    tier = resolve_tier(tier)
+
     try:
         agent = PersonaAgent(selected_persona)
         print(f"📊 API Key sayısı: {len(agent.api_keys)}")
-        print("💡 Komutlar: 'switch' (API değiştir), 'quit' (çıkış)\n")
+        print(f"🎚️ Katman: {tier} ({TIERS[tier]['description']}, ~{TIERS[tier]['latency']})")
+        print(f"💡 Komutlar: 'switch' (API değiştir), 'tier <{'|'.join(TIERS)}>' (katman), 'quit' (çıkış)\n")
     except Exception as e:
         print(f"❌ Agent başlatma hatası: {e}")
         return
@@ -611,6 +958,15 @@ async def main():
                 agent.switch_api_key()
                 continue
 
+            parts = user_input.split()
+            if parts[:1] and parts[0].lower() == 'tier':
+                try:
+                    tier = resolve_tier(parts[1] if len(parts) > 1 else None)
+                    print(f"🎚️ Katman: {tier} ({TIERS[tier]['description']}, ~{TIERS[tier]['latency']})")
+                except ValueError as e:
+                    print(f"❌ {e}")
+                continue
+
             if user_input.lower() in ['quit', 'exit', 'q']:
                 print("👋 Görüşmek üzere!")
                 break
@@ -618,7 +974,7 @@ async def main():
             if not user_input:
                 continue
 
-            response = await agent.chat(user_input)
+            response = await agent.chat(user_input, tier=tier)
             print(f"\n🎭 {agent.persona['name']}: {response}")
             print("\n" + "-" * 60)
 
@@ -631,4 +987,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Mini Microcosmos - persona sohbeti (CLI)")
+    parser.add_argument("--tier", choices=list(TIERS), default=None,
+                        help="Cevap katmanı: " + ", ".join(f"{name} ({spec['description']}, ~{spec['latency']})"
+                                                           for name, spec in TIERS.items())
+                        + " (varsayılan: PERSONA_TIER veya deep)")
+    args = parser.parse_args()
+    asyncio.run(main(args.tier))
\ No newline at end of file
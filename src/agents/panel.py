@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Çoklu Persona Paneli
+N persona'ya aynı soruyu sorar. Quota sıkışıkken tüm persona'ların cevabını
+tek bir yapılandırılmış istekte üretir; çıktı ayrıştırılamazsa eksik kalan
+persona'lar için tek tek çağrıya düşer.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from datetime import datetime
+
+from src.utils.admission import BATCH
+from src.utils.gemini_client import QUOTA_FALLBACK_TEXT, get_gemini_client
+from src.utils.token_usage import usage_scope
+
+# Üretim modları
+MODE_AUTO = "auto"
+MODE_BATCHED = "batched"
+MODE_INDIVIDUAL = "individual"
+MODES = (MODE_AUTO, MODE_BATCHED, MODE_INDIVIDUAL)
+
+# Tek tek çağrılarda quota cevabı alındıktan sonra bu süre boyunca toplu moda geçilir
+TIGHT_COOLDOWN_SECONDS = 60.0
+
+HISTORY_LIMIT = 3
+
+
+def build_panel_prompt(agents, user_input, current_date):
+    """Tüm persona'ların cevabını tek istekte isteyen prompt"""
+    sections = []
+    for persona_id, agent in agents.items():
+        sections.append(f"=== KARAKTER: {persona_id} ===\n{agent.create_system_prompt()}")
+
+    characters_text = "\n\n".join(sections)
+    schema = ", ".join(f'"{persona_id}": "<{agent.persona["name"]} cevabı>"'
+                       for persona_id, agent in agents.items())
+
+    return f"""Aşağıda {len(agents)} farklı karakter var. Kullanıcının sorusunu HER BİR karakter
+kendi ağzından, diğerlerinden bağımsız ve kendi kurallarına uygun şekilde cevaplayacak.
+
+BUGÜN: {current_date}
+
+{characters_text}
+
+Kullanıcı: "{user_input}"
+
+SADECE geçerli bir JSON nesnesi döndür. Anahtarlar karakter kimlikleri, değerler o karakterin cevabı olsun:
+{{{schema}}}"""
+
+
+def parse_panel_response(text, persona_ids):
+    """
+    Toplu cevaptan persona başına metni çıkar.
+    Returns:
+        {persona_id: cevap} - sadece geçerli (boş olmayan metin) cevaplar
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+    if not isinstance(data, dict):
+        return {}
+
+    answers = {}
+    for persona_id in persona_ids:
+        value = data.get(persona_id)
+        if isinstance(value, str) and value.strip():
+            answers[persona_id] = value.strip()
+    return answers
+
+
+class PersonaPanel:
+    """
+    Persona agent'larından oluşan panel.
+    Agent'lar `persona`, `conversation_history`, `create_system_prompt()` ve
+    `async chat(user_input, tier=None)` sağlamalıdır (PersonaAgent, PersonaSession).
+    """
+
+    # Key'ler process genelinde ortak olduğundan quota sinyali de paneller arasında paylaşılır
+    _tight_until = 0.0
+
+    def __init__(self, agents: dict, client=None, admission=None, tenant=None):
+        """
+        Args:
+            admission: Verilirse tek tek cevaplarda ilk persona çağıranın slotunda, diğerleri
+                toplu öncelikte (BATCH) alınan ek slotlarda çalışır
+            tenant: Ek slotların kabul kontrolündeki oturumu
+        """
+        self.agents = agents
+        self.client = client or get_gemini_client()
+        self.admission = admission
+        self.tenant = tenant
+        self.last_mode = None
+
+    def quota_tight(self):
+        """Bu dakika tek tek çağrılar için yeterli kapasite yoksa True"""
+        if time.monotonic() < PersonaPanel._tight_until:
+            return True
+        return self.client.key_pool.capacity() < len(self.agents)
+
+    @staticmethod
+    def _mark_tight():
+        PersonaPanel._tight_until = time.monotonic() + TIGHT_COOLDOWN_SECONDS
+
+    @staticmethod
+    def _remember(agent, user_input, response_text):
+        agent.conversation_history.append({
+            'user': user_input,
+            'assistant': response_text
+        })
+        # Geçmiş listesi oturumla paylaşılıyor olabilir; yerinde kırp
+        del agent.conversation_history[:-HISTORY_LIMIT]
+
+    async def answer_batched(self, user_input, persona_ids=None):
+        """Seçili persona'ları tek istekte cevapla (kısmi sonuç dönebilir)"""
+        persona_ids = persona_ids or list(self.agents)
+        agents = {persona_id: self.agents[persona_id] for persona_id in persona_ids}
+        current_date = datetime.now().strftime("%d %B %Y")
+
+        prompt = build_panel_prompt(agents, user_input, current_date)
+        try:
+            # Toplu cevap tek persona'ya ait olmadığından "panel" adıyla sayılır
+            with usage_scope(persona="panel"):
+                text = await self.client.generate(
+                    prompt, generation_config={"responseMimeType": "application/json"}, stage="PANEL"
+                )
+        except Exception as e:
+            print(f"❌ Toplu panel cevabı hatası: {e}")
+            return {}
+
+        answers = parse_panel_response(text, persona_ids)
+        for persona_id, response_text in answers.items():
+            self._remember(agents[persona_id], user_input, response_text)
+
+        print(f"📦 TOPLU CEVAP: {len(answers)}/{len(persona_ids)} persona ayrıştırıldı")
+        return answers
+
+    async def answer_individually(self, user_input, persona_ids=None, tier=None):
+        """Her persona için kendi agent'ı ile seçili katmanda ayrı çağrı yap"""
+        persona_ids = persona_ids or list(self.agents)
+        if self.admission is None:
+            responses = await asyncio.gather(*(self.agents[persona_id].chat(user_input, tier=tier)
+                                               for persona_id in persona_ids))
+        else:
+            responses = await self._fan_out(user_input, persona_ids, tier)
+
+        answers = dict(zip(persona_ids, responses))
+        if any(response.startswith(QUOTA_FALLBACK_TEXT[:20]) for response in responses):
+            self._mark_tight()
+        return answers
+
+    async def _fan_out(self, user_input, persona_ids, tier):
+        """
+        Persona'ları sıradan çeken işçilerle cevapla: biri çağıranın slotunda hemen başlar,
+        diğerleri BATCH biletleri kabul edildikçe katılır. Çağıranın işçisi kuyruğu tek başına
+        da bitirebildiğinden slot tutarken başka slot beklemek kilitlenmeye yol açmaz.
+        """
+        pending = deque(persona_ids)
+        results = {}
+
+        async def worker():
+            while pending:
+                persona_id = pending.popleft()
+                results[persona_id] = await self.agents[persona_id].chat(user_input, tier=tier)
+
+        async def extra_worker(ticket):
+            try:
+                await ticket.wait()
+                await worker()
+            finally:
+                ticket.release()
+
+        tickets = [self.admission.enqueue(self.tenant, BATCH) for _ in persona_ids[1:]]
+        extras = [asyncio.ensure_future(extra_worker(ticket)) for ticket in tickets]
+        try:
+            await worker()
+        finally:
+            # Kabul edilmemiş ek slotlara artık gerek yok; çalışanlar cevaplarını bitirir
+            for ticket, task in zip(tickets, extras):
+                if not ticket.admitted:
+                    task.cancel()
+            outcomes = await asyncio.gather(*extras, return_exceptions=True)
+
+        for outcome in outcomes:
+            if isinstance(outcome, Exception):
+                raise outcome
+        return [results[persona_id] for persona_id in persona_ids]
+
+    async def answer(self, user_input, mode=MODE_AUTO, tier=None):
+        """
+        Paneldeki tüm persona'ların cevabını persona sırasıyla döndür.
+        Args:
+            mode: "auto" (quota sıkışıksa toplu), "batched" veya "individual"
+            tier: Tek tek cevaplarda katman (bkz. src/agents/tiers.py); toplu cevap her zaman tek çağrıdır
+        """
+        if mode == MODE_AUTO:
+            mode = MODE_BATCHED if len(self.agents) > 1 and self.quota_tight() else MODE_INDIVIDUAL
+
+        answers = {}
+        if mode == MODE_BATCHED:
+            answers = await self.answer_batched(user_input)
+
+        missing = [persona_id for persona_id in self.agents if persona_id not in answers]
+        if missing:
+            if mode == MODE_BATCHED:
+                print(f"↩️ Ayrıştırılamayan persona'lar tek tek soruluyor: {', '.join(missing)}")
+            answers.update(await self.answer_individually(user_input, missing, tier))
+
+        self.last_mode = mode
+        return {persona_id: answers[persona_id] for persona_id in self.agents}
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Sentetik Nüfus Motoru
+Arketip persona'lardan örneklenmiş varyantlar üretir, aynı soruyu toplu
+prompt'larla sorar ve cevaplardan çıkarılan tutumları NumPy ile toplar.
+
+Kullanım:
+    python -m src.agents.population --question "Asgari ücret artışı yeterli mi?" --per-archetype 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.utils.gemini_client import GeminiClient
+from src.utils.key_pool import STORE_FLUSH_TIMEOUT_SECONDS, KeyPool
+from src.utils.key_store import open_key_store
+from src.utils.personas import list_personas, load_persona
+
+# Tutum kodları: dizi indeksleri ile aynı sırada
+STANCES = ("karşı", "kararsız", "destekliyor")
+STANCE_UNKNOWN = -1
+
+# Varyantlara eklenen örneklenmiş nitelikler
+ENGAGEMENT_LEVELS = ("düşük", "orta", "yüksek")
+ECONOMIC_LEVELS = ("kötü", "orta", "iyi")
+
+_AGE_DECADE_RE = re.compile(r"(\d{2})[’']?l[ıiuü] yaşlarında")
+
+# "20'li, 30'lu, 40'lı ...": ek, on yılın okunuşunun son ünlüsüne uyar (yirmi, otuz, kırk, ...)
+_DECADE_SUFFIXES = {20: "li", 30: "lu", 40: "lı", 50: "li", 60: "lı", 70: "li", 80: "li"}
+
+# Olumsuz destek ("desteklemiyorum", "desteklemem", "desteklemez", "desteklemeyeceğim")
+# "destekl" ile de eşleşir; önce bakılır. "desteklemeyi" (isim-fiil) olumsuz değildir.
+_NEGATED_SUPPORT_RE = re.compile(
+    r"\b(?:destekle(?:mi[yo]|mem|mez|meyiz|meyece[kğ])|katılm(?:ı[yo]|am|az|ayaca[kğ]))"
+)
+
+# Tutum anahtar kelimeleri kelime başında eşleşir; kısa/çok anlamlı olanlar tam kelime
+# ("karşılıyor" karşı, "hayırlı" hayır sayılmaz)
+_STANCE_PATTERNS = (
+    ("destekliyor", re.compile(r"\b(?:destekl|katılıyorum|doğru buluyorum|evet\b)")),
+    ("karşı", re.compile(r"\b(?:karşı(?:yım|yız|dır|lar)?\b|yanlış|hayır\b|asla\b)")),
+    ("kararsız", re.compile(r"\b(?:kararsız|emin değilim|bilmiyorum|bakalım)")),
+)
+
+_AGE_EXACT_RE = re.compile(r"(\d{2}) yaş(?:larında|ında)")
+
+
+def _perturb_age(text, rng):
+    """Bio'daki yaş ifadesini ±1 on yıl / birkaç yıl kaydır"""
+    match = _AGE_DECADE_RE.search(text)
+    if match:
+        decade = int(match.group(1)) + rng.choice((-10, 0, 0, 10))
+        decade = min(80, max(20, decade))
+        suffix = _DECADE_SUFFIXES[decade]
+        return text[:match.start()] + f"{decade}’{suffix} yaşlarında" + text[match.end():]
+
+    match = _AGE_EXACT_RE.search(text)
+    if match:
+        age = min(85, max(18, int(match.group(1)) + rng.randint(-3, 5)))
+        return text[:match.start()] + f"{age} " + match.group(0).split(" ", 1)[1] + text[match.end():]
+
+    return text
+
+
+def _sample(items, rng, min_ratio, max_ratio, min_count=1):
+    """Listenin rastgele bir alt kümesini (sırası karıştırılmış) seç"""
+    items = [item for item in items if item]
+    if not items:
+        return []
+    ratio = rng.uniform(min_ratio, max_ratio)
+    count = max(min(min_count, len(items)), round(len(items) * ratio))
+    return rng.sample(items, count)
+
+
+def generate_variants(archetype, persona, n, seed=None):
+    """
+    Arketip persona'dan n adet varyant üret.
+    Varyantlar aynı JSON şemasını korur; ek olarak variant_id, archetype ve
+    örneklenmiş nitelikler (attributes) taşır.
+    """
+    # seed verilmezse her çalıştırma farklı varyantlar üretir
+    rng = random.Random(f"{archetype}:{seed}") if seed is not None else random.Random()
+    bio = persona.get("bio", [])
+    variants = []
+
+    for i in range(n):
+        engagement = rng.choice(ENGAGEMENT_LEVELS)
+        economic = rng.choice(ECONOMIC_LEVELS)
+
+        # İlk bio satırı demografik çekirdektir, her zaman korunur
+        variant_bio = [_perturb_age(bio[0], rng)] if bio else []
+        variant_bio += _sample(bio[1:], rng, 0.6, 1.0)
+        variant_bio.append(f"Siyasete ilgi düzeyi: {engagement}")
+        variant_bio.append(f"Ekonomik durumu: {economic}")
+
+        variants.append({
+            "variant_id": f"{archetype}-{i:04d}",
+            "archetype": archetype,
+            "name": persona.get("name", archetype),
+            "bio": variant_bio,
+            "lore": _sample(persona.get("lore", []), rng, 0.4, 0.8),
+            "knowledge": _sample(persona.get("knowledge", []), rng, 0.5, 1.0),
+            "style": {"chat": _sample(persona.get("style", {}).get("chat", []), rng, 0.5, 1.0)},
+            "attributes": {"engagement": engagement, "economic": economic},
+        })
+
+    return variants
+
+
+def build_population_prompt(variants, question):
+    """Birden fazla varyantı tek istekte soran yapılandırılmış prompt"""
+    profiles = []
+    for variant in variants:
+        bio = "; ".join(variant["bio"][:6])
+        lore = "; ".join(item[:200] for item in variant["lore"][:4])
+        style = ", ".join(variant["style"]["chat"][:3])
+        profiles.append(f"""[{variant["variant_id"]}]
+Kimlik: {bio}
+Bakış: {lore}
+Tarz: {style}""")
+
+    profiles_text = "\n\n".join(profiles)
+
+    return f"""Aşağıda {len(variants)} farklı kişinin profili var. Her biri aşağıdaki soruyu
+kendi karakterine göre cevaplıyor.
+
+SORU: "{question}"
+
+PROFİLLER:
+{profiles_text}
+
+Her kişi için tutumunu belirle:
+- stance: "karşı", "kararsız" veya "destekliyor"
+- score: -1.0 (tamamen karşı) ile 1.0 (tamamen destekliyor) arası sayı
+- answer: kişinin ağzından tek cümlelik cevap
+
+SADECE şu formatta geçerli bir JSON dizisi döndür, başka metin yazma:
+[{{"id": "<profil id>", "stance": "...", "score": 0.0, "answer": "..."}}]"""
+
+
+def extract_stance(text):
+    """Serbest metinden anahtar kelime ile tutum kodu çıkar (JSON'da stance yoksa)"""
+    lowered = (text or "").replace("İ", "i").replace("I", "ı").lower()
+    if _NEGATED_SUPPORT_RE.search(lowered):
+        return STANCES.index("karşı")
+    for stance, pattern in _STANCE_PATTERNS:
+        if pattern.search(lowered):
+            return STANCES.index(stance)
+    return STANCE_UNKNOWN
+
+
+def _normalize_stance(value):
+    value = str(value or "").strip().lower()
+    for code, stance in enumerate(STANCES):
+        if value.startswith(stance[:5]):
+            return code
+    return STANCE_UNKNOWN
+
+
+def parse_population_response(text, expected_ids):
+    """
+    Model çıktısındaki JSON dizisini ayrıştır.
+    Returns:
+        {variant_id: (stance_code, score, answer)} - sadece beklenen id'ler
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end <= start:
+        return {}
+
+    try:
+        items = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+
+    results = {}
+    expected = set(expected_ids)
+    for item in items:
+        if not isinstance(item, dict) or item.get("id") not in expected:
+            continue
+
+        answer = str(item.get("answer", ""))
+        code = _normalize_stance(item.get("stance"))
+        if code == STANCE_UNKNOWN:
+            code = extract_stance(answer)
+
+        try:
+            score = float(item.get("score"))
+            score = min(1.0, max(-1.0, score))
+        except (TypeError, ValueError):
+            score = float(code - 1) if code != STANCE_UNKNOWN else np.nan
+
+        results[item["id"]] = (code, score, answer)
+
+    return results
+
+
+class PopulationResults:
+    """Katılımcı başına tutumları tutan sütunsal NumPy dizileri"""
+
+    def __init__(self, archetypes, size):
+        self.archetypes = list(archetypes)
+        self.variant_ids = [""] * size
+        self.answers = [""] * size
+        self.archetype_idx = np.zeros(size, dtype=np.int16)
+        self.stance = np.full(size, STANCE_UNKNOWN, dtype=np.int8)
+        self.score = np.full(size, np.nan, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.stance)
+
+    def distribution(self):
+        """Arketip × tutum sayım matrisi (A × len(STANCES))"""
+        valid = self.stance >= 0
+        n_stances = len(STANCES)
+        flat = self.archetype_idx[valid].astype(np.int64) * n_stances + self.stance[valid]
+        counts = np.bincount(flat, minlength=len(self.archetypes) * n_stances)
+        return counts.reshape(len(self.archetypes), n_stances)
+
+    def report(self):
+        """Arketip başına tutum dağılımı, ortalama/std skor ve ayrıştırılamayan sayısı"""
+        counts = self.distribution()
+        totals = counts.sum(axis=1)
+        shares = np.divide(counts, totals[:, None], out=np.zeros(counts.shape, dtype=np.float64),
+                           where=totals[:, None] > 0)
+
+        has_score = ~np.isnan(self.score)
+        n = len(self.archetypes)
+        score_n = np.bincount(self.archetype_idx[has_score], minlength=n)
+        score_sum = np.bincount(self.archetype_idx[has_score], weights=self.score[has_score], minlength=n)
+        score_sq = np.bincount(self.archetype_idx[has_score], weights=self.score[has_score] ** 2, minlength=n)
+        mean = np.divide(score_sum, score_n, out=np.full(n, np.nan), where=score_n > 0)
+        var = np.divide(score_sq, score_n, out=np.full(n, np.nan), where=score_n > 0) - mean ** 2
+        std = np.sqrt(np.clip(var, 0, None))
+
+        unknown = np.bincount(self.archetype_idx[self.stance < 0], minlength=n)
+
+        report = {"archetypes": {}, "overall": {}}
+        for i, archetype in enumerate(self.archetypes):
+            report["archetypes"][archetype] = {
+                "n": int(totals[i] + unknown[i]),
+                "unparsed": int(unknown[i]),
+                "distribution": {stance: round(float(shares[i, j]), 4) for j, stance in enumerate(STANCES)},
+                "mean_score": None if np.isnan(mean[i]) else round(float(mean[i]), 4),
+                "std_score": None if np.isnan(std[i]) else round(float(std[i]), 4),
+            }
+
+        all_counts = counts.sum(axis=0)
+        all_total = all_counts.sum()
+        report["overall"] = {
+            "n": len(self),
+            "unparsed": int(unknown.sum()),
+            "distribution": {stance: round(float(all_counts[j] / all_total), 4) if all_total else 0.0
+                             for j, stance in enumerate(STANCES)},
+            "mean_score": round(float(np.nanmean(self.score)), 4) if has_score.any() else None,
+        }
+        return report
+
+
+class PopulationEngine:
+    """Varyant üretimi, toplu prompt'lama ve tutum toplama"""
+
+    def __init__(self, client: GeminiClient, batch_size=8, concurrency=None):
+        self.client = client
+        self.batch_size = max(1, batch_size)
+        self.concurrency = concurrency or min(32, len(client.key_pool) * 2)
+
+    async def _ask_batch(self, variants, question):
+        prompt = build_population_prompt(variants, question)
+        ids = [variant["variant_id"] for variant in variants]
+        try:
+            text = await self.client.generate(prompt, generation_config={"temperature": 0.9}, stage="POPULATION")
+        except Exception as e:
+            print(f"❌ Toplu istek hatası ({ids[0]}…): {e}")
+            return {}
+        return parse_population_response(text, ids)
+
+    async def run(self, archetypes, per_archetype, question, seed=None):
+        """Nüfusu üret, soruyu sor ve sonuçları PopulationResults olarak döndür"""
+        variants = []
+        for archetype in archetypes:
+            variants += generate_variants(archetype, load_persona(archetype, strict=True), per_archetype, seed)
+
+        results = PopulationResults(archetypes, len(variants))
+        index_of = {}
+        for i, variant in enumerate(variants):
+            results.variant_ids[i] = variant["variant_id"]
+            results.archetype_idx[i] = archetypes.index(variant["archetype"])
+            index_of[variant["variant_id"]] = i
+
+        # Aynı arketipin varyantları aynı batch'e düşsün (profiller benzer, cevaplar tutarlı)
+        batches = [variants[i:i + self.batch_size] for i in range(0, len(variants), self.batch_size)]
+        print(f"👥 {len(variants)} katılımcı, {len(batches)} toplu istek "
+              f"(batch: {self.batch_size}, eşzamanlılık: {self.concurrency})")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done = 0
+
+        async def run_batch(batch):
+            nonlocal done
+            async with semaphore:
+                parsed = await self._ask_batch(batch, question)
+
+                # Eksik kalanları bir kez daha, daha küçük bir batch ile dene
+                missing = [variant for variant in batch if variant["variant_id"] not in parsed]
+                if missing:
+                    half = max(1, len(missing) // 2)
+                    for chunk in (missing[:half], missing[half:]):
+                        if chunk:
+                            parsed.update(await self._ask_batch(chunk, question))
+
+            for variant_id, (code, score, answer) in parsed.items():
+                i = index_of[variant_id]
+                results.stance[i] = code
+                results.score[i] = score
+                results.answers[i] = answer
+
+            done += 1
+            if done % 10 == 0 or done == len(batches):
+                print(f"📊 {done}/{len(batches)} toplu istek tamamlandı")
+
+        await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return results
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print("📊 TUTUM DAĞILIMI")
+    print("=" * 60)
+    for archetype, row in list(report["archetypes"].items()) + [("TOPLAM", report["overall"])]:
+        dist = " | ".join(f"{stance}: {share:.0%}" for stance, share in row["distribution"].items())
+        mean = row["mean_score"]
+        print(f"{archetype:<14} n={row['n']:<5} {dist} | ort. skor: "
+              f"{'-' if mean is None else f'{mean:+.2f}'} | ayrıştırılamayan: {row['unparsed']}")
+
+
+async def run_population(args):
+    # Diğer process'lerde tükenen/geçersiz key'ler burada da atlanır
+    store = open_key_store()
+    try:
+        pool = KeyPool(rpm_per_key=args.rpm, store=store)
+    except ValueError as e:
+        print(e)
+        if store is not None:
+            store.close()
+        return 1
+
+    client = GeminiClient(key_pool=pool)
+    engine = PopulationEngine(client, batch_size=args.batch_size, concurrency=args.concurrency)
+
+    try:
+        results = await engine.run(args.archetypes, args.per_archetype, args.question, seed=args.seed)
+    finally:
+        await client.close()
+        if store is not None:
+            pool.flush(STORE_FLUSH_TIMEOUT_SECONDS)
+            store.close()
+
+    started = time.perf_counter()
+    report = results.report()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print_report(report)
+    print(f"⏱️ Toplama süresi: {elapsed_ms:.2f} ms ({len(results)} katılımcı)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for i in range(len(results)):
+                code = int(results.stance[i])
+                f.write(json.dumps({
+                    "variant_id": results.variant_ids[i],
+                    "archetype": results.archetypes[results.archetype_idx[i]],
+                    "stance": STANCES[code] if code >= 0 else None,
+                    "score": None if np.isnan(results.score[i]) else float(results.score[i]),
+                    "answer": results.answers[i],
+                }, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"report": report, "question": args.question}, ensure_ascii=False) + "\n")
+        print(f"💾 Sonuçlar: {args.output}")
+
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mini Microcosmos - sentetik nüfus simülasyonu")
+    parser.add_argument("--question", required=True, help="Nüfusa sorulacak soru")
+    parser.add_argument("--archetypes", default="all", help="'all' veya virgülle ayrılmış persona adları")
+    parser.add_argument("--per-archetype", type=int, default=100, help="Arketip başına varyant sayısı")
+    parser.add_argument("--batch-size", type=int, default=8, help="Tek istekte sorulan varyant sayısı")
+    parser.add_argument("--concurrency", type=int, default=None, help="Eşzamanlı istek sayısı")
+    parser.add_argument("--rpm", type=int, default=None, help="Key başına dakikalık istek limiti")
+    parser.add_argument("--seed", type=int, default=None, help="Tekrarlanabilir varyant üretimi için seed")
+    parser.add_argument("--output", default=None, help="Katılımcı başına JSONL çıktı dosyası")
+    args = parser.parse_args(argv)
+
+    available = list_personas()
+    if args.archetypes == "all":
+        args.archetypes = available
+    else:
+        args.archetypes = [name.strip() for name in args.archetypes.split(",") if name.strip()]
+        unknown = [name for name in args.archetypes if name not in available]
+        if unknown:
+            parser.error(f"Bilinmeyen persona(lar): {', '.join(unknown)}")
+
+    load_dotenv(dotenv_path='config/.env')
+
+    try:
+        return asyncio.run(run_population(args))
+    except KeyboardInterrupt:
+        print("\n⏹️ Kesildi")
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Uyarlanabilir Arama Planı
+Sorunun kategorisine göre hangi aramaların hangi sırayla yapılacağını seçer ve
+yeterli sayıda farklı kaynak/haber toplandığında kalan aramaları atlar.
+"""
+
+import re
+import threading
+from urllib.parse import urlparse
+
+from src.utils.news_prefetch import GENERAL_NEWS_QUERIES
+
+CATEGORY_KEYWORDS = {
+    "ekonomi": [
+        "ekonomi", "enflasyon", "dolar", "euro", "kur", "faiz", "asgari", "ücret", "maaş",
+        "zam", "fiyat", "vergi", "emekli", "borsa", "kira", "işsizlik", "merkez bankası", "pahalı",
+    ],
+    "siyaset": [
+        "siyaset", "politik", "politika", "seçim", "parti", "chp", "akp", "ak parti", "mhp",
+        "iyi parti", "hükümet", "meclis", "cumhurbaşkanı", "bakan", "muhalefet", "ittifak", "oy",
+    ],
+    "sosyal": [
+        "toplum", "sosyal", "eğitim", "üniversite", "okul", "aile", "göç", "mülteci", "sağlık",
+        "deprem", "kadın", "genç", "gençlik", "işçi", "grev", "konut", "iklim",
+    ],
+}
+
+# Kategori başına anahtar kelimeye bağlı arama (orijinal 8'li plandaki karşılıkları)
+CATEGORY_QUERIES = {
+    "ekonomi": {"suffix": "ekonomi", "num_results": 5, "label": "EKONOMİ ARAMASI", "recent": True},
+    "siyaset": {"suffix": "siyaset politik", "num_results": 5, "label": "SİYASET ARAMASI", "recent": True},
+    "sosyal": {"suffix": "toplum sosyal", "num_results": 4, "label": "SOSYAL ARAMASI", "recent": False},
+}
+
+# Kapsam yeterli sayılırsa kalan aramalar yapılmaz
+MIN_UNIQUE_SOURCES = 6
+MIN_UNIQUE_ARTICLES = 12
+
+# Kapsam yeterli olsa bile en az bu kadar arama yapılır (ana arama + birincil kategori)
+MIN_SEARCHES = 2
+
+# Ana kategorinin aramasında istenen sonuç sayısı artırılır
+PRIMARY_EXTRA_RESULTS = 2
+
+_URL_RE = re.compile(r"https?://[^\s\"'<>()\[\]]+")
+
+# Kısa kökler kelime başı eşleşmesiyle "oyun", "zamanda", "kurban" gibi kelimeleri
+# yakalar; bunlar yalnızca listelenen çekimli halleriyle eşleşir
+_SHORT_ROOT_FORMS = {
+    "oy": r"oy(?:u|a|da|dan|lar|ları|larını|lara|larla)?",
+    "zam": r"zam(?:mı|ma|lı|lar|ları|lara)?",
+    "kur": r"kur(?:u|a|da|dan|lar|ları|lara|daki)?",
+}
+
+
+def _keyword_pattern(keyword):
+    """Anahtar kelime için kelime başından başlayan (çekim eklerine açık) desen"""
+    if keyword in _SHORT_ROOT_FORMS:
+        return re.compile(rf"\b{_SHORT_ROOT_FORMS[keyword]}\b")
+    return re.compile(rf"\b{re.escape(keyword)}")
+
+
+_CATEGORY_PATTERNS = {
+    category: [_keyword_pattern(keyword) for keyword in keywords]
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+
+def classify_question(text: str):
+    """
+    Soruyu kategorilere ayır.
+    Returns:
+        Eşleşme sayısına göre sıralı kategori listesi; hiçbiri eşleşmezse boş liste
+    """
+    text = (text or "").replace("İ", "i").replace("I", "ı").lower()
+    scores = {}
+    for category, patterns in _CATEGORY_PATTERNS.items():
+        score = sum(1 for pattern in patterns if pattern.search(text))
+        if score:
+            scores[category] = score
+    return sorted(scores, key=lambda category: -scores[category])
+
+
+def build_search_plan(keywords: str, categories, include_general=True):
+    """
+    Sıralı arama planı oluştur.
+    Kategori bulunamazsa orijinal plandaki tüm kategori aramaları yapılır;
+    bulunursa yalnızca eşleşen kategoriler, eşleşme gücüne göre sıralanır.
+    Args:
+        include_general: Sabit gündem aramaları plana eklensin mi (ön bellek yoksa)
+    """
+    plan = [{"query": keywords, "num_results": 8, "label": "ANA ARAMA", "recent": True, "general": False}]
+
+    selected = list(categories) or list(CATEGORY_QUERIES)
+    for rank, category in enumerate(selected):
+        config = CATEGORY_QUERIES[category]
+        num_results = config["num_results"]
+        if categories and rank == 0:
+            num_results += PRIMARY_EXTRA_RESULTS
+        plan.append({
+            "query": f"{keywords} {config['suffix']}",
+            "num_results": num_results,
+            "label": config["label"],
+            "recent": config["recent"],
+            "general": False,
+        })
+
+    if include_general:
+        for config in GENERAL_NEWS_QUERIES:
+            plan.append({
+                "query": config["query"],
+                "num_results": config["num_results"],
+                "label": config["label"],
+                "recent": "start_published_date" in config,
+                "general": True,
+            })
+
+    return plan
+
+
+class CoverageTracker:
+    """Toplanan sonuçlardaki farklı kaynak (alan adı) ve haber (URL) sayısı"""
+
+    def __init__(self, min_sources=MIN_UNIQUE_SOURCES, min_articles=MIN_UNIQUE_ARTICLES):
+        self.min_sources = min_sources
+        self.min_articles = min_articles
+        self.sources = set()
+        self.articles = set()
+
+    def add(self, text: str):
+        for url in _URL_RE.findall(text or ""):
+            url = url.rstrip(".,;")
+            domain = urlparse(url).netloc.lower()
+            if domain.startswith("www."):
+                domain = domain[4:]
+            if domain:
+                self.sources.add(domain)
+                self.articles.add(url)
+
+    def sufficient(self):
+        return len(self.sources) >= self.min_sources and len(self.articles) >= self.min_articles
+
+
+class PlanStats:
+    """Process genelinde atlanan arama ve tasarruf edilen veri sayaçları"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.plans = 0
+        self.executed = 0
+        self.skipped = 0
+        self.bytes_saved = 0
+        self.by_category = {}
+
+    def record(self, category, executed, skipped, bytes_saved):
+        with self._lock:
+            self.plans += 1
+            self.executed += executed
+            self.skipped += skipped
+            self.bytes_saved += bytes_saved
+            self.by_category[category] = self.by_category.get(category, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "plans": self.plans,
+                "executed": self.executed,
+                "skipped": self.skipped,
+                "bytes_saved": self.bytes_saved,
+                "by_category": dict(self.by_category),
+            }
+
+
+plan_stats = PlanStats()
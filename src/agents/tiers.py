@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Cevap Katmanları
+Tek persona motoru (PersonaAgent) üç katmanda çalışır; katman istek başına
+seçilir (arayüz, CLI --tier, API "tier"):
+
+- fast:     Tek LLM çağrısı (final cevap). Arama yok.
+- standard: Yerel haber arşivi ve gündem ön belleğinden haber (Exa'ya gidilmez)
+            + cevap planı + final cevap: en fazla 2 LLM çağrısı.
+- deep:     Tam sequential thinking pipeline'ı ve taze web araması: en fazla
+            7 LLM çağrısı (soru analizi, arama kararı, arama terimleri, haber
+            özeti, persona analizi, cevap planı, final) ve 8 Exa araması.
+
+Gecikme değerleri sağlıklı key'lerle tipik aralıklardır; gerçekleşen
+yüzdelikler /health "tiers" altında izlenir. Süre bütçesi katmanın
+deadline_seconds değeridir; CHAT_DEADLINE_SECONDS ile sınırlanır (deep için
+doğrudan CHAT_DEADLINE_SECONDS, 0 = hepsinde sınırsız).
+"""
+
+import os
+import threading
+
+from src.utils.deadline import chat_deadline_seconds
+from src.utils.latency import LatencyTracker
+
+TIER_FAST = "fast"
+TIER_STANDARD = "standard"
+TIER_DEEP = "deep"
+
+TIERS = {
+    TIER_FAST: {
+        "label": "⚡ Hızlı",
+        "description": "Tek çağrı, arama yok",
+        "llm_calls": 1,
+        "searches": 0,
+        "latency": "2-5 sn",
+        "deadline_seconds": 15.0,
+    },
+    TIER_STANDARD: {
+        "label": "⚖️ Standart",
+        "description": "Arşivden haber + cevap planı",
+        "llm_calls": 2,
+        "searches": 0,
+        "latency": "4-10 sn",
+        "deadline_seconds": 25.0,
+    },
+    TIER_DEEP: {
+        "label": "🧠 Derin",
+        "description": "Tam sequential thinking + taze web araması",
+        "llm_calls": 7,
+        "searches": 8,
+        "latency": "15-45 sn",
+        # None: CHAT_DEADLINE_SECONDS
+        "deadline_seconds": None,
+    },
+}
+
+_latency = {tier: LatencyTracker() for tier in TIERS}
+_lock = threading.Lock()
+_counts = {tier: 0 for tier in TIERS}
+
+
+def default_tier():
+    """PERSONA_TIER (varsayılan: deep); geçersiz değerde deep"""
+    tier = (os.getenv("PERSONA_TIER") or TIER_DEEP).lower()
+    return tier if tier in TIERS else TIER_DEEP
+
+
+def resolve_tier(tier=None):
+    """
+    Katman adını doğrula; None ise varsayılan katman.
+    Raises:
+        ValueError: Bilinmeyen katman
+    """
+    if tier is None:
+        return default_tier()
+    tier = str(tier).lower()
+    if tier not in TIERS:
+        raise ValueError(f"Bilinmeyen katman: {tier} ({', '.join(TIERS)})")
+    return tier
+
+
+def tier_deadline(tier):
+    """Katmanın süre bütçesi (saniye): deadline_seconds, CHAT_DEADLINE_SECONDS ile sınırlı; 0 = sınırsız"""
+    chat_deadline = chat_deadline_seconds()
+    seconds = TIERS[tier]["deadline_seconds"]
+    if seconds is None or not chat_deadline:
+        return chat_deadline
+    return min(seconds, chat_deadline)
+
+
+def record_tier(tier, seconds):
+    with _lock:
+        _counts[tier] += 1
+    _latency[tier].add(seconds)
+
+
+def describe_tiers():
+    """Katmanların belgelenmiş bütçeleri (API /personas ve arayüz için)"""
+    return {tier: dict(spec) for tier, spec in TIERS.items()}
+
+
+def tier_stats():
+    """Katman başına istek sayısı ve gerçekleşen gecikme yüzdelikleri"""
+    with _lock:
+        counts = dict(_counts)
+    return {tier: {"requests": counts[tier], "budget_latency": TIERS[tier]["latency"], **_latency[tier].summary()}
+            for tier in TIERS}
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Asenkron HTTP API
+PersonaAgent motorunu diğer servislere açar. Agent'lar, MCP oturumu ve key
+havuzu tüm isteklerce paylaşılır; istek başına yalnızca oturum geçmişi tutulur
+(bütçeli oturum belleğinde; boşta kalan oturumlar diske taşınır).
+
+Kullanım:
+    python -m src.api.server --port 8080
+
+Endpoint'ler:
+    GET  /health                      Key havuzu, arama ve gündem ön belleği durumu
+    GET  /personas                    Mevcut persona'lar ve cevap katmanları
+    POST /chat    {"persona", "message", "session_id"?, "deadline"?, "priority"?, "tier"?}
+    POST /panel   {"personas": [...], "message", "session_id"?, "mode"?, "priority"?, "tier"?}
+    POST /search  {"keywords", "persona"?, "question"?, "session_id"?, "deadline"?, "priority"?}
+    POST /cancel  {"session_id"}      Oturumun uçuştaki sohbetini iptal et
+    GET  /profiles                    Son istek profilleri; GET /profiles/{dosya} ile indirilir
+    ?stream=1 (veya Accept: text/event-stream) ile /chat ve /panel SSE akışı döner:
+    "queue", "stage", "token", "done", "cancelled" ve "error" olayları.
+    "priority": "interactive" (varsayılan) veya "batch"; sohbetler ve aramalar process
+    genelinde sınırlı sayıda slotla, oturumlar arasında sırayla işlenir.
+    "profile": true (veya ?profile=1) ile /chat ve /panel isteğinin profili çıkarılır.
+    "tier": "fast", "standard" veya "deep" (varsayılan: PERSONA_TIER); katmanların
+    çağrı/arama bütçeleri ve gecikmeleri GET /personas altında "tiers" ile döner.
+    Aynı oturumdan yeni bir sohbet gelirse veya istemci bağlantıyı kapatırsa
+    uçuştaki sohbet (aramaları ve LLM istekleriyle birlikte) iptal edilir.
+"""
+
+import argparse
+import asyncio
+import json
+import uuid
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from src.agents.main import (PersonaAgent, PersonaSession, chat_listener, coalescing_stats, emit_chat_event,
+                             search_plan_stats, start_news_prefetch)
+from src.agents.panel import MODE_AUTO, MODES, PersonaPanel
+from src.agents.tiers import TIERS, describe_tiers, resolve_tier, tier_stats
+from src.utils.admission import INTERACTIVE, LANES, get_admission_controller
+from src.utils.cancellation import ChatCancelled, get_chat_tasks, run_cancellable
+from src.utils.deadline import chat_deadline_seconds, deadline_scope
+from src.utils.exa_search import get_search_client
+from src.utils.gemini_client import get_gemini_client
+from src.utils.news_corpus import get_news_corpus
+from src.utils.news_prefetch import get_news_prefetcher
+from src.utils.personas import list_personas
+from src.utils.profiling import latest_profiles, profile_file, profile_request
+from src.utils.session_memory import get_session_memory
+from src.utils.token_usage import get_token_ledger, usage_scope
+
+MAX_MESSAGE_LENGTH = 4000
+
+# Kuyrukta bekleyen SSE istemcilerine sıra bilgisinin gönderilme aralığı (saniye)
+QUEUE_UPDATE_SECONDS = 1.0
+
+
+def get_agent(app, persona_id):
+    """Persona için paylaşılan agent'ı döndür (ilk istekte oluşturulur)"""
+    if persona_id not in app["persona_ids"]:
+        raise web.HTTPNotFound(text=json.dumps({"error": f"Bilinmeyen persona: {persona_id}"}),
+                               content_type="application/json")
+
+    agents = app["agents"]
+    if persona_id not in agents:
+        agents[persona_id] = PersonaAgent(persona_id, client=app["client"], search_client=app["search"])
+    return agents[persona_id]
+
+
+def default_persona_id(app):
+    """İstekte persona verilmediğinde kullanılan ilk persona; hiç persona yoksa 503"""
+    if not app["persona_ids"]:
+        raise web.HTTPServiceUnavailable(text=json.dumps({"error": "Yüklü persona yok"}),
+                                         content_type="application/json")
+    return app["persona_ids"][0]
+
+
+async def read_json(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Geçersiz JSON"}), content_type="application/json")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "JSON nesnesi bekleniyor"}),
+                                 content_type="application/json")
+    return body
+
+
+def read_message(body):
+    message = str(body.get("message", "")).strip()
+    if not message:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "'message' boş olamaz"}),
+                                 content_type="application/json")
+    return message[:MAX_MESSAGE_LENGTH]
+
+
+def read_deadline(body):
+    """İsteğe özel süre bütçesi (saniye); verilmezse CHAT_DEADLINE_SECONDS"""
+    value = body.get("deadline")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "'deadline' sayı olmalı"}),
+                                 content_type="application/json")
+
+
+def read_lane(body):
+    lane = body.get("priority", INTERACTIVE)
+    if lane not in LANES:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"'priority' şunlardan biri olmalı: {', '.join(LANES)}"}),
+                                 content_type="application/json")
+    return lane
+
+
+def read_mode(body):
+    mode = body.get("mode", MODE_AUTO)
+    if mode not in MODES:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"'mode' şunlardan biri olmalı: {', '.join(MODES)}"}),
+                                 content_type="application/json")
+    return mode
+
+
+def read_tier(body):
+    """İstek bazlı cevap katmanı; verilmezse None (PERSONA_TIER uygulanır)"""
+    tier = body.get("tier")
+    if tier is None:
+        return None
+    try:
+        return resolve_tier(tier)
+    except ValueError:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"'tier' şunlardan biri olmalı: {', '.join(TIERS)}"}),
+                                 content_type="application/json")
+
+
+async def wait_for_turn(ticket):
+    """Slot açılana kadar bekle; akış varsa sıra bilgisini 'queue' olayı olarak gönder"""
+    while not ticket.admitted:
+        await emit_chat_event("queue", {"position": ticket.position(), "eta_seconds": round(ticket.eta())})
+        await ticket.wait(timeout=QUEUE_UPDATE_SECONDS)
+
+
+def read_profile(request, body):
+    """İstek bazlı profil seçimi; verilmezse None (PROFILE_SAMPLE_RATE uygulanır)"""
+    if request.query.get("profile") in ("1", "true") or body.get("profile") is True:
+        return True
+    return None
+
+
+def wants_stream(request):
+    return request.query.get("stream") in ("1", "true") or \
+        "text/event-stream" in request.headers.get("Accept", "")
+
+
+async def sse_response(request):
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+
+    async def send(event, data):
+        payload = json.dumps(data, ensure_ascii=False)
+        await response.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+
+    return response, send
+
+
+async def run_streamed(request, work):
+    """work() sonucunu SSE olarak döndür; aşama/token olayları akış boyunca gönderilir"""
+    response, send = await sse_response(request)
+    try:
+        with chat_listener(send):
+            result = await work()
+        await send("done", result)
+    except (ConnectionResetError, asyncio.CancelledError):
+        raise
+    except ChatCancelled as e:
+        await send("cancelled", {"error": str(e)})
+    except Exception as e:
+        await send("error", {"error": str(e)})
+    await response.write_eof()
+    return response
+
+
+async def respond(request, session_id, work):
+    """
+    work()'ü oturumun iptal edilebilir sohbeti olarak çalıştır; JSON veya SSE döndür.
+    Aynı oturumdaki önceki sohbet iptal edilir; iptal edilen istek 409 döner.
+    """
+    async def cancellable():
+        return await run_cancellable(request.app["chats"], session_id, work())
+
+    if wants_stream(request):
+        return await run_streamed(request, cancellable)
+    try:
+        return web.json_response(await cancellable())
+    except ChatCancelled as e:
+        return web.json_response({"error": str(e), "session_id": session_id, "cancelled": True}, status=409)
+
+
+async def handle_health(request):
+    app = request.app
+    return web.json_response({
+        "status": "ok",
+        "keys": app["client"].key_pool.stats(),
+        "llm": app["client"].stats(),
+        "search": app["search"].configured,
+        "search_breaker": app["search"].breaker.status(),
+        "admission": app["admission"].status(),
+        "chats": app["chats"].status(),
+        "coalesced": coalescing_stats(app["search"]),
+        "prefetch": get_news_prefetcher().status(),
+        "search_plan": search_plan_stats(),
+        "news_corpus": get_news_corpus().status() if get_news_corpus() else None,
+        "tokens": get_token_ledger().snapshot(),
+        "agents": sorted(app["agents"]),
+        "sessions": app["sessions"].status(),
+        "tiers": tier_stats(),
+    })
+
+
+async def handle_personas(request):
+    return web.json_response({"personas": request.app["persona_ids"], "tiers": describe_tiers()})
+
+
+async def handle_chat(request):
+    body = await read_json(request)
+    message = read_message(body)
+    persona_id = str(body.get("persona", ""))
+    session_id = str(body.get("session_id") or uuid.uuid4().hex)
+    deadline = read_deadline(body)
+    lane = read_lane(body)
+    profile = read_profile(request, body)
+    tier = read_tier(body)
+
+    agent = get_agent(request.app, persona_id)
+    history = request.app["sessions"].history(session_id, persona_id)
+
+    async def work():
+        ticket = request.app["admission"].enqueue(session_id, lane)
+        try:
+            await wait_for_turn(ticket)
+            with usage_scope(session_id):
+                answer = await agent.chat(message, history=history, deadline=deadline, profile=profile,
+                                          tier=tier)
+        finally:
+            ticket.release()
+        return {"persona": persona_id, "session_id": session_id, "answer": answer}
+
+    return await respond(request, session_id, work)
+
+
+async def handle_panel(request):
+    body = await read_json(request)
+    message = read_message(body)
+    persona_ids = body.get("personas") or request.app["persona_ids"] or [default_persona_id(request.app)]
+    if not isinstance(persona_ids, list):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "'personas' liste olmalı"}),
+                                 content_type="application/json")
+    session_id = str(body.get("session_id") or uuid.uuid4().hex)
+    mode = read_mode(body)
+    lane = read_lane(body)
+    profile = read_profile(request, body)
+    tier = read_tier(body)
+
+    sessions = request.app["sessions"]
+    panel = PersonaPanel({
+        persona_id: PersonaSession(get_agent(request.app, persona_id), sessions.history(session_id, persona_id))
+        for persona_id in persona_ids
+    }, client=request.app["client"], admission=request.app["admission"], tenant=session_id)
+
+    async def work():
+        ticket = request.app["admission"].enqueue(session_id, lane)
+        try:
+            await wait_for_turn(ticket)
+            with usage_scope(session_id), profile_request("api:panel", profile):
+                answers = await panel.answer(message, mode=mode, tier=tier)
+        finally:
+            ticket.release()
+        return {"session_id": session_id, "mode": panel.last_mode, "answers": answers}
+
+    return await respond(request, session_id, work)
+
+
+async def handle_search(request):
+    body = await read_json(request)
+    keywords = str(body.get("keywords", "")).strip()
+    if not keywords:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "'keywords' boş olamaz"}),
+                                 content_type="application/json")
+
+    persona_id = str(body.get("persona") or default_persona_id(request.app))
+    question = str(body.get("question", ""))[:MAX_MESSAGE_LENGTH]
+    session_id = str(body.get("session_id") or uuid.uuid4().hex)
+    deadline = read_deadline(body)
+    lane = read_lane(body)
+    agent = get_agent(request.app, persona_id)
+
+    async def work():
+        # Aramalar da sohbetlerle aynı slotları kullanır; süre bütçesi yoksa CHAT_DEADLINE_SECONDS uygulanır
+        ticket = request.app["admission"].enqueue(session_id, lane)
+        try:
+            await wait_for_turn(ticket)
+            with usage_scope(session_id), \
+                    deadline_scope(chat_deadline_seconds() if deadline is None else deadline):
+                search_data = await agent.search_web_detailed(keywords[:MAX_MESSAGE_LENGTH], question=question)
+        finally:
+            ticket.release()
+        search_data.pop("raw_results", None)
+        search_data["persona"] = persona_id
+        search_data["session_id"] = session_id
+        return search_data
+
+    return await respond(request, session_id, work)
+
+
+async def handle_cancel(request):
+    body = await read_json(request)
+    session_id = str(body.get("session_id", "")).strip()
+    if not session_id:
+        raise web.HTTPBadRequest(text=json.dumps({"error": "'session_id' boş olamaz"}),
+                                 content_type="application/json")
+    return web.json_response({"session_id": session_id, "cancelled": request.app["chats"].cancel(session_id)})
+
+
+async def handle_profiles(request):
+    return web.json_response({"profiles": latest_profiles(limit=20)})
+
+
+async def handle_profile_file(request):
+    path = profile_file(request.match_info["filename"])
+    if path is None:
+        raise web.HTTPNotFound(text=json.dumps({"error": "Profil bulunamadı"}), content_type="application/json")
+    if path.endswith(".folded"):
+        return web.FileResponse(path, headers={"Content-Type": "text/plain; charset=utf-8"})
+    return web.FileResponse(path)
+
+
+async def start_background_tasks(app):
+    if app["persona_ids"]:
+        start_news_prefetch(get_agent(app, app["persona_ids"][0]))
+
+
+async def close_shared_clients(app):
+    await get_news_prefetcher().stop()
+    await app["client"].close()
+    await app["search"].close()
+
+
+def create_app():
+    """Paylaşılan istemcilerle aiohttp uygulamasını oluştur"""
+    app = web.Application(client_max_size=64 * 1024)
+    app["client"] = get_gemini_client()
+    app["search"] = get_search_client()
+    app["persona_ids"] = list_personas()
+    app["agents"] = {}
+    app["sessions"] = get_session_memory()
+    app["admission"] = get_admission_controller()
+    app["chats"] = get_chat_tasks()
+
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/personas", handle_personas)
+    app.router.add_post("/chat", handle_chat)
+    app.router.add_post("/panel", handle_panel)
+    app.router.add_post("/search", handle_search)
+    app.router.add_post("/cancel", handle_cancel)
+    app.router.add_get("/profiles", handle_profiles)
+    app.router.add_get("/profiles/{filename}", handle_profile_file)
+
+    app.on_startup.append(start_background_tasks)
+    app.on_cleanup.append(close_shared_clients)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mini Microcosmos - HTTP API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    load_dotenv(dotenv_path='config/.env')
+
+    print("🎭 Mini Microcosmos API")
+    print(f"🌐 http://{args.host}:{args.port}")
+    # İstemci bağlantıyı kapatınca handler (ve sohbeti) iptal edilir; aksi halde cevapsız iş sürer
+    web.run_app(create_app(), host=args.host, port=args.port, print=None, handler_cancellation=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,24 +5,34 @@ Mini Microcosmos - Minimalist Single Interface
 Black theme optimized, sequential persona responses
 """
 
-import json
 import os
-import asyncio
 import sys
-import time
-import random
-from datetime import datetime
+import threading
+import uuid
+from concurrent.futures import CancelledError
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
-import google.generativeai as genai
-from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
 
 import streamlit as st
 
 # Path setup
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 
+from src.agents.main import PersonaAgent, PersonaSession
+from src.agents.panel import PersonaPanel, MODE_AUTO, MODE_BATCHED, MODE_INDIVIDUAL
+from src.agents.tiers import TIER_FAST, TIERS, tier_stats
+from src.utils.exa_search import get_search_client
+from src.utils.gemini_client import get_gemini_client
+from src.utils.key_pool import load_gemini_keys
+from src.utils.admission import get_admission_controller
+from src.utils.cancellation import get_chat_tasks
+from src.utils.event_loop import get_background_loop
+from src.utils.personas import list_personas
+from src.utils.profiling import latest_profiles, profile_file, profile_request
+from src.utils.session_memory import get_session_memory
+from src.utils.token_usage import run_in_scope
+from src.utils.warmup import mark_first_answer, report as warmup_report, start_warmup
+
 # Environment variables
 load_dotenv(dotenv_path='config/.env')
 
@@ -34,504 +44,67 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Minimalist Black Theme CSS
-st.markdown("""
-<style>
-/* CSS Variables */
-:root {
-  --bg-primary: #000000;
-  --bg-secondary: #111111;
-  --bg-tertiary: #1a1a1a;
-  --bg-card: #0a0a0a;
-
-  --text-primary: #ffffff;
-  --text-secondary: #e5e5e5;
-  --text-muted: #a3a3a3;
-  --text-dim: #737373;
-
-  --accent-primary: #3b82f6;
-  --accent-secondary: #8b5cf6;
-  --accent-success: #10b981;
-  --accent-warning: #f59e0b;
-  --accent-error: #ef4444;
-
-  --border-color: #262626;
-  --border-light: #404040;
-
-  --radius: 0.75rem;
-  --shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.3);
-}
-
-/* Reset */
-*, *::before, *::after {
-  box-sizing: border-box;
-}
-
-/* Hide Streamlit UI */
-#MainMenu, footer, .stActionButton, header[data-testid="stHeader"] {
-  display: none !important;
-}
-
-/* App Base */
-.stApp {
-  background: var(--bg-primary);
-  color: var(--text-primary);
-  font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif;
-}
-
-.main .block-container {
-  padding: 1rem !important;
-  max-width: 800px !important;
-}
-
-/* Header */
-.app-header {
-  text-align: center;
-  padding: 2rem 0 1.5rem 0;
-  border-bottom: 1px solid var(--border-color);
-  margin-bottom: 1.5rem;
-}
+# Minimalist Black Theme CSS (static/css/style.css)
+STYLESHEET_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'css', 'style.css')
 
-.app-title {
-  font-size: 2.25rem;
-  font-weight: 700;
-  background: linear-gradient(135deg, var(--accent-primary), var(--accent-secondary));
-  -webkit-background-clip: text;
-  -webkit-text-fill-color: transparent;
-  margin: 0;
-  letter-spacing: -0.02em;
-}
-
-.app-subtitle {
-  color: var(--text-muted);
-  font-size: 0.875rem;
-  margin-top: 0.5rem;
-  font-weight: 400;
-}
 
-/* Status Bar */
-.status-indicator {
-  display: inline-flex;
-  align-items: center;
-  gap: 0.5rem;
-  background: var(--bg-secondary);
-  border: 1px solid var(--border-color);
-  border-radius: var(--radius);
-  padding: 0.5rem 1rem;
-  margin-bottom: 1rem;
-  font-size: 0.875rem;
-  color: var(--text-secondary);
-}
+@st.cache_resource
+def load_stylesheet() -> str:
+    """Read the stylesheet once per process"""
+    with open(STYLESHEET_PATH, encoding="utf-8") as css:
+        return f"<style>\n{css.read()}</style>"
 
-.status-dot {
-  width: 8px;
-  height: 8px;
-  border-radius: 50%;
-  background: var(--accent-success);
-  animation: pulse 2s infinite;
-}
 
-@keyframes pulse {
-  0%, 100% { opacity: 1; }
-  50% { opacity: 0.5; }
-}
+st.markdown(load_stylesheet(), unsafe_allow_html=True)
 
-/* Chat Container - Removed */
-/* .chat-container removed as messages display directly */
 
-/* Personas Badge */
-.personas-info {
-  display: flex;
-  justify-content: center;
-  gap: 1rem;
-  margin-bottom: 1rem;
-  flex-wrap: wrap;
+# Persona display metadata: (label, emoji, description, css class)
+PERSONA_META = {
+    "tugrul_eski": ("Eski Tuğrul", "🎯", "Milliyetçi · Geleneksel", "eski"),
+    "tugrul_yeni": ("Yeni Tuğrul", "🔄", "Milliyetçi · CHP Geçiş", "yeni"),
+    "elif": ("Elif", "🎓", "Üniversiteli · Z Kuşağı", "elif"),
+    "hatice_teyze": ("Hatice Teyze", "🧕", "Emekli · Muhafazakâr", "hatice"),
+    "kenan_bey": ("Kenan Bey", "💼", "Beyaz Yaka · Şehirli", "kenan"),
 }
 
-.persona-badge {
-  background: var(--bg-secondary);
-  border: 1px solid var(--border-light);
-  border-radius: var(--radius);
-  padding: 0.5rem 1rem;
-  font-size: 0.75rem;
-  color: var(--text-secondary);
-  text-align: center;
-}
+DEFAULT_PERSONAS = ["tugrul_eski", "tugrul_yeni"]
 
-.persona-badge.eski {
-  border-color: var(--accent-error);
-  color: var(--accent-error);
-}
+# Messages drawn per history page; older pages are loaded on demand
+HISTORY_PAGE_SIZE = 10
 
-.persona-badge.yeni {
-  border-color: var(--accent-primary);
-  color: var(--accent-primary);
+GENERATION_MODES = {
+    MODE_AUTO: "⚖️ Otomatik",
+    MODE_BATCHED: "📦 Tek çağrı",
+    MODE_INDIVIDUAL: "🎭 Ayrı ayrı",
 }
 
-/* Chat Messages - Better contrast */
-div[data-testid="stChatMessage"] {
-  margin-bottom: 1rem !important;
-  opacity: 0;
-  animation: fadeIn 0.3s ease forwards;
-}
-
-@keyframes fadeIn {
-  to { opacity: 1; }
-}
-
-/* Message Bubbles - High contrast */
-div[data-testid="stChatMessage"] > div {
-  background: var(--bg-secondary) !important;
-  border: 1px solid var(--border-light) !important;
-  border-radius: var(--radius) !important;
-  padding: 1rem !important;
-  color: var(--text-primary) !important;
-  box-shadow: var(--shadow) !important;
-  max-width: 100% !important;
-}
-
-/* User Messages */
-div[data-testid="stChatMessage"][data-testid*="user"] > div {
-  background: linear-gradient(135deg, var(--accent-primary), var(--accent-secondary)) !important;
-  color: white !important;
-  border: none !important;
-}
-
-/* Assistant Messages - High contrast */
-div[data-testid="stChatMessage"][data-testid*="assistant"] > div {
-  background: var(--bg-tertiary) !important;
-  color: var(--text-primary) !important;
-  border: 1px solid var(--border-light) !important;
-}
-
-/* Message text - Force high contrast */
-div[data-testid="stChatMessage"] p,
-div[data-testid="stChatMessage"] div,
-div[data-testid="stChatMessage"] span {
-  color: inherit !important;
-  opacity: 1 !important;
-}
-
-/* Persona Headers in Messages */
-.persona-header-msg {
-  display: inline-flex;
-  align-items: center;
-  gap: 0.5rem;
-  font-weight: 600;
-  font-size: 0.875rem;
-  margin-bottom: 0.5rem;
-  padding: 0.25rem 0.75rem;
-  border-radius: 1rem;
-  background: rgba(255, 255, 255, 0.1);
-}
-
-.persona-header-msg.eski {
-  color: var(--accent-error);
-  background: rgba(239, 68, 68, 0.1);
-}
-
-.persona-header-msg.yeni {
-  color: var(--accent-primary);
-  background: rgba(59, 130, 246, 0.1);
-}
-
-/* Chat Input */
-div[data-testid="stChatInput"] > div {
-  background: var(--bg-secondary) !important;
-  border: 1px solid var(--border-light) !important;
-  border-radius: var(--radius) !important;
-  transition: border-color 0.2s ease !important;
-}
-
-div[data-testid="stChatInput"] > div:focus-within {
-  border-color: var(--accent-primary) !important;
-  box-shadow: 0 0 0 2px rgba(59, 130, 246, 0.2) !important;
-}
-
-div[data-testid="stChatInput"] input {
-  background: transparent !important;
-  color: var(--text-primary) !important;
-  border: none !important;
-}
-
-div[data-testid="stChatInput"] input::placeholder {
-  color: var(--text-muted) !important;
-}
-
-/* Buttons */
-.stButton > button {
-  background: linear-gradient(135deg, var(--accent-primary), var(--accent-secondary)) !important;
-  color: white !important;
-  border: none !important;
-  border-radius: var(--radius) !important;
-  font-weight: 500 !important;
-  padding: 0.75rem 1.5rem !important;
-  transition: all 0.2s ease !important;
-  font-size: 0.875rem !important;
-}
-
-.stButton > button:hover {
-  transform: translateY(-1px) !important;
-  box-shadow: 0 8px 25px -5px rgba(59, 130, 246, 0.4) !important;
-}
-
-/* Control Panel */
-.control-panel {
-  margin-top: 1rem;
-  padding-top: 1rem;
-  border-top: 1px solid var(--border-color);
-  display: flex;
-  gap: 1rem;
-  justify-content: center;
-  flex-wrap: wrap;
-}
-
-/* Thinking Process */
-.streamlit-expanderHeader {
-  background: var(--bg-secondary) !important;
-  border: 1px solid var(--border-color) !important;
-  border-radius: var(--radius) !important;
-  color: var(--text-secondary) !important;
-  font-size: 0.875rem !important;
-}
-
-.streamlit-expanderContent {
-  background: var(--bg-primary) !important;
-  border: 1px solid var(--border-color) !important;
-  border-top: none !important;
-  color: var(--text-muted) !important;
-  font-size: 0.75rem !important;
-  max-height: 200px !important;
-  overflow-y: auto !important;
-}
-
-/* Alerts */
-.stSuccess {
-  background: rgba(16, 185, 129, 0.1) !important;
-  border: 1px solid var(--accent-success) !important;
-  color: var(--accent-success) !important;
-  border-radius: var(--radius) !important;
-}
-
-.stError {
-  background: rgba(239, 68, 68, 0.1) !important;
-  border: 1px solid var(--accent-error) !important;
-  color: var(--accent-error) !important;
-  border-radius: var(--radius) !important;
-}
-
-.stInfo {
-  background: rgba(59, 130, 246, 0.1) !important;
-  border: 1px solid var(--accent-primary) !important;
-  color: var(--accent-primary) !important;
-  border-radius: var(--radius) !important;
-}
-
-/* Loading */
-.stSpinner {
-  color: var(--accent-primary) !important;
-}
-
-/* Scrollbar - Apply to main content */
-.main .block-container::-webkit-scrollbar {
-  width: 6px;
-}
-
-.main .block-container::-webkit-scrollbar-track {
-  background: var(--bg-primary);
-}
-
-.main .block-container::-webkit-scrollbar-thumb {
-  background: var(--border-light);
-  border-radius: 3px;
-}
-
-/* Mobile */
-@media (max-width: 768px) {
-  .main .block-container {
-    padding: 0.75rem !important;
-  }
-
-  .app-title {
-    font-size: 1.75rem;
-  }
-
-  .personas-info {
-    flex-direction: column;
-    align-items: center;
-  }
-
-  .control-panel {
-    flex-direction: column;
-  }
-
-  .stButton > button {
-    width: 100% !important;
-  }
-}
-
-/* Force text readability */
-* {
-  -webkit-font-smoothing: antialiased;
-  -moz-osx-font-smoothing: grayscale;
-}
-</style>
-""", unsafe_allow_html=True)
 
+def persona_meta(persona_id: str):
+    """Display metadata for a persona (falls back to a generic badge)"""
+    return PERSONA_META.get(
+        persona_id, (persona_id.replace('_', ' ').title(), "🎭", "Persona", "")
+    )
 
-# Enhanced Agent Class (simplified for this interface)
-class MinimalistPersonaAgent:
-    def __init__(self, persona_name="tugrul_eski"):
-        self.persona_name = persona_name
 
-        # API key management
-        self.api_keys = self._load_gemini_keys()
-        self.current_api_index = 0
-
-        # Smithery API
-        self.smithery_api_key = os.getenv("SMITHERY_API_KEY")
-        self.smithery_profile = os.getenv("SMITHERY_PROFILE")
-
-        # Initialize model
-        self._initialize_model()
-
-        # Load persona
-        self.persona = self._load_persona(persona_name)
-        self.conversation_history = []
-
-    def _load_gemini_keys(self) -> List[str]:
-        """Load Gemini API keys"""
-        api_keys = []
-
-        main_key = os.getenv("GEMINI_API_KEY")
-        if main_key:
-            api_keys.append(main_key)
-
-        for i in range(1, 15):
-            key = os.getenv(f"GEMINI_API_KEY_{i}")
-            if key:
-                api_keys.append(key)
-
-        if not api_keys:
-            raise ValueError("❌ No GEMINI API keys found!")
-
-        random.shuffle(api_keys)
-        return api_keys
-
-    def _initialize_model(self):
-        """Initialize Gemini model"""
-        try:
-            genai.configure(api_key=self.api_keys[self.current_api_index])
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        except Exception as e:
-            raise Exception(f"Model initialization error: {e}")
-
-    def _load_persona(self, persona_name):
-        """Load persona"""
-        try:
-            persona_path = f'src/personas/{persona_name}.json'
-            with open(persona_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            return {
-                "name": persona_name.replace('_', ' ').title(),
-                "bio": ["Test persona"],
-                "style": {"chat": ["Normal konuşur"]},
-                "lore": [""],
-                "knowledge": [""]
-            }
-
-    def switch_api_key(self):
-        """Switch API key"""
-        self.current_api_index = (self.current_api_index + 1) % len(self.api_keys)
-        self._initialize_model()
-
-    async def try_with_rotation(self, prompt: str, max_retries: int = 3) -> str:
-        """Try with API rotation"""
-        for attempt in range(max_retries):
-            try:
-                response = await self.model.generate_content_async(prompt)
-                return response.text.strip()
-            except Exception as e:
-                if "429" in str(e) or "quota" in str(e).lower():
-                    if attempt < max_retries - 1:
-                        self.switch_api_key()
-                        continue
-                else:
-                    raise e
-        return "Sistem yoğunluğu nedeniyle geçici olarak hizmet veremiyorum."
-
-    def create_system_prompt(self):
-        """Create system prompt"""
-        bio_text = "\n- ".join(self.persona.get("bio", ["Bilinmiyor"])[:5])
-        style_text = "\n- ".join(self.persona.get("style", {}).get("chat", ["Normal konuşur"])[:3])
-        lore_text = "\n- ".join(self.persona.get("lore", [""])[:8])
-
-        return f"""Sen {self.persona["name"]}'sin.
-
-BİOGRAFİ:
-- {bio_text}
-
-KONUŞMA TARZI:
-- {style_text}
-
-KARAKTERIN:
-- {lore_text}
-
-KURALLAR:
-- Karakterine uygun davran
-- Samimi ve gerçekçi ol
-- 2-3 paragraf cevap ver"""
-
-    async def chat(self, user_input: str) -> str:
-        """Main chat function"""
-        # Check for current topics
-        search_triggers = ["son", "güncel", "haber", "gündem", "2024", "2025"]
-        needs_search = any(trigger in user_input.lower() for trigger in search_triggers)
-
-        current_date = datetime.now().strftime("%d %B %Y")
-
-        # Build context
-        context = ""
-        if needs_search and self.smithery_api_key:
-            context = "Güncel haberlere erişimin var. "
-
-        # Final prompt
-        final_prompt = f"""{self.create_system_prompt()}
-
-BUGÜN: {current_date}
-{context}
-
-Kullanıcı: "{user_input}"
-
-Karakterine uygun, detaylı cevap ver:"""
-
-        try:
-            response_text = await self.try_with_rotation(final_prompt)
-
-            # Add to history
-            self.conversation_history.append({
-                'user': user_input,
-                'assistant': response_text
-            })
-
-            # Keep last 2 conversations
-            if len(self.conversation_history) > 2:
-                self.conversation_history = self.conversation_history[-2:]
-
-            return response_text
-
-        except Exception as e:
-            return "Şu anda teknik sorun yaşıyorum, özür dilerim."
+@st.cache_resource
+def get_persona_engine(persona_id: str) -> PersonaAgent:
+    """One engine per persona for the whole process; the tier is chosen per message"""
+    return PersonaAgent(persona_id)
 
 
 # Session state initialization
 def init_session_state():
     """Initialize session state"""
     defaults = {
-        "messages": [],
         "processing": False,
         "agents_initialized": False,
+        "session_id": uuid.uuid4().hex,
+        "selected_personas": list(DEFAULT_PERSONAS),
+        "generation_mode": MODE_AUTO,
+        # Single-call answers keep the chat snappy; deeper tiers are opt-in per message
+        "tier": TIER_FAST,
+        "profile_requests": False,
+        "history_window": HISTORY_PAGE_SIZE,
         "thinking_logs": []
     }
 
@@ -550,62 +123,262 @@ def render_header():
     """, unsafe_allow_html=True)
 
 
-def render_personas_info():
+def render_personas_info(persona_ids: List[str]):
     """Render personas information"""
-    st.markdown("""
+    badges = []
+    for persona_id in persona_ids:
+        label, emoji, description, css_class = persona_meta(persona_id)
+        badges.append(f"""<div class="persona-badge {css_class}">
+            {emoji} {label} · {description}
+        </div>""")
+
+    st.markdown(f"""
     <div class="personas-info">
-        <div class="persona-badge eski">
-            🎯 Eski Tuğrul · Milliyetçi · Geleneksel
-        </div>
-        <div class="persona-badge yeni">
-            🔄 Yeni Tuğrul · Milliyetçi · CHP Geçiş
-        </div>
+        {"".join(badges)}
     </div>
     """, unsafe_allow_html=True)
 
 
+def render_persona_selector():
+    """Render persona panel selection, generation mode and answer tier"""
+    col1, col2, col3 = st.columns([3, 1, 1])
+
+    with col1:
+        st.multiselect(
+            "Persona paneli",
+            options=list_personas(),
+            key="selected_personas",
+            format_func=lambda persona_id: f"{persona_meta(persona_id)[1]} {persona_meta(persona_id)[0]}",
+            label_visibility="collapsed",
+            disabled=st.session_state.processing
+        )
+
+    with col2:
+        st.selectbox(
+            "Üretim modu",
+            options=list(GENERATION_MODES),
+            key="generation_mode",
+            format_func=GENERATION_MODES.get,
+            label_visibility="collapsed",
+            help="Tek çağrı: tüm persona'lar tek istekte cevaplanır (quota sıkışıkken otomatik seçilir)"
+        )
+
+    with col3:
+        st.selectbox(
+            "Cevap katmanı",
+            options=list(TIERS),
+            key="tier",
+            format_func=lambda tier: TIERS[tier]["label"],
+            label_visibility="collapsed",
+            help="\n".join(
+                f"{spec['label']}: {spec['description']} · {spec['llm_calls']} LLM çağrısı, "
+                f"{spec['searches']} arama · ~{spec['latency']}"
+                for spec in TIERS.values()
+            )
+        )
+
+
 def render_status():
     """Render system status"""
     if st.session_state.agents_initialized:
-        st.markdown("""
+        count = len(st.session_state.selected_personas)
+        st.markdown(f"""
         <div class="status-indicator">
             <div class="status-dot"></div>
-            <span>Sequential Thinking Aktif · 2 Persona Hazır</span>
+            <span>{TIERS[st.session_state.tier]["label"]} · {count} Persona Hazır</span>
         </div>
         """, unsafe_allow_html=True)
 
+        search_client = get_search_client()
+        if search_client.configured:
+            breaker = search_client.breaker.status()
+            retry_text = f" · {breaker['retry_in']:.0f} sn sonra tekrar denenecek" if breaker["retry_in"] else ""
+            st.caption(f"Web Arama: {breaker['label']}{retry_text}")
+
 
-def format_persona_response(persona_name: str, response: str, is_eski: bool = True) -> str:
+def format_persona_response(persona_id: str, response: str) -> str:
     """Format persona response with header"""
-    persona_class = "eski" if is_eski else "yeni"
-    emoji = "🎯" if is_eski else "🔄"
+    label, emoji, _, css_class = persona_meta(persona_id)
 
-    return f"""<div class="persona-header-msg {persona_class}">
-        {emoji} {persona_name}
+    return f"""<div class="persona-header-msg {css_class}">
+        {emoji} {label}
     </div>
 
 {response}"""
 
 
+def current_session():
+    """This browser session's messages and histories (budgeted; rebuilt from disk after idle eviction)"""
+    return get_session_memory().get(st.session_state.session_id)
+
+
+def add_message(role: str, content: str):
+    get_session_memory().append_message(st.session_state.session_id, {"role": role, "content": content})
+
+
+def ensure_agents(persona_ids: List[str]) -> Dict[str, PersonaSession]:
+    """Bind the shared persona engines to this session's conversation histories"""
+    session = current_session()
+    return {
+        persona_id: PersonaSession(get_persona_engine(persona_id), session.history(persona_id))
+        for persona_id in persona_ids
+    }
+
+
+def visible_messages(session, count: int):
+    """
+    Last `count` messages of the conversation; the disk archive is read only when
+    the window reaches past the messages kept in memory.
+    Returns:
+        (messages, number of older messages not shown)
+    """
+    messages = session.messages
+    if count > len(messages) and session.spilled_messages:
+        messages = get_session_memory().older_messages(session.session_id) + messages
+    hidden = max(0, session.spilled_messages + len(session.messages) - count)
+    return messages[-count:], hidden
+
+
+def render_message(role: str, content: str):
+    with st.chat_message(role):
+        st.markdown(content, unsafe_allow_html=True)
+
+
+def show_older_messages():
+    st.session_state.history_window += HISTORY_PAGE_SIZE
+
+
+@st.fragment
+def render_chat(selected_personas: List[str]):
+    """
+    Chat area as an isolated fragment: sending a message reruns only this part,
+    draws the new messages in place and re-renders at most one page of history.
+    """
+    session = current_session()
+    messages, hidden = visible_messages(session, st.session_state.history_window)
+    if hidden:
+        st.button(f"⬆️ Daha eski mesajlar ({hidden})", key="older_messages", on_click=show_older_messages)
+
+    for message in messages:
+        render_message(message["role"], message["content"])
+
+    if prompt := st.chat_input("💬 Persona'lara soru sor...", disabled=not selected_personas):
+        if not st.session_state.processing:
+            answer_prompt(prompt, selected_personas)
+
+
+def answer_prompt(prompt: str, selected_personas: List[str]):
+    """Run the persona panel for one message and draw both messages without a rerun"""
+    st.session_state.processing = True
+
+    # Add user message
+    add_message("user", prompt)
+    render_message("user", prompt)
+
+    # The panel runs on the shared background loop; session state is only
+    # touched here in the script thread
+    # Fan-out beyond the first persona takes extra slots in the batch lane
+    panel = PersonaPanel(ensure_agents(selected_personas), admission=get_admission_controller(),
+                         tenant=st.session_state.session_id)
+    mode = st.session_state.generation_mode
+    tier = st.session_state.tier
+
+    queue_status = st.empty()
+
+    def show_queue_position():
+        position = ticket.position()
+        if position:
+            queue_status.info(f"⏳ Sıradasınız: {position}. · tahmini bekleme ~{ticket.eta():.0f} sn")
+        else:
+            queue_status.empty()
+
+    # Profiles both this script thread (rendering) and the background loop (pipeline)
+    profile_threads = [threading.current_thread(), get_background_loop().thread]
+    with st.spinner(f"{TIERS[tier]['label']} · ~{TIERS[tier]['latency']}..."), \
+            profile_request("streamlit:chat", st.session_state.profile_requests or None, profile_threads):
+        try:
+            # Token usage is attributed to this browser session
+            work = run_in_scope(panel.answer(prompt, mode=mode, tier=tier), session=st.session_state.session_id)
+            loop = get_background_loop()
+            # Global admission: sessions take turns instead of exhausting keys together.
+            # Enqueued right before submission and released when the future settles, so a
+            # rerun in between or a cancel before the task starts cannot leak the slot
+            ticket = get_admission_controller().enqueue(st.session_state.session_id)
+            try:
+                # Registered per session: a newer message or "Temizle" cancels this chat,
+                # including its pending searches and LLM requests
+                future = get_chat_tasks().start(st.session_state.session_id, loop.submit(ticket.run(work)))
+            except BaseException:
+                ticket.release()
+                raise
+            future.add_done_callback(lambda _: ticket.release())
+            responses = loop.wait(future, on_wait=show_queue_position)
+            queue_status.empty()
+
+            # Format responses with persona headers and combine
+            content = "\n\n---\n\n".join(
+                format_persona_response(persona_id, response)
+                for persona_id, response in responses.items()
+            )
+            mark_first_answer()
+
+        except CancelledError:
+            queue_status.empty()
+            content = "⏹️ Cevap iptal edildi."
+        except Exception as e:
+            content = f"❌ Sistem hatası: {e}"
+        finally:
+            st.session_state.processing = False
+
+    # Add assistant message
+    add_message("assistant", content)
+    render_message("assistant", content)
+
+
+def render_memory_gauges():
+    """Session memory against its per-session and per-process budgets"""
+    memory = get_session_memory()
+    status = memory.status()
+    own = current_session().size()
+    st.caption(f"🧠 Bu oturum: {own / 1024:.0f} / {status['session_budget_bytes'] / 1024:.0f} KB")
+    st.progress(min(1.0, own / status["session_budget_bytes"]) if status["session_budget_bytes"] else 0.0)
+    st.caption(f"🧠 Tüm oturumlar ({status['sessions']}): {status['bytes'] / 1024 ** 2:.1f} / "
+               f"{status['process_budget_bytes'] / 1024 ** 2:.0f} MB"
+               + (f" · RSS {status['rss_bytes'] / 1024 ** 2:.0f} MB" if status["rss_bytes"] else ""))
+    st.progress(min(1.0, status["process_usage"] or 0.0))
+    st.json(status, expanded=False)
+
+
+def render_latest_profiles(limit: int = 3):
+    """Download links for the most recent request profiles"""
+    for summary in latest_profiles(limit):
+        st.caption(f"🔬 {summary['name']} · {summary['duration_seconds']} sn · {summary['wall_samples']} örnek")
+        for filename in summary["files"]:
+            path = profile_file(filename)
+            if path is None:
+                continue
+            with open(path, "rb") as profile:
+                st.download_button(f"⬇️ {filename}", data=profile.read(), file_name=filename,
+                                   mime="text/plain", key=f"profile-{filename}")
+
+
 # Main application
+@st.cache_resource
+def ensure_warmup():
+    """Start the warmup once per process when launched directly with `streamlit run`"""
+    return start_warmup()
+
+
 def main():
     """Minimalist main application"""
+    ensure_warmup()
     init_session_state()
 
     # Header
     render_header()
 
     # API key check
-    gemini_keys = []
-    main_key = os.getenv("GEMINI_API_KEY")
-    if main_key:
-        gemini_keys.append(main_key)
-
-    for i in range(1, 15):
-        key = os.getenv(f"GEMINI_API_KEY_{i}")
-        if key:
-            gemini_keys.append(key)
-
+    gemini_keys = load_gemini_keys()
     if not gemini_keys:
         st.error("❌ GEMINI API KEY bulunamadı! config/.env dosyasını kontrol edin.")
         st.stop()
@@ -613,69 +386,25 @@ def main():
     # Status
     render_status()
 
+    # Persona panel selection
+    render_persona_selector()
+    selected_personas = st.session_state.selected_personas
+
     # Personas info
-    render_personas_info()
+    render_personas_info(selected_personas)
 
     # Agent initialization
     if not st.session_state.agents_initialized:
         with st.spinner("🤖 Persona Agent'lar yükleniyor..."):
             try:
-                st.session_state.eski_tugrul_agent = MinimalistPersonaAgent("tugrul_eski")
-                st.session_state.yeni_tugrul_agent = MinimalistPersonaAgent("tugrul_yeni")
+                ensure_agents(selected_personas)
                 st.session_state.agents_initialized = True
-                st.success("✅ Agent'lar hazır!")
-                time.sleep(1)
-                st.rerun()
             except Exception as e:
                 st.error(f"❌ Agent hatası: {e}")
                 st.stop()
 
-    # Display messages directly (no container)
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"], unsafe_allow_html=True)
-
-    # Chat input (moved to after personas)
-    if prompt := st.chat_input("💬 İki Tuğrul'a soru sor..."):
-        if not st.session_state.processing:
-            st.session_state.processing = True
-
-            # Add user message
-            user_message = {"role": "user", "content": prompt}
-            st.session_state.messages.append(user_message)
-
-            async def process_sequential_responses():
-                """Process sequential persona responses"""
-                try:
-                    # Get responses sequentially
-                    eski_response = await st.session_state.eski_tugrul_agent.chat(prompt)
-                    yeni_response = await st.session_state.yeni_tugrul_agent.chat(prompt)
-
-                    # Format responses with persona headers
-                    eski_formatted = format_persona_response("Eski Tuğrul", eski_response, True)
-                    yeni_formatted = format_persona_response("Yeni Tuğrul", yeni_response, False)
-
-                    # Combine responses
-                    combined_response = f"{eski_formatted}\n\n---\n\n{yeni_formatted}"
-
-                    # Add assistant message
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": combined_response
-                    })
-
-                except Exception as e:
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": f"❌ Sistem hatası: {e}"
-                    })
-                finally:
-                    st.session_state.processing = False
-
-            # Run async
-            with st.spinner("🧠 Sequential Thinking..."):
-                asyncio.run(process_sequential_responses())
-                st.rerun()
+    # Chat area reruns on its own; the rest of the page is not redrawn per message
+    render_chat(selected_personas)
 
     # Control panel
     st.markdown('<div class="control-panel">', unsafe_allow_html=True)
@@ -684,25 +413,39 @@ def main():
 
     with col1:
         if st.button("🗑️ Temizle"):
-            st.session_state.messages = []
+            # Stale answers would land in the cleared history; stop them with their searches
+            get_chat_tasks().cancel(st.session_state.session_id)
+            get_session_memory().clear(st.session_state.session_id)
+            st.session_state.history_window = HISTORY_PAGE_SIZE
             st.session_state.thinking_logs = []
             st.rerun()
 
     with col2:
         if st.button("🔄 API Değiştir"):
-            if st.session_state.agents_initialized:
-                st.session_state.eski_tugrul_agent.switch_api_key()
-                st.session_state.yeni_tugrul_agent.switch_api_key()
+            if st.session_state.agents_initialized and selected_personas:
+                # Engines share one key pool, so resting the last key once is enough
+                get_persona_engine(selected_personas[0]).switch_api_key()
                 st.success("🔄 API değiştirildi!")
 
     with col3:
         if st.button("📊 Durum"):
+            key_stats = get_gemini_client().key_pool.stats()
             st.info(f"""
             **Sistem Durumu**
-            - **Gemini Keys:** {len(gemini_keys)} toplam
+            - **Gemini Keys:** {len(gemini_keys)} toplam, {key_stats['healthy']} kullanılabilir
             - **Smithery API:** {'✅ Aktif' if os.getenv('SMITHERY_API_KEY') else '❌ Kapalı'}
-            - **Sequential Mode:** ✅ Aktif
+            - **Cevap katmanı:** {TIERS[st.session_state.tier]['label']} ({TIERS[st.session_state.tier]['description']})
             """)
+            st.json(tier_stats(), expanded=False)
+            st.json(get_admission_controller().status(), expanded=False)
+            st.json(get_chat_tasks().status(), expanded=False)
+            render_memory_gauges()
+            st.json(get_gemini_client().usage.snapshot(), expanded=False)
+            st.json(warmup_report(), expanded=False)
+            render_latest_profiles()
+
+    st.checkbox("🔬 Sonraki mesajların profilini çıkar", key="profile_requests",
+                help="Duvar saati ve CPU profilleri (flamegraph / speedscope) profil dizinine yazılır")
 
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Kabul Kontrolü (admission control)
+Process genelinde aynı anda işlenen sohbet isteği sayısını sınırlar. Bekleyen
+istekler oturumlar arasında sırayla (round-robin) kabul edilir; etkileşimli
+istekler toplu işlerden (panel çoğaltması, gündem ön belleği, batch öncelikli
+API istekleri) önce gelir. Böylece yük altında tüm oturumlar key'leri
+birlikte tüketmek yerine öngörülebilir bir kuyrukta bekler.
+"""
+
+import asyncio
+import itertools
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from src.utils.key_pool import get_key_pool
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+LANES = (INTERACTIVE, BATCH)
+
+# Bir sohbet ~6-8 LLM çağrısını ~10-15 sn içinde yapar: dakikada ~40 çağrı
+CALLS_PER_MINUTE_PER_REQUEST = 40
+
+# Ortalama işlem süresi ölçülene kadar ETA için kullanılan tahmin (saniye)
+DEFAULT_SERVICE_SECONDS = 15.0
+SERVICE_TIME_SMOOTHING = 0.2
+
+
+def default_max_in_flight():
+    """ADMISSION_MAX_IN_FLIGHT; verilmezse key havuzunun dakikalık kapasitesinden türetilir"""
+    value = os.getenv("ADMISSION_MAX_IN_FLIGHT")
+    if value:
+        return max(1, int(value))
+    try:
+        pool = get_key_pool()
+    except ValueError:
+        return 2
+    return max(2, len(pool) * pool.rpm_per_key // CALLS_PER_MINUTE_PER_REQUEST)
+
+
+class Ticket:
+    """Kuyruktaki tek bir istek"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, controller, tenant, lane):
+        self.id = next(self._ids)
+        self.controller = controller
+        self.tenant = tenant
+        self.lane = lane
+        self.enqueued_at = time.monotonic()
+        self.admitted_at = None
+        self.released = False
+        self._waiters = []
+
+    @property
+    def admitted(self):
+        return self.admitted_at is not None
+
+    def position(self):
+        """Kabul sırasındaki tahmini yeri (1 = sıradaki); kabul edildiyse 0"""
+        return self.controller.position(self)
+
+    def eta(self):
+        """Kabul edilene kadar tahmini bekleme (saniye)"""
+        return self.controller.eta(self)
+
+    def _notify(self):
+        for loop, future in self._waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, future)
+            except RuntimeError:
+                # Bekleyenin loop'u kapanmış (ör. sonlanan Streamlit oturumu); bu bekleyen düşürülür
+                pass
+        self._waiters.clear()
+
+    async def wait(self, timeout=None):
+        """
+        Kabul edilene kadar bekle.
+        Returns:
+            Kabul edildiyse True, timeout dolduysa False
+        Raises:
+            CancelledError: Bekleyen iptal edilirse bilet kuyruktan çıkarılır
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.controller._lock:
+            if self.admitted:
+                return True
+            self._waiters.append((loop, future))
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self.admitted
+        except asyncio.CancelledError:
+            self.release()
+            raise
+
+    def release(self):
+        """Slotu bırak (veya kuyruktan çık); birden fazla çağrı güvenlidir"""
+        self.controller.release(self)
+
+    async def run(self, coro):
+        """Kabul edilince coro'yu çalıştır, bitince slotu bırak"""
+        try:
+            await self.wait()
+            return await coro
+        finally:
+            self.release()
+            coro.close()
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class AdmissionController:
+    """
+    Thread-safe kabul kontrolü; farklı event loop'lar ve thread'ler (API,
+    Streamlit arka plan loop'u) aynı sınırı paylaşır.
+    """
+
+    def __init__(self, max_in_flight=None):
+        self.max_in_flight = max_in_flight or default_max_in_flight()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # lane -> tenant -> bilet kuyruğu; OrderedDict sırası round-robin sırasıdır
+        self._queues = {lane: OrderedDict() for lane in LANES}
+        self._service_seconds = DEFAULT_SERVICE_SECONDS
+        self.stats = {"admitted": 0, "queued": 0, "max_wait_seconds": 0.0}
+
+    def enqueue(self, tenant, lane=INTERACTIVE):
+        """İsteği kuyruğa al; slot boşsa hemen kabul edilir"""
+        if lane not in self._queues:
+            raise ValueError(f"Bilinmeyen öncelik: {lane}")
+
+        ticket = Ticket(self, str(tenant), lane)
+        with self._lock:
+            self._queues[lane].setdefault(ticket.tenant, deque()).append(ticket)
+            self._dispatch()
+            if not ticket.admitted:
+                self.stats["queued"] += 1
+        return ticket
+
+    def _next_ticket(self):
+        for lane in LANES:
+            queues = self._queues[lane]
+            if queues:
+                tenant, queue = next(iter(queues.items()))
+                ticket = queue.popleft()
+                del queues[tenant]
+                if queue:
+                    # Aynı oturumun diğer istekleri diğer oturumların arkasına geçer
+                    queues[tenant] = queue
+                return ticket
+        return None
+
+    def _dispatch(self):
+        while self._in_flight < self.max_in_flight:
+            ticket = self._next_ticket()
+            if ticket is None:
+                return
+            self._in_flight += 1
+            ticket.admitted_at = time.monotonic()
+            waited = ticket.admitted_at - ticket.enqueued_at
+            self.stats["admitted"] += 1
+            self.stats["max_wait_seconds"] = round(max(self.stats["max_wait_seconds"], waited), 2)
+            ticket._notify()
+
+    def release(self, ticket):
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+
+            if ticket.admitted:
+                self._in_flight -= 1
+                service = time.monotonic() - ticket.admitted_at
+                self._service_seconds += SERVICE_TIME_SMOOTHING * (service - self._service_seconds)
+            else:
+                queue = self._queues[ticket.lane].get(ticket.tenant)
+                if queue is not None and ticket in queue:
+                    queue.remove(ticket)
+                    if not queue:
+                        del self._queues[ticket.lane][ticket.tenant]
+            self._dispatch()
+
+    def position(self, ticket):
+        """
+        Round-robin sırasına göre tahmini yer: önceki öncelik kuyruklarının tamamı,
+        aynı kuyruktaki diğer oturumlardan en fazla (sıra + 1) istek ve kendi önündekiler.
+        """
+        with self._lock:
+            if ticket.admitted or ticket.released:
+                return 0
+
+            ahead = 0
+            for lane in LANES:
+                queues = self._queues[lane]
+                if lane != ticket.lane:
+                    ahead += sum(len(queue) for queue in queues.values())
+                    continue
+
+                own = queues.get(ticket.tenant, ())
+                index = list(own).index(ticket) if ticket in own else 0
+                ahead += index
+                ahead += sum(min(len(queue), index + 1)
+                             for tenant, queue in queues.items() if tenant != ticket.tenant)
+                break
+            return ahead + 1
+
+    def eta(self, ticket):
+        position = self.position(ticket)
+        if not position:
+            return 0.0
+        return math.ceil(position / self.max_in_flight) * self._service_seconds
+
+    async def run(self, tenant, coro, lane=INTERACTIVE):
+        """coro'yu slot aldıktan sonra çalıştır"""
+        return await self.enqueue(tenant, lane).run(coro)
+
+    def status(self):
+        with self._lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "waiting": {lane: sum(len(queue) for queue in self._queues[lane].values()) for lane in LANES},
+                "avg_service_seconds": round(self._service_seconds, 1),
+                **self.stats,
+            }
+
+
+_shared_controller = None
+_shared_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """Process genelinde paylaşılan kabul kontrolü"""
+    global _shared_controller
+    with _shared_lock:
+        if _shared_controller is None:
+            _shared_controller = AdmissionController()
+        return _shared_controller
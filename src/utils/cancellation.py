@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Sohbet İptali
+Her oturumun uçuştaki sohbeti kayıtlıdır. Kullanıcı sohbeti temizlediğinde,
+sekmeyi kapattığında veya yeni mesaj gönderdiğinde eski sohbet iptal edilir;
+iptal, bekleyen MCP araç çağrılarına ve LLM isteklerine kadar iner (bkz.
+SingleFlight: bekleyeni kalmayan paylaşılan iş de iptal edilir). Yarıda kalan
+sohbetin cevabı atılır; o ana kadar çekilen haberler yerel arşivde kalır.
+"""
+
+import asyncio
+import threading
+
+
+class ChatCancelled(Exception):
+    """Sohbet, yerine yenisi başlatıldığı veya iptal istendiği için yarıda kesildi"""
+
+
+class ChatTasks:
+    """
+    Oturum başına uçuştaki sohbet kaydı (thread-safe).
+    Hem asyncio.Task (API) hem concurrent.futures.Future (arka plan loop'una
+    gönderilen Streamlit işleri) kaydedilebilir.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = {}
+        self.stats = {"started": 0, "completed": 0, "cancelled": 0, "superseded": 0}
+
+    def start(self, session_id, future):
+        """
+        Oturumun yeni sohbetini kaydet; hâlâ süren eski sohbet iptal edilir.
+        Returns:
+            future (zincirleme kullanım için)
+        """
+        with self._lock:
+            previous = self._running.get(session_id)
+            self._running[session_id] = future
+            self.stats["started"] += 1
+            if previous is not None and not previous.done():
+                self.stats["superseded"] += 1
+            else:
+                previous = None
+
+        if previous is not None:
+            print("🛑 ESKİ SOHBET İPTAL: aynı oturumdan yeni mesaj geldi")
+            previous.cancel()
+
+        future.add_done_callback(lambda done: self._finish(session_id, done))
+        return future
+
+    def _finish(self, session_id, future):
+        with self._lock:
+            if self._running.get(session_id) is future:
+                del self._running[session_id]
+            if not future.cancelled():
+                self.stats["completed"] += 1
+
+    def cancel(self, session_id):
+        """
+        Oturumun uçuştaki sohbetini iptal et.
+        Returns:
+            İptal edilecek bir sohbet varsa True
+        """
+        with self._lock:
+            future = self._running.pop(session_id, None)
+            if future is None or future.done():
+                return False
+            self.stats["cancelled"] += 1
+
+        print("🛑 SOHBET İPTAL EDİLDİ")
+        future.cancel()
+        return True
+
+    def running(self, session_id):
+        with self._lock:
+            future = self._running.get(session_id)
+            return future is not None and not future.done()
+
+    def status(self):
+        with self._lock:
+            running = sum(1 for future in self._running.values() if not future.done())
+            return {"running": running, **self.stats}
+
+
+async def run_cancellable(tasks, session_id, coro):
+    """
+    coro'yu oturumun iptal edilebilir sohbeti olarak ayrı bir task'ta çalıştır.
+    Çağıranın kendisi iptal edilirse (ör. istemci bağlantıyı kapattı) sohbet de iptal edilir.
+    Raises:
+        ChatCancelled: Sohbet ChatTasks üzerinden iptal edildiyse
+    """
+    task = tasks.start(session_id, asyncio.ensure_future(coro))
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise
+        raise ChatCancelled("sohbet iptal edildi")
+
+
+_shared_tasks = ChatTasks()
+
+
+def get_chat_tasks():
+    """Process genelinde paylaşılan sohbet kaydı"""
+    return _shared_tasks
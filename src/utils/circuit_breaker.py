@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Devre Kesici
+Art arda hata veren bir bağımlılığı (ör. Exa/Smithery araması) bir süre devre
+dışı bırakır; süre dolunca tek bir deneme isteğiyle (yarı açık) tekrar yoklar.
+"""
+
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 30.0
+
+# Devre tekrar tekrar açılırsa bekleme süresi bu sınıra kadar ikiye katlanır
+MAX_RESET_TIMEOUT = 300.0
+
+STATE_LABELS = {
+    CLOSED: "🟢 Aktif",
+    OPEN: "🔴 Devre dışı",
+    HALF_OPEN: "🟡 Yoklanıyor",
+}
+
+
+class CircuitOpenError(Exception):
+    """Devre açık; bağımlılık çağrılmadan hemen reddedildi"""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe devre kesici.
+    closed: çağrılar serbest; failure_threshold art arda hatada open olur.
+    open: çağrılar reddedilir; reset_timeout sonra half_open olur.
+    half_open: tek bir deneme çağrısına izin verilir; başarılıysa closed, değilse tekrar open.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_for = reset_timeout
+        self._probe_in_flight = False
+        self.stats = {"trips": 0, "rejected": 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self._open_for:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def available(self):
+        """Çağrı yapılabilir mi (durumu değiştirmeden)"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return state == CLOSED or (state == HALF_OPEN and not self._probe_in_flight)
+
+    def admits(self):
+        """available() ile aynı, fakat reddedilen çağrıyı sayar (deneme hakkı almaz)"""
+        if self.available():
+            return True
+        with self._lock:
+            self.stats["rejected"] += 1
+        return False
+
+    def allow(self):
+        """Çağrıya izin ver; yarı açık durumda yalnızca ilk çağıran deneme hakkı alır"""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                print(f"🟡 {self.name.upper()} YOKLANIYOR: deneme isteği gönderiliyor")
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"🟢 {self.name.upper()} TEKRAR AKTİF")
+            self._state = CLOSED
+            self._failures = 0
+            self._open_for = self.reset_timeout
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Deneme çağrısı sonuçlanmadan iptal edildiyse hakkı geri ver"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            self._failures += 1
+            if state == HALF_OPEN:
+                self._open_for = min(self._open_for * 2, MAX_RESET_TIMEOUT)
+                self._trip(now)
+            elif state == CLOSED and self._failures >= self.failure_threshold:
+                self._trip(now)
+
+    def _trip(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self.stats["trips"] += 1
+        print(f"🔴 {self.name.upper()} DEVRE DIŞI: {self._failures} art arda hata, "
+              f"{self._open_for:.0f} sn sonra tekrar denenecek")
+
+    def status(self):
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            retry_in = max(0.0, self._open_for - (now - self._opened_at)) if state == OPEN else 0.0
+            return {
+                "state": state,
+                "label": STATE_LABELS[state],
+                "failures": self._failures,
+                "retry_in": round(retry_in, 1),
+                **self.stats,
+            }
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - İstek Süre Bütçesi (deadline)
+Sohbet başına bir bitiş zamanı contextvar olarak taşınır; arama, özet,
+düşünme ve cevap aşamaları kalan süreye bakarak daha ucuz yollara düşer.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import os
+import time
+
+DEFAULT_CHAT_DEADLINE_SECONDS = 45.0
+
+_deadline = contextvars.ContextVar("chat_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Aşama için süre bütçesi kalmadı"""
+
+
+def chat_deadline_seconds():
+    """CHAT_DEADLINE_SECONDS (saniye); 0 süre sınırını kapatır"""
+    try:
+        return max(0.0, float(os.getenv("CHAT_DEADLINE_SECONDS", DEFAULT_CHAT_DEADLINE_SECONDS)))
+    except ValueError:
+        return DEFAULT_CHAT_DEADLINE_SECONDS
+
+
+@contextlib.contextmanager
+def deadline_scope(seconds):
+    """
+    Bu bağlamda (ve içinden başlatılan task'larda) geçerli bitiş zamanı.
+    İç içe kapsamlarda daha erken olan bitiş zamanı geçerlidir; None/0 sınır koymaz.
+    """
+    current = _deadline.get()
+    deadline = current
+    if seconds:
+        deadline = time.monotonic() + seconds
+        if current is not None:
+            deadline = min(deadline, current)
+
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Kalan süre (saniye); sınır yoksa None"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def has_budget(seconds):
+    """En az `seconds` süre kaldıysa (veya sınır yoksa) True"""
+    left = remaining()
+    return left is None or left >= seconds
+
+
+def stage_timeout(reserve=0.0, minimum=1.0):
+    """
+    Bir aşamaya verilebilecek süre: kalan süreden sonraki aşamalar için
+    ayrılan pay düşülür. Sınır yoksa None.
+    Raises:
+        DeadlineExceeded: Verilebilecek süre `minimum`'un altındaysa
+    """
+    left = remaining()
+    if left is None:
+        return None
+    budget = left - reserve
+    if budget < minimum:
+        raise DeadlineExceeded(f"süre bütçesi yetersiz ({left:.1f} sn kaldı)")
+    return budget
+
+
+async def run_within(coro, timeout):
+    """coro'yu timeout içinde çalıştır; süre dolarsa DeadlineExceeded"""
+    if timeout is None:
+        return await coro
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"{timeout:.1f} sn içinde tamamlanamadı")
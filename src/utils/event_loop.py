@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Arka Plan Event Loop'u
+Senkron çağıranlar (Streamlit script thread'leri) için process başına tek,
+uzun ömürlü bir event loop. aiohttp oturumları ve MCP oturumu loop'a bağlı
+olduğundan, mesaj başına asyncio.run yerine bu loop kullanılınca bağlantılar
+mesajlar ve oturumlar arasında yeniden kullanılır.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+
+class BackgroundLoop:
+    """Ayrı bir daemon thread'de sürekli çalışan event loop"""
+
+    def __init__(self, name="microcosmos-loop"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        """Loop'u (gerekirse başlatarak) döndür"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed() or not self._thread.is_alive():
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run, args=(self._loop, ready),
+                                                name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    @property
+    def thread(self):
+        """Loop'u çalıştıran thread (profil örneklemesi için)"""
+        self.loop
+        return self._thread
+
+    @staticmethod
+    def _run(loop, ready):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def submit(self, coro):
+        """Coroutine'i loop'a gönder; concurrent.futures.Future döner"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None, on_wait=None, poll_interval=0.5):
+        """
+        Coroutine'i loop'ta çalıştır ve sonucunu bekle (çağıran thread bloklanır)
+        Args:
+            on_wait: Verilirse beklerken her poll_interval'da çağrılır (ör. kuyruk durumu göstermek için)
+        """
+        return self.wait(self.submit(coro), timeout, on_wait, poll_interval)
+
+    @staticmethod
+    def wait(future, timeout=None, on_wait=None, poll_interval=0.5):
+        """
+        submit() ile gönderilmiş işin sonucunu bekle; bekleyen thread kesilirse
+        (ör. Streamlit yeniden çalıştırması) iş iptal edilir.
+        Raises:
+            concurrent.futures.CancelledError: İş başka yerden iptal edildiyse
+        """
+        try:
+            if on_wait is not None:
+                while not future.done():
+                    on_wait()
+                    concurrent.futures.wait([future], timeout=poll_interval)
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stop(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(loop.stop)
+
+
+_shared_loop = BackgroundLoop()
+
+
+def get_background_loop():
+    """Process genelinde paylaşılan arka plan loop'u"""
+    return _shared_loop
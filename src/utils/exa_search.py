@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Paylaşılan Exa (Smithery MCP) Arama İstemcisi
+MCP oturumunu her sohbette yeniden açmak yerine event loop başına tek bir
+kalıcı oturum tutar; tüm agent'lar ve istekler bu oturumu paylaşır.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import weakref
+from datetime import timedelta
+
+from src.utils.circuit_breaker import (DEFAULT_FAILURE_THRESHOLD, DEFAULT_RESET_TIMEOUT, CircuitBreaker,
+                                       CircuitOpenError)
+from src.utils.news_corpus import get_news_corpus
+from src.utils.singleflight import SingleFlight, normalize_query
+
+EXA_MCP_URL = "https://server.smithery.ai/exa/mcp?api_key={api_key}&profile={profile}"
+
+# Tek bir arama çağrısı için üst süre; aşan çağrı hata sayılır
+SEARCH_TIMEOUT_SECONDS = 20.0
+
+# MCP oturumu açma (bağlantı + initialize) için üst süre; kilit bu süreden uzun tutulmaz
+SESSION_CONNECT_TIMEOUT_SECONDS = 15.0
+
+
+class ExaSearchClient:
+    """
+    Kalıcı MCP oturumu.
+    streamablehttp_client bağlamı açıldığı task içinde kapatılmak zorunda
+    olduğundan, oturum loop başına ayrı bir "sahip" task tarafından tutulur;
+    diğer task'lar yalnızca call_tool çağırır.
+    """
+
+    def __init__(self, api_key=None, profile=None):
+        self.api_key = api_key if api_key is not None else os.getenv("SMITHERY_API_KEY")
+        self.profile = profile if profile is not None else os.getenv("SMITHERY_PROFILE")
+
+        # loop -> {"task", "session", "stop", "lock"}
+        self._states = weakref.WeakKeyDictionary()
+
+        self._flight = SingleFlight("exa araması")
+
+        # Smithery erişilemezken her sohbet bağlantı denemesi ve 8 başarısız arama ödemesin
+        self.breaker = CircuitBreaker(
+            "web araması",
+            failure_threshold=int(os.getenv("SEARCH_BREAKER_FAILURES", DEFAULT_FAILURE_THRESHOLD)),
+            reset_timeout=float(os.getenv("SEARCH_BREAKER_RESET_SECONDS", DEFAULT_RESET_TIMEOUT)),
+        )
+
+    @property
+    def configured(self):
+        return bool(self.api_key and self.profile)
+
+    @property
+    def available(self):
+        """Yapılandırılmış ve devre kesici çağrıya izin veriyor"""
+        return self.configured and self.breaker.available()
+
+    @property
+    def flight_stats(self):
+        return self._flight.stats
+
+    @property
+    def url(self):
+        return EXA_MCP_URL.format(api_key=self.api_key, profile=self.profile)
+
+    def _state(self):
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = {"task": None, "session": None, "stop": None, "lock": asyncio.Lock()}
+            self._states[loop] = state
+        return state
+
+    async def _own_session(self, state, ready):
+        """Oturumu açar ve kapatılana kadar açık tutar (sahip task)"""
+        # mcp yalnızca arama yapılandırılmışsa ve ilk kez gerektiğinde yüklenir
+        from mcp import ClientSession
+        from mcp.client.streamable_http import streamablehttp_client
+
+        try:
+            async with streamablehttp_client(self.url) as (read_stream, write_stream, _):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    state["session"] = session
+                    ready.set_result(session)
+                    await state["stop"].wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"⚠️ MCP oturumu kapandı: {e}")
+        finally:
+            state["session"] = None
+
+    async def _get_session(self):
+        state = self._state()
+        if state["session"] is not None and state["task"] is not None and not state["task"].done():
+            return state["session"]
+
+        async with state["lock"]:
+            if state["session"] is not None and state["task"] is not None and not state["task"].done():
+                return state["session"]
+
+            print("🔌 MCP OTURUMU AÇILIYOR...")
+            ready = asyncio.get_running_loop().create_future()
+            state["stop"] = asyncio.Event()
+            state["task"] = asyncio.create_task(self._own_session(state, ready))
+            try:
+                return await asyncio.wait_for(ready, timeout=SESSION_CONNECT_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                # Takılan el sıkışma sonraki aramaları kilitte bekletmesin; hata devre kesiciye yansır
+                print(f"⚠️ MCP oturumu {SESSION_CONNECT_TIMEOUT_SECONDS:.0f} sn içinde açılamadı")
+                state["task"].cancel()
+                state["task"] = None
+                raise
+
+    async def _reset(self):
+        state = self._state()
+        task = state["task"]
+        if state["stop"] is not None:
+            state["stop"].set()
+        if task is not None:
+            try:
+                await asyncio.wait_for(task, timeout=5)
+            except Exception:
+                task.cancel()
+        state["task"] = None
+        state["session"] = None
+
+    async def call(self, params: dict, tool_name: str = "web_search_exa") -> str:
+        """
+        Exa aracını çağır ve ilk içerik bloğunun metnini döndür.
+        Aynı (normalize) sorgu ve parametrelerle eşzamanlı çağrılar tek istek paylaşır.
+        Raises:
+            CircuitOpenError: Arama devre dışıyken (bağlantı denenmeden)
+        """
+        if not self.breaker.admits():
+            raise CircuitOpenError("web araması geçici olarak devre dışı")
+
+        options = tuple(sorted((name, str(value)) for name, value in params.items() if name != "query"))
+        key = (tool_name, normalize_query(params.get("query", "")), options)
+        return await self._flight.do(key, lambda: self._call(params, tool_name))
+
+    async def _call(self, params: dict, tool_name: str) -> str:
+        """Devre kesici üzerinden çağrı; sonuç devre durumuna yansıtılır"""
+        if not self.breaker.allow():
+            raise CircuitOpenError("web araması geçici olarak devre dışı")
+
+        try:
+            text = await self._call_with_reconnect(params, tool_name)
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+        self._archive(text, params.get("query", ""))
+        return text
+
+    @staticmethod
+    def _archive(text, query):
+        """Gelen haberleri yerel arşive yaz (arşiv kapalıysa veya yazılamazsa sessizce geç)"""
+        corpus = get_news_corpus()
+        if corpus is None or not text:
+            return
+        try:
+            corpus.add_results(text, query)
+        except sqlite3.Error as e:
+            print(f"⚠️ Haber arşivine yazılamadı: {e}")
+
+    async def _call_with_reconnect(self, params: dict, tool_name: str) -> str:
+        """Bağlantı koptuysa oturumu bir kez yeniden açıp tekrar dener"""
+        for attempt in range(2):
+            session = await self._get_session()
+            try:
+                result = await session.call_tool(tool_name, params,
+                                                 read_timeout_seconds=timedelta(seconds=SEARCH_TIMEOUT_SECONDS))
+            except Exception:
+                if attempt == 0:
+                    await self._reset()
+                    continue
+                raise
+
+            if result.content and len(result.content) > 0:
+                return result.content[0].text
+            return ""
+
+        return ""
+
+    async def probe(self):
+        """Oturumu açmayı dene; sonuç devre kesiciye yansır"""
+        try:
+            await self._get_session()
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+
+    async def close(self):
+        """Mevcut loop'a ait oturumu kapat"""
+        await self._reset()
+
+
+_shared_search_client = None
+_shared_lock = threading.Lock()
+
+
+def get_search_client():
+    """Process genelinde paylaşılan arama istemcisi"""
+    global _shared_search_client
+    if _shared_search_client is None:
+        with _shared_lock:
+            if _shared_search_client is None:
+                _shared_search_client = ExaSearchClient()
+    return _shared_search_client
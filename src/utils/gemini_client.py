@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Asenkron Gemini İstemcisi
+Key havuzu üzerinden, bağlantı havuzlu (aiohttp) generateContent çağrıları
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+
+import aiohttp
+
+from src.utils.key_pool import KeyPool, QuotaExhaustedError, get_key_pool
+from src.utils.latency import LatencyTracker
+from src.utils.model_routes import ModelRouter
+from src.utils.prompt_cache import get_prompt_cache
+from src.utils.token_usage import get_token_ledger
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+GEMINI_STREAM_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent"
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+# Hedging: bu kadar ölçüm birikmeden gecikme yüzdeliğine güvenilmez
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY_SECONDS = 0.5
+DEFAULT_HEDGE_MAX_RATIO = 0.1
+# Havuzda bu kadar boş kapasite yoksa yedek istek gönderilmez
+HEDGE_MIN_SPARE_CAPACITY = 5
+
+# Başlangıç key kontrolü: tek token'lık en küçük istek ve key başına süre sınırı
+PROBE_PROMPT = "ping"
+PROBE_TIMEOUT_SECONDS = 10.0
+
+KEY_OK = "ok"
+KEY_QUOTA = "quota"
+KEY_INVALID = "invalid"
+KEY_ERROR = "error"
+
+QUOTA_FALLBACK_TEXT = "Sistem yoğunluğu nedeniyle geçici olarak hizmet veremiyorum. Lütfen biraz sonra tekrar deneyin."
+
+
+class GeminiError(Exception):
+    """Gemini API'den dönen genel hata"""
+
+
+class QuotaError(GeminiError):
+    """
+    429 / RESOURCE_EXHAUSTED
+    Attributes:
+        daily: Aşılan quota günlük ise True (dakikalık limitler günlük tükenme sayılmaz)
+        retry_after: API'nin önerdiği bekleme süresi (RetryInfo.retryDelay, saniye) veya None
+    """
+
+    def __init__(self, message, daily=False, retry_after=None):
+        super().__init__(message)
+        self.daily = daily
+        self.retry_after = retry_after
+
+
+class InvalidKeyError(GeminiError):
+    """Geçersiz veya yetkisiz API key"""
+
+
+class TransientError(GeminiError):
+    """5xx sunucu hatası - farklı key ile tekrar denenebilir"""
+
+
+# Farklı bir key ile tekrar denenebilecek hatalar
+RETRYABLE_ERRORS = (QuotaError, InvalidKeyError, TransientError, aiohttp.ClientError, asyncio.TimeoutError)
+
+
+def _parse_quota_error(body: str):
+    """
+    429 gövdesinden aşılan quota türünü ve önerilen bekleme süresini çıkar.
+    QuotaFailure ihlallerindeki quotaId ("...PerDay..." / "...PerMinute...") esas alınır;
+    ayrıntı yoksa mesaj metnine bakılır. Türü bilinmeyen quota günlük sayılmaz.
+    Returns:
+        (daily, retry_after)
+    """
+    try:
+        details = (json.loads(body).get("error") or {}).get("details") or []
+    except (ValueError, AttributeError):
+        details = []
+
+    daily = False
+    retry_after = None
+    for detail in details:
+        if not isinstance(detail, dict):
+            continue
+        for violation in detail.get("violations") or []:
+            if "perday" in str(violation.get("quotaId", "")).lower():
+                daily = True
+        delay = detail.get("retryDelay")
+        if delay:
+            try:
+                retry_after = float(str(delay).rstrip("s"))
+            except ValueError:
+                pass
+
+    if not details:
+        lowered = body.lower()
+        daily = "per day" in lowered or "perday" in lowered
+    return daily, retry_after
+
+
+class GeminiClient:
+    """
+    Key havuzu ile çalışan asenkron Gemini istemcisi.
+    `genai.configure` global olduğundan eşzamanlı çağrılar farklı key'lerle
+    yapılamaz; bu yüzden REST API'si key başına doğrudan çağrılır.
+    """
+
+    def __init__(self, key_pool: KeyPool = None, model: str = DEFAULT_MODEL,
+                 timeout: float = 60.0, max_connections: int = 64,
+                 hedge_percentile: float = None, hedge_max_ratio: float = None, router: ModelRouter = None):
+        """
+        Args:
+            router: Aşama bazlı model / üretim ayarı tablosu (varsayılan: MODEL_ROUTES ile ModelRouter)
+            hedge_percentile: Bu gecikme yüzdeliği aşılınca farklı bir key ile yedek istek
+                gönderilir (varsayılan: GEMINI_HEDGE_PERCENTILE; boş/0 = kapalı)
+            hedge_max_ratio: Yedek isteklerin toplam isteklere oranı için üst sınır
+                (varsayılan: GEMINI_HEDGE_MAX_RATIO, 0.1)
+        """
+        self.key_pool = key_pool or get_key_pool()
+        self.model = model
+        self.timeout = timeout
+        self.max_connections = max_connections
+
+        if hedge_percentile is None:
+            hedge_percentile = float(os.getenv("GEMINI_HEDGE_PERCENTILE") or 0)
+        if hedge_max_ratio is None:
+            hedge_max_ratio = float(os.getenv("GEMINI_HEDGE_MAX_RATIO") or DEFAULT_HEDGE_MAX_RATIO)
+        self.hedge_percentile = min(max(hedge_percentile, 0.0), 99.9)
+        self.hedge_max_ratio = max(hedge_max_ratio, 0.0)
+
+        # Çağıranın gördüğü gecikme ve yedek olmasaydı görülecek gecikme (ilk isteğin süresi)
+        self.latency = LatencyTracker()
+        self.primary_latency = LatencyTracker()
+        self._hedge_lock = threading.Lock()
+        self.hedge_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0}
+
+        # Aşama -> model ve üretim ayarları; aşama başına gecikme ayrıca ölçülür
+        self.router = router or ModelRouter()
+        self.stage_latency = {}
+
+        # Persona sistem promptları gibi statik ön ekler bir kez kaydedilir, isteklerde tutamaçla gönderilir
+        self.prompt_cache = get_prompt_cache()
+
+        # Oturum / persona / key / aşama bazında token muhasebesi
+        self.usage = get_token_ledger()
+
+        # Son başarılı isteğin key'i (manuel "switch" komutu için)
+        self.last_key = None
+
+        # aiohttp oturumları event loop'a bağlıdır; her loop için bir oturum tutulur
+        self._sessions = weakref.WeakKeyDictionary()
+
+    async def _get_session(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def close(self):
+        """Mevcut event loop'a ait HTTP oturumunu kapat"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    @staticmethod
+    def _build_payload(prompt: str, generation_config: dict = None, prefix_fields: dict = None):
+        payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if generation_config:
+            payload["generationConfig"] = generation_config
+        if prefix_fields:
+            payload.update(prefix_fields)
+        return payload
+
+    async def _prefix_fields(self, prefix, key, model, session):
+        """Kayıtlı ön ekin istek alanları (systemInstruction veya cachedContent)"""
+        if prefix is None:
+            return None
+        return await self.prompt_cache.payload_fields(prefix, key, model, session)
+
+    def _check_cached_prefix(self, status, prefix, prefix_fields, key, model):
+        """Sunucudaki önbellek kaydı silinmiş / süresi dolmuşsa unut; istek başka denemede yeniden kurulur"""
+        if status in (400, 404) and prefix_fields and "cachedContent" in prefix_fields:
+            self.prompt_cache.forget(prefix, key, model)
+            raise TransientError(f"{status}: prompt önbelleği kaydı bulunamadı")
+
+    @staticmethod
+    def _raise_for_status(status: int, body: str):
+        if status == 429 or "RESOURCE_EXHAUSTED" in body or "quota" in body.lower():
+            daily, retry_after = _parse_quota_error(body)
+            raise QuotaError(f"429 quota: {body[:200]}", daily=daily, retry_after=retry_after)
+        if status in (401, 403) or "API_KEY_INVALID" in body:
+            raise InvalidKeyError(f"{status}: {body[:200]}")
+        if status >= 500:
+            raise TransientError(f"{status}: {body[:200]}")
+        raise GeminiError(f"{status}: {body[:200]}")
+
+    @staticmethod
+    def _extract_text(data: dict) -> str:
+        candidates = data.get("candidates") or []
+        if not candidates:
+            reason = (data.get("promptFeedback") or {}).get("blockReason", "boş cevap")
+            raise GeminiError(f"Cevap üretilemedi: {reason}")
+
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        text = "".join(part.get("text", "") for part in parts)
+        if not text:
+            raise GeminiError(f"Cevap üretilemedi: {candidates[0].get('finishReason', 'boş cevap')}")
+        return text.strip()
+
+    async def generate_with_key(self, key: str, prompt: str, model: str = None,
+                                generation_config: dict = None, prefix=None) -> str:
+        """
+        Belirli bir key ile tek bir istek gönder (rotasyon yok)
+        Args:
+            prefix: prompt_cache'e kayıtlı statik ön ek (PrefixHandle); prompt yalnızca değişken son ektir
+        """
+        session = await self._get_session()
+        model = model or self.model
+        url = GEMINI_API_URL.format(model=model)
+        prefix_fields = await self._prefix_fields(prefix, key, model, session)
+
+        async with session.post(url, params={"key": key},
+                                json=self._build_payload(prompt, generation_config, prefix_fields)) as resp:
+            if resp.status == 200:
+                return self._extract_text(await resp.json())
+
+            self._check_cached_prefix(resp.status, prefix, prefix_fields, key, model)
+            self._raise_for_status(resp.status, await resp.text())
+
+    async def probe_key(self, key: str, timeout: float = PROBE_TIMEOUT_SECONDS) -> str:
+        """
+        Key'i en küçük istekle dene.
+        Returns:
+            KEY_OK, KEY_QUOTA, KEY_INVALID veya KEY_ERROR (ağ hatası / zaman aşımı; durum bilinmiyor)
+        """
+        session = await self._get_session()
+        url = GEMINI_API_URL.format(model=self.model)
+        payload = self._build_payload(PROBE_PROMPT, {"maxOutputTokens": 1})
+
+        try:
+            async with session.post(url, params={"key": key}, json=payload,
+                                    timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                # 200 yeterli; tek token'lık cevabın metni boş olabilir
+                if resp.status == 200:
+                    return KEY_OK
+                self._raise_for_status(resp.status, await resp.text())
+        except QuotaError:
+            return KEY_QUOTA
+        except InvalidKeyError:
+            return KEY_INVALID
+        except (GeminiError, aiohttp.ClientError, asyncio.TimeoutError):
+            return KEY_ERROR
+
+    async def preflight(self, timeout: float = PROBE_TIMEOUT_SECONDS) -> dict:
+        """
+        Havuzdaki tüm key'leri eşzamanlı dene ve sonuçları havuza işle:
+        quota alanlar cooldown'a (günlük tükenme sayacına yazılmadan), geçersizler havuz dışına alınır.
+        Toplam süre tek bir istek süresi kadardır.
+        Returns:
+            {etiket: durum} (ör. {"#1": "ok", "#2": "quota"})
+        """
+        keys = list(self.key_pool.keys)
+        results = await asyncio.gather(*(self.probe_key(key, timeout) for key in keys))
+
+        health = {}
+        for key, status in zip(keys, results):
+            if status == KEY_OK:
+                self.key_pool.report_success(key)
+            elif status == KEY_QUOTA:
+                self.key_pool.report_quota(key, strike=False)
+            elif status == KEY_INVALID:
+                self.key_pool.report_invalid(key)
+            health[self.key_pool.label(key)] = status
+        return health
+
+    async def _stream_with_key(self, key: str, prompt: str, model: str = None,
+                               generation_config: dict = None, prefix=None):
+        """Belirli bir key ile SSE akışı; metin parçalarını sırayla üretir"""
+        session = await self._get_session()
+        model = model or self.model
+        url = GEMINI_STREAM_URL.format(model=model)
+        prefix_fields = await self._prefix_fields(prefix, key, model, session)
+
+        async with session.post(url, params={"key": key, "alt": "sse"},
+                                json=self._build_payload(prompt, generation_config, prefix_fields)) as resp:
+            if resp.status != 200:
+                self._check_cached_prefix(resp.status, prefix, prefix_fields, key, model)
+                self._raise_for_status(resp.status, await resp.text())
+
+            async for raw_line in resp.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[5:])
+                for candidate in data.get("candidates") or []:
+                    for part in (candidate.get("content") or {}).get("parts") or []:
+                        if part.get("text"):
+                            yield part["text"]
+
+    def _report_failure(self, key, error, started):
+        """Başarısız isteği key'in sağlık durumuna yansıt"""
+        label = self.key_pool.label(key)
+        if isinstance(error, QuotaError):
+            print(f"❌ API {label} {'günlük ' if error.daily else ''}quota aşıldı")
+            self.key_pool.report_quota(key, cooldown_seconds=error.retry_after, strike=error.daily)
+        elif isinstance(error, InvalidKeyError):
+            print(f"❌ API {label} geçersiz, havuzdan çıkarıldı")
+            self.key_pool.report_invalid(key)
+        else:
+            print(f"⚠️ API {label} bağlantı hatası ({time.monotonic() - started:.1f}s): {error}")
+            self.key_pool.report_error(key)
+
+    def _record_usage(self, key, prompt, text, stage, prefix=None):
+        """Token kullanımını deftere yaz; key dakikalık token limitini aştıysa dinlendir"""
+        if prefix is not None:
+            # Önbellekteki ön ek de modelin işlediği (indirimli) token'lardır
+            prompt = prefix.text + prompt
+        cooldown = self.usage.record(prompt, text, self.key_pool.label(key), stage)
+        if cooldown:
+            print(f"🪙 API {self.key_pool.label(key)} dakikalık token limitine ulaştı, {cooldown:.0f} sn dinlendiriliyor")
+            self.key_pool.cool_down(key, cooldown)
+
+    def _record_stage(self, stage, started):
+        if stage is None:
+            return
+        tracker = self.stage_latency.get(stage)
+        if tracker is None:
+            tracker = self.stage_latency.setdefault(stage, LatencyTracker())
+        tracker.add(time.monotonic() - started)
+
+    def _hedge_delay(self):
+        """Yedek istek için bekleme süresi; hedging kapalıysa veya yeterli ölçüm yoksa None"""
+        if not self.hedge_percentile or len(self.primary_latency) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(self.primary_latency.percentile(self.hedge_percentile), HEDGE_MIN_DELAY_SECONDS)
+
+    def _acquire_hedge_key(self, exclude):
+        """Yedek istek bütçesi ve boş kapasite varsa, farklı ve hemen kullanılabilir bir key"""
+        # Key havuzu paylaşılan key deposuyla senkronize olabilir (SQLite); kilit dışında sorulur
+        if self.key_pool.capacity() < HEDGE_MIN_SPARE_CAPACITY:
+            return None
+        with self._hedge_lock:
+            stats = self.hedge_stats
+            if stats["hedged"] + 1 > self.hedge_max_ratio * stats["requests"]:
+                return None
+            # Bütçe key alınmadan ayrılır; key alınamazsa geri verilir
+            stats["hedged"] += 1
+
+        key, _ = self.key_pool.try_acquire(exclude=exclude)
+        if key is None:
+            with self._hedge_lock:
+                self.hedge_stats["hedged"] -= 1
+        return key
+
+    async def _generate_hedged(self, key, exclude, prompt, model, generation_config, prefix=None):
+        """
+        İstek gecikme yüzdeliğini aşarsa farklı bir key ile aynı isteği gönder,
+        önce gelen başarılı cevabı kullan. Yedek isteğin key'i exclude'a (çağıranın
+        denenen key kümesi) eklenir.
+        Returns:
+            (cevabı veren key, metin)
+        Raises:
+            Son başarısız isteğin hatası (hataları key'lere zaten yansıtılmış olarak)
+        """
+        started = time.monotonic()
+        with self._hedge_lock:
+            self.hedge_stats["requests"] += 1
+
+        primary = asyncio.ensure_future(self.generate_with_key(key, prompt, model, generation_config, prefix))
+        tasks = {primary: key}
+        last_error = None
+
+        try:
+            delay = self._hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done:
+                    hedge_key = self._acquire_hedge_key(exclude=set(exclude) | {key})
+                    if hedge_key is not None:
+                        # Yedek istek başarısız olursa sonraki deneme aynı key'i seçmesin
+                        exclude.add(hedge_key)
+                        print(f"🪁 YEDEK İSTEK: {self.key_pool.label(key)} {delay:.1f}s içinde "
+                              f"cevap vermedi, {self.key_pool.label(hedge_key)} deneniyor")
+                        tasks[asyncio.ensure_future(
+                            self.generate_with_key(hedge_key, prompt, model, generation_config, prefix)
+                        )] = hedge_key
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task_key = tasks[task]
+                    error = task.exception()
+                    if error is not None:
+                        if not isinstance(error, RETRYABLE_ERRORS):
+                            raise error
+                        self._report_failure(task_key, error, started)
+                        last_error = error
+                        continue
+
+                    elapsed = time.monotonic() - started
+                    self.latency.add(elapsed)
+                    if task is primary:
+                        self.primary_latency.add(elapsed)
+                    else:
+                        with self._hedge_lock:
+                            self.hedge_stats["hedge_wins"] += 1
+                        if not primary.done():
+                            # İlk isteğin quota'sı zaten harcandı; gerçek gecikmesini ölçmek için bitmesine izin ver
+                            primary.add_done_callback(lambda t: self._record_primary(t, started))
+                            tasks.pop(primary)
+                    return task_key, task.result()
+
+            raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _record_primary(self, task, started):
+        if task.cancelled() or task.exception() is not None:
+            return
+        self.primary_latency.add(time.monotonic() - started)
+
+    def stats(self):
+        """Gecikme yüzdelikleri ve hedging oranı"""
+        with self._hedge_lock:
+            stats = dict(self.hedge_stats)
+        observed, primary = self.latency.summary(), self.primary_latency.summary()
+        improvement = None
+        if observed["p99_ms"] is not None and primary["p99_ms"] is not None:
+            improvement = round(primary["p99_ms"] - observed["p99_ms"], 1)
+        return {
+            "hedge_percentile": self.hedge_percentile or None,
+            "hedge_rate": round(stats["hedged"] / stats["requests"], 3) if stats["requests"] else 0.0,
+            **stats,
+            "latency": observed,
+            "primary_latency": primary,
+            "p99_improvement_ms": improvement,
+            "prompt_cache": self.prompt_cache.status(),
+            "stages": {
+                stage: {"model": self.router.route(stage)[0] or self.model, **tracker.summary()}
+                for stage, tracker in list(self.stage_latency.items())
+            },
+        }
+
+    async def generate(self, prompt: str, model: str = None, generation_config: dict = None,
+                       max_retries: int = None, acquire_timeout: float = None, stage: str = None,
+                       prefix=None) -> str:
+        """
+        API rotasyonu ile güvenli deneme.
+        Quota alan key cooldown'a alınır, geçersiz key havuzdan çıkarılır ve
+        istek farklı bir key ile tekrarlanır.
+        Args:
+            stage: Pipeline aşaması (ör. "SORU_ANALIZI"); model ve üretim ayarları
+                yönlendirme tablosundan gelir, gecikme ve token kullanımı aşamaya yazılır
+            prefix: prompt_cache.register ile kaydedilmiş statik ön ek (ör. persona sistem promptu)
+        """
+        if max_retries is None:
+            max_retries = len(self.key_pool)
+        model, generation_config = self.router.route(stage, model, generation_config)
+        started = time.monotonic()
+
+        tried = set()
+        last_error = None
+
+        for attempt in range(max_retries):
+            # Tüm key'ler denendiyse hız limiti dolan key'lerin tekrar kullanılmasına izin ver
+            exclude = tried if len(tried) < len(self.key_pool) else ()
+            key = await self.key_pool.acquire(exclude=exclude, timeout=acquire_timeout)
+            tried.add(key)
+
+            try:
+                key, text = await self._generate_hedged(key, tried, prompt, model, generation_config, prefix)
+                self.key_pool.report_success(key)
+                self.last_key = key
+                self._record_usage(key, prompt, text, stage, prefix)
+                self._record_stage(stage, started)
+                return text
+            except RETRYABLE_ERRORS as e:
+                # Key sağlık durumu _generate_hedged içinde güncellendi
+                last_error = e
+
+        raise QuotaExhaustedError(f"{max_retries} deneme başarısız: {last_error}")
+
+    async def stream(self, prompt: str, model: str = None, generation_config: dict = None,
+                     max_retries: int = None, stage: str = None, prefix=None):
+        """
+        Token akışı ile üretim.
+        Key rotasyonu yalnızca ilk parça gelmeden önce yapılır; akış başladıktan
+        sonraki hatalar çağırana iletilir.
+        """
+        if max_retries is None:
+            max_retries = len(self.key_pool)
+        model, generation_config = self.router.route(stage, model, generation_config)
+        started = time.monotonic()
+
+        tried = set()
+        last_error = None
+
+        for attempt in range(max_retries):
+            exclude = tried if len(tried) < len(self.key_pool) else ()
+            key = await self.key_pool.acquire(exclude=exclude)
+            tried.add(key)
+            label = self.key_pool.label(key)
+
+            started_streaming = False
+            output = []
+            try:
+                async for chunk in self._stream_with_key(key, prompt, model, generation_config, prefix):
+                    started_streaming = True
+                    output.append(chunk)
+                    yield chunk
+                self.key_pool.report_success(key)
+                self.last_key = key
+                self._record_stage(stage, started)
+                return
+            except QuotaError as e:
+                # Akış başladıktan sonra da key'in quota durumu havuza işlenir
+                print(f"❌ API {label} {'günlük ' if e.daily else ''}quota aşıldı")
+                self.key_pool.report_quota(key, cooldown_seconds=e.retry_after, strike=e.daily)
+                if started_streaming:
+                    raise
+                last_error = e
+            except InvalidKeyError as e:
+                print(f"❌ API {label} geçersiz, havuzdan çıkarıldı")
+                self.key_pool.report_invalid(key)
+                if started_streaming:
+                    # Başka key ile baştan üretmek yarım cevabın arkasına ikinci bir cevap ekler
+                    raise
+                last_error = e
+            except (TransientError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"⚠️ API {label} bağlantı hatası: {e}")
+                self.key_pool.report_error(key)
+                if started_streaming:
+                    raise
+                last_error = e
+            finally:
+                # Akış yarıda kesilse de (süre aşımı, iptal) üretilen kısım sayılır
+                if started_streaming:
+                    self._record_usage(key, prompt, "".join(output), stage, prefix)
+
+        raise QuotaExhaustedError(f"{max_retries} deneme başarısız: {last_error}")
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_gemini_client():
+    """Process genelinde paylaşılan Gemini istemcisi"""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = GeminiClient()
+    return _shared_client
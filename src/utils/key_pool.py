@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Gemini API Key Havuzu
+Anahtar başına dakikalık hız limiti, quota cooldown ve sağlık takibi
+"""
+
+import asyncio
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from src.utils.key_store import key_id, open_key_store
+
+# Ücretsiz Gemini Flash katmanı için varsayılan dakikalık istek limiti
+DEFAULT_RPM_PER_KEY = 15
+
+# Quota (429) alan bir key'in tekrar denenmeden önce bekleyeceği süre
+DEFAULT_COOLDOWN_SECONDS = 60.0
+
+# Paylaşılan depodaki cooldown / geçersiz bilgisinin en fazla bu kadar eski kalmasına izin verilir
+STORE_SYNC_SECONDS = 2.0
+
+# Süreç kapanırken bekleyen depo yazmaları için beklenecek en uzun süre
+STORE_FLUSH_TIMEOUT_SECONDS = 2.0
+
+
+def load_gemini_keys():
+    """Environment'tan GEMINI_API_KEY ve GEMINI_API_KEY_1..N değerlerini yükle"""
+    api_keys = []
+
+    single_key = os.getenv("GEMINI_API_KEY")
+    if single_key:
+        api_keys.append(single_key)
+
+    i = 1
+    while True:
+        key = os.getenv(f"GEMINI_API_KEY_{i}")
+        if not key:
+            break
+        if key not in api_keys:
+            api_keys.append(key)
+        i += 1
+
+    return api_keys
+
+
+class KeyPool:
+    """
+    Paylaşılan API key havuzu.
+    Durum threading.Lock ile korunur; böylece aynı havuz farklı event loop'lar
+    ve thread'ler (Streamlit oturumları, batch worker'ları) arasında kullanılabilir.
+    store verilirse cooldown'lar, geçersiz key'ler ve günlük sayaçlar process'ler
+    arasında paylaşılır ve yeniden başlatmada korunur; dakikalık pencereler process içidir.
+    Depo okuma/yazmaları (SQLite kilidi beklenebilir) sıralı bir arka plan thread'inde
+    yapılır; event loop'taki key seçimi ve raporlar depoyu hiç beklemez.
+    """
+
+    def __init__(self, keys=None, rpm_per_key=None, cooldown_seconds=DEFAULT_COOLDOWN_SECONDS, store=None):
+        self.keys = list(keys) if keys is not None else load_gemini_keys()
+        if not self.keys:
+            raise ValueError("❌ Hiçbir GEMINI API key bulunamadı! .env dosyasını kontrol edin.")
+
+        if rpm_per_key is None:
+            rpm_per_key = int(os.getenv("GEMINI_RPM_PER_KEY", DEFAULT_RPM_PER_KEY))
+        self.rpm_per_key = max(1, rpm_per_key)
+        self.cooldown_seconds = cooldown_seconds
+
+        self._lock = threading.Lock()
+        self._windows = {key: deque() for key in self.keys}
+        self._cooldown_until = {key: 0.0 for key in self.keys}
+        self._last_used = {key: 0.0 for key in self.keys}
+        self._invalid = set()
+        self._pending_invalid = set()
+        self._counters = {key: {"ok": 0, "quota": 0, "error": 0} for key in self.keys}
+
+        self.store = store
+        self._key_ids = {key: key_id(key) for key in self.keys}
+        self._daily = {}
+        self._synced_at = None
+        self._store_queue = None
+        if self.store is not None:
+            # İlk durum kurulumda okunur; sonraki okuma/yazmalar arka plandaki thread'e bırakılır
+            self._synced_at = time.monotonic()
+            self._load_store()
+            self._store_queue = queue.Queue()
+            threading.Thread(target=self._store_worker, name="key-store", daemon=True).start()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def label(self, key):
+        """Loglar için key'in gizli olmayan etiketi (#1, #2, ...)"""
+        try:
+            return f"#{self.keys.index(key) + 1}"
+        except ValueError:
+            return "#?"
+
+    def _sync(self, force=False):
+        """Paylaşılan depodan yeniden okumayı arka plan thread'ine iste (bloklamaz)"""
+        if self.store is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._synced_at is not None and now - self._synced_at < STORE_SYNC_SECONDS:
+                return
+            self._synced_at = now
+        self._store_queue.put(("sync",))
+
+    def _load_store(self):
+        """Paylaşılan depodaki cooldown ve geçersiz bilgisini havuza uygula"""
+        try:
+            rows = self.store.load(list(self._key_ids.values()))
+        except sqlite3.Error as e:
+            print(f"⚠️ Key durum deposu okunamadı: {e}")
+            return
+
+        # Duvar saati -> bu process'in monotonic saati
+        offset = time.monotonic() - time.time()
+        with self._lock:
+            invalid = set()
+            for key, kid in self._key_ids.items():
+                row = rows.get(kid)
+                if row is None:
+                    continue
+                if row["invalid"]:
+                    invalid.add(key)
+                self._cooldown_until[key] = max(self._cooldown_until[key], row["cooldown_until"] + offset)
+                self._daily[key] = row
+            # Gün dönümünde depo geçersiz işaretlerini sıfırlar; key'ler yeniden denenir.
+            # Sırada bekleyen (henüz yazılmamış) geçersiz işaretleri korunur.
+            self._invalid = invalid | self._pending_invalid
+
+    def _persist(self, action, key, *args):
+        if self.store is None or key not in self._key_ids:
+            return
+        self._store_queue.put((action, key, args))
+
+    def _store_worker(self):
+        """Depo işlemlerini sırayla uygular; tek yazıcı olduğundan raporların sırası korunur"""
+        while True:
+            item = self._store_queue.get()
+            try:
+                if item[0] == "sync":
+                    self._load_store()
+                elif item[0] == "flush":
+                    item[1].set()
+                else:
+                    action, key, args = item
+                    try:
+                        getattr(self.store, action)(self._key_ids[key], *args)
+                    except sqlite3.Error as e:
+                        print(f"⚠️ Key durum deposuna yazılamadı ({self.label(key)}): {e}")
+                    finally:
+                        if action == "mark_invalid":
+                            with self._lock:
+                                self._pending_invalid.discard(key)
+            except Exception as e:
+                print(f"⚠️ Key durum deposu işlemi başarısız: {e}")
+            finally:
+                self._store_queue.task_done()
+
+    def flush(self, timeout=None):
+        """
+        Sıradaki depo işlemleri bitene kadar bekle (depo kapatılmadan önce çağrılır)
+        Returns:
+            Tüm işlemler timeout içinde bittiyse True
+        """
+        if self._store_queue is None:
+            return True
+        done = threading.Event()
+        self._store_queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def _prune(self, key, now):
+        window = self._windows[key]
+        while window and now - window[0] >= 60.0:
+            window.popleft()
+
+    def _is_usable(self, key, now):
+        return key not in self._invalid and self._cooldown_until[key] <= now
+
+    def healthy_keys(self):
+        """Şu anda kullanılabilir (geçersiz veya cooldown'da olmayan) key'ler"""
+        self._sync()
+        now = time.monotonic()
+        with self._lock:
+            return [key for key in self.keys if self._is_usable(key, now)]
+
+    def capacity(self):
+        """Bu dakika içinde bekleme olmadan yapılabilecek toplam istek sayısı"""
+        self._sync()
+        now = time.monotonic()
+        with self._lock:
+            total = 0
+            for key in self.keys:
+                if self._is_usable(key, now):
+                    self._prune(key, now)
+                    total += self.rpm_per_key - len(self._windows[key])
+            return total
+
+    def try_acquire(self, exclude=()):
+        """
+        Bloklamadan key almayı dene.
+        Returns:
+            (key, 0.0) başarılıysa, (None, bekleme_süresi) değilse.
+            Hiç kullanılabilir key kalmadıysa bekleme süresi None döner.
+        """
+        self._sync()
+        now = time.monotonic()
+        with self._lock:
+            best_key = None
+            min_wait = None
+
+            for key in self.keys:
+                if key in exclude or key in self._invalid:
+                    continue
+
+                if self._cooldown_until[key] > now:
+                    wait = self._cooldown_until[key] - now
+                else:
+                    self._prune(key, now)
+                    window = self._windows[key]
+                    if len(window) < self.rpm_per_key:
+                        # En uzun süredir kullanılmayan key'i seç (yükü yay)
+                        if best_key is None or self._last_used[key] < self._last_used[best_key]:
+                            best_key = key
+                        continue
+                    wait = 60.0 - (now - window[0])
+
+                if min_wait is None or wait < min_wait:
+                    min_wait = wait
+
+            if best_key is not None:
+                self._windows[best_key].append(now)
+                self._last_used[best_key] = now
+                return best_key, 0.0
+
+            return None, min_wait
+
+    async def acquire(self, exclude=(), timeout=None):
+        """Hız limiti içinde bir key al, gerekirse boşalana kadar bekle"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            key, wait = self.try_acquire(exclude)
+            if key is not None:
+                return key
+
+            if wait is None:
+                raise QuotaExhaustedError("Kullanılabilir API key kalmadı")
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise QuotaExhaustedError("API key beklenirken süre doldu")
+                wait = min(wait, remaining)
+
+            await asyncio.sleep(max(0.05, wait))
+
+    def report_success(self, key):
+        with self._lock:
+            if key in self._counters:
+                self._counters[key]["ok"] += 1
+        self._persist("record_success", key)
+
+    def report_quota(self, key, cooldown_seconds=None, strike=True):
+        """
+        429 / quota hatası alan key'i cooldown'a al
+        Args:
+            strike: False ise (ör. başlangıç yoklaması, dakikalık quota) hata günlük tükenme
+                sayacına eklenmez; dakikalık 429'lar key'i gece yarısına kadar dinlendirmesin
+        """
+        seconds = self.cooldown_seconds if cooldown_seconds is None else cooldown_seconds
+        self._set_cooldown(key, seconds)
+        with self._lock:
+            if key in self._counters:
+                self._counters[key]["quota"] += 1
+        # Depo, gün içinde art arda gelen günlük quota hatalarında key'i günlük sıfırlanmaya kadar dinlendirir
+        self._persist("record_quota", key, time.time() + seconds, strike)
+        self._sync(force=True)
+
+    def cool_down(self, key, seconds=None):
+        """Key'i belirtilen süre boyunca seçilmeyecek şekilde dinlendir"""
+        seconds = self.cooldown_seconds if seconds is None else seconds
+        self._set_cooldown(key, seconds)
+        self._persist("cool_down", key, time.time() + seconds)
+
+    def _set_cooldown(self, key, seconds):
+        with self._lock:
+            if key in self._cooldown_until:
+                self._cooldown_until[key] = max(self._cooldown_until[key], time.monotonic() + seconds)
+
+    def report_error(self, key):
+        with self._lock:
+            if key in self._counters:
+                self._counters[key]["error"] += 1
+        self._persist("record_error", key)
+
+    def report_invalid(self, key):
+        """Geçersiz key'i havuzdan çıkar (paylaşılan depoda bir sonraki quota gününe kadar)"""
+        with self._lock:
+            self._invalid.add(key)
+            if self.store is not None:
+                self._pending_invalid.add(key)
+        self._persist("mark_invalid", key)
+
+    def stats(self):
+        """Durum paneli ve loglar için özet"""
+        self._sync()
+        now = time.monotonic()
+        with self._lock:
+            cooling = sum(1 for key in self.keys
+                          if key not in self._invalid and self._cooldown_until[key] > now)
+            return {
+                "total": len(self.keys),
+                "healthy": sum(1 for key in self.keys if self._is_usable(key, now)),
+                "cooling_down": cooling,
+                "invalid": len(self._invalid),
+                "rpm_per_key": self.rpm_per_key,
+                "requests": {
+                    "ok": sum(c["ok"] for c in self._counters.values()),
+                    "quota": sum(c["quota"] for c in self._counters.values()),
+                    "error": sum(c["error"] for c in self._counters.values()),
+                },
+                # Tüm process'lerin bugünkü (Pasifik saati) toplamları; depo kapalıysa None
+                "today": {
+                    "requests": sum(row["requests"] for row in self._daily.values()),
+                    "quota": sum(row["quota_errors"] for row in self._daily.values()),
+                    "error": sum(row["errors"] for row in self._daily.values()),
+                } if self.store is not None else None,
+            }
+
+
+class QuotaExhaustedError(Exception):
+    """Havuzdaki tüm key'ler tükendiğinde veya bekleme süresi dolduğunda"""
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_key_pool():
+    """Process genelinde paylaşılan key havuzu"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = KeyPool(store=open_key_store())
+            # Çıkışta arka planda bekleyen quota/geçersiz kayıtları kaybolmasın
+            atexit.register(_shared_pool.flush, STORE_FLUSH_TIMEOUT_SECONDS)
+        return _shared_pool
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Kalıcı Key Sağlık Deposu
+Key cooldown'ları, geçersiz key'ler ve günlük kullanım sayaçları yerel bir
+SQLite dosyasında tutulur. Aynı makinedeki tüm process'ler (Streamlit
+worker'ları, API, batch) bu durumu paylaşır ve yeniden başlatmada kaybolmaz.
+Key'lerin kendisi değil, SHA-256 özetleri saklanır.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+DEFAULT_STATE_PATH = os.path.join("config", "key_state.sqlite3")
+
+# Gemini günlük quota'ları Pasifik saatiyle gece yarısı sıfırlanır
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+# Aynı gün içinde art arda bu kadar quota hatası alan key, günlük limiti dolmuş sayılır
+DAILY_EXHAUSTION_STRIKES = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS key_health (
+    key_id TEXT PRIMARY KEY,
+    quota_day TEXT NOT NULL,
+    cooldown_until REAL NOT NULL DEFAULT 0,
+    invalid INTEGER NOT NULL DEFAULT 0,
+    strikes INTEGER NOT NULL DEFAULT 0,
+    requests INTEGER NOT NULL DEFAULT 0,
+    quota_errors INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+def _now():
+    """Duvar saati (epoch saniye); testler bu fonksiyonu değiştirir"""
+    return time.time()
+
+
+def key_id(key):
+    """Key'in depoda kullanılan, geri çevrilemez kimliği"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def quota_day(now=None):
+    """Geçerli quota günü (Pasifik saatine göre YYYY-MM-DD)"""
+    return datetime.fromtimestamp(now or _now(), QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+
+def next_quota_reset(now=None):
+    """Bir sonraki günlük quota sıfırlanma anı (epoch saniye)"""
+    local = datetime.fromtimestamp(now or _now(), QUOTA_TIMEZONE)
+    midnight = (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.timestamp()
+
+
+def state_path():
+    """KEY_STATE_PATH; boş bırakılırsa kalıcı depo kapatılır"""
+    return os.getenv("KEY_STATE_PATH", DEFAULT_STATE_PATH)
+
+
+class KeyHealthStore:
+    """
+    SQLite tabanlı paylaşılan key durumu.
+    Zamanlar duvar saati (epoch) olarak tutulur; process'ler arası karşılaştırılabilir.
+    Quota günü değişince sayaçlar, art arda quota sayacı ve geçersiz işaretleri sıfırlanır
+    (geçersiz key'ler günde bir kez yeniden denenir).
+    """
+
+    def __init__(self, path=None):
+        self.path = path or state_path()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+
+    def _roll_day(self, today):
+        self._conn.execute(
+            "UPDATE key_health SET quota_day = ?, requests = 0, quota_errors = 0, errors = 0, "
+            "strikes = 0, invalid = 0 WHERE quota_day != ?", (today, today)
+        )
+
+    def _ensure(self, key_ids, today):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO key_health (key_id, quota_day) VALUES (?, ?)",
+            [(kid, today) for kid in key_ids]
+        )
+
+    def _write(self, sql, params):
+        now = _now()
+        today = quota_day(now)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._roll_day(today)
+                self._ensure([params[-1]], today)
+                self._conn.execute(sql, (*params[:-1], now, params[-1]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load(self, key_ids):
+        """
+        Salt okunur; gün dönümü sıfırlaması yalnızca yazmalarda kalıcı yapılır,
+        burada önceki günden kalan satırlar sıfırlanmış gibi döner.
+        Returns:
+            {key_id: {"cooldown_until", "invalid", "requests", "quota_errors", "errors", "strikes"}}
+        """
+        today = quota_day()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key_id, quota_day, cooldown_until, invalid, requests, quota_errors, errors, strikes "
+                "FROM key_health"
+            ).fetchall()
+
+        wanted = set(key_ids)
+        states = {}
+        for kid, day, cooldown_until, invalid, requests, quota_errors, errors, strikes in rows:
+            if kid not in wanted:
+                continue
+            if day != today:
+                invalid, requests, quota_errors, errors, strikes = 0, 0, 0, 0, 0
+            states[kid] = {
+                "cooldown_until": cooldown_until,
+                "invalid": bool(invalid),
+                "requests": requests,
+                "quota_errors": quota_errors,
+                "errors": errors,
+                "strikes": strikes,
+            }
+        return states
+
+    def record_success(self, kid):
+        self._write("UPDATE key_health SET requests = requests + 1, strikes = 0, updated_at = ? "
+                    "WHERE key_id = ?", (kid,))
+
+    def record_error(self, kid):
+        self._write("UPDATE key_health SET requests = requests + 1, errors = errors + 1, updated_at = ? "
+                    "WHERE key_id = ?", (kid,))
+
+    def record_quota(self, kid, cooldown_until, strike=True):
+        """
+        Quota hatası: cooldown uygulanır; gün içinde art arda DAILY_EXHAUSTION_STRIKES
+        hataya ulaşılırsa key bir sonraki quota sıfırlanmasına kadar dinlendirilir.
+        Args:
+            strike: False ise (dakikalık quota, başlangıç yoklaması) hata sayılır ama
+                art arda quota sayacı artmaz
+        """
+        if not strike:
+            self._write(
+                "UPDATE key_health SET requests = requests + 1, quota_errors = quota_errors + 1, "
+                "cooldown_until = MAX(cooldown_until, ?), updated_at = ? WHERE key_id = ?",
+                (cooldown_until, kid)
+            )
+            return
+        self._write(
+            "UPDATE key_health SET requests = requests + 1, quota_errors = quota_errors + 1, "
+            "strikes = strikes + 1, "
+            "cooldown_until = MAX(cooldown_until, CASE WHEN strikes + 1 >= ? THEN ? ELSE ? END), "
+            "updated_at = ? WHERE key_id = ?",
+            (DAILY_EXHAUSTION_STRIKES, next_quota_reset(), cooldown_until, kid)
+        )
+
+    def cool_down(self, kid, cooldown_until):
+        self._write("UPDATE key_health SET cooldown_until = MAX(cooldown_until, ?), updated_at = ? "
+                    "WHERE key_id = ?", (cooldown_until, kid))
+
+    def mark_invalid(self, kid):
+        self._write("UPDATE key_health SET invalid = 1, updated_at = ? WHERE key_id = ?", (kid,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_key_store(path=None):
+    """
+    Paylaşılan depoyu aç; KEY_STATE_PATH boşsa veya dosya açılamazsa None döner
+    (havuz bu durumda yalnızca process içi durumla çalışır).
+    """
+    path = state_path() if path is None else path
+    if not path:
+        return None
+    try:
+        return KeyHealthStore(path)
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠️ Key durum deposu açılamadı ({path}): {e}")
+        return None
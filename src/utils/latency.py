@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Gecikme Takibi
+Son N ölçümün kayan penceresi üzerinden yüzdelik (p50/p95/p99) hesaplar.
+"""
+
+import math
+import threading
+from collections import deque
+
+DEFAULT_WINDOW = 500
+
+
+class LatencyTracker:
+    """Thread-safe kayan pencere; ölçümler saniye cinsinden tutulur"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.total = 0
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.total += 1
+
+    def percentile(self, p: float):
+        """p. yüzdelik (0-100, en yakın sıra yöntemi); ölçüm yoksa None"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, math.ceil(p / 100 * len(samples)))
+        return samples[min(rank, len(samples)) - 1]
+
+    def summary(self):
+        """Milisaniye cinsinden özet"""
+        def ms(value):
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            "count": self.total,
+            "p50_ms": ms(self.percentile(50)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+        }
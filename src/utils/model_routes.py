@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Aşama Bazlı Model Yönlendirme
+Pipeline'ın her aşaması (düşünme adımları, haber özeti, persona analizi, final
+cevap) kendi modeli ve üretim ayarlarıyla (maxOutputTokens, temperature,
+stopSequences) çağrılır. Kısa cevap beklenen aşamalar sınırlandırılır; final
+cevap modelin varsayılanlarıyla üretilir.
+"""
+
+import json
+import os
+
+# Düşünme adımları "2-3 cümle" ister; boş satırda kesilir
+THINKING_STAGES = ("SORU_ANALIZI", "ARAMA_KARARI", "CEVAP_PLANLAMA")
+
+
+def fast_model():
+    """Ucuz aşamalar için model (GEMINI_FAST_MODEL; verilmezse istemcinin varsayılan modeli)"""
+    return os.getenv("GEMINI_FAST_MODEL") or None
+
+
+def default_routes():
+    """
+    Varsayılan yönlendirme tablosu: aşama -> {"model", "generation_config"}
+    model None ise istemcinin varsayılan modeli kullanılır.
+    """
+    fast = fast_model()
+    thinking = {
+        "model": fast,
+        "generation_config": {"maxOutputTokens": 160, "temperature": 0.4, "stopSequences": ["\n\n\n"]},
+    }
+    routes = {stage: thinking for stage in THINKING_STAGES}
+    routes.update({
+        "ARAMA_TERIMLERI": {
+            "model": fast,
+            "generation_config": {"maxOutputTokens": 48, "temperature": 0.2, "stopSequences": ["\n\n"]},
+        },
+        # Final prompt'a özetin ilk ~1500 karakteri girer; daha uzun özet boşa üretilir
+        "HABER_OZETI": {
+            "model": fast,
+            "generation_config": {"maxOutputTokens": 900, "temperature": 0.2},
+        },
+        # Persona analizi "150 kelimeye kadar" ister
+        "DETAYLI_ANALIZ": {
+            "model": None,
+            "generation_config": {"maxOutputTokens": 400, "temperature": 0.7},
+        },
+        "CEVAP": {"model": None, "generation_config": {}},
+    })
+    return routes
+
+
+class ModelRouter:
+    """
+    Aşama -> (model, üretim ayarları) tablosu.
+    MODEL_ROUTES ortam değişkeni JSON olarak verilirse varsayılanların üzerine yazılır, ör.:
+        MODEL_ROUTES='{"CEVAP": {"model": "gemini-1.5-pro"},
+                       "SORU_ANALIZI": {"generation_config": {"maxOutputTokens": 80}}}'
+    """
+
+    def __init__(self, routes=None):
+        self.routes = default_routes()
+        overrides = routes if routes is not None else self._env_overrides()
+        for stage, route in overrides.items():
+            current = self.routes.get(stage, {"model": None, "generation_config": {}})
+            self.routes[stage] = {
+                "model": route.get("model", current["model"]),
+                "generation_config": {**current["generation_config"], **route.get("generation_config", {})},
+            }
+
+    @staticmethod
+    def _env_overrides():
+        value = os.getenv("MODEL_ROUTES")
+        if not value:
+            return {}
+        try:
+            overrides = json.loads(value)
+        except json.JSONDecodeError as e:
+            print(f"⚠️ MODEL_ROUTES okunamadı, varsayılanlar kullanılıyor: {e}")
+            return {}
+        if not isinstance(overrides, dict):
+            print("⚠️ MODEL_ROUTES bir JSON nesnesi olmalı, varsayılanlar kullanılıyor")
+            return {}
+        return overrides
+
+    def route(self, stage, model=None, generation_config=None):
+        """
+        Aşamanın modeli ve üretim ayarları; çağıranın açıkça verdiği değerler önceliklidir.
+        Returns:
+            (model veya None, generation_config veya None)
+        """
+        route = self.routes.get(stage)
+        if route is None:
+            return model, generation_config
+
+        config = {**route["generation_config"], **(generation_config or {})}
+        return model or route["model"], config or None
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Yerel Haber Arşivi
+Exa'dan gelen her haber (URL, alan adı, yayın tarihi, başlık, metin) SQLite
+FTS5 tam metin dizinine yazılır. Takip soruları ve diğer persona'lar önce bu
+arşive bakar; Exa'ya yalnızca arşivde yeterli ve taze sonuç yoksa gidilir.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+DEFAULT_CORPUS_PATH = os.path.join("config", "news_corpus.sqlite3")
+
+# Arşivdeki haber bu süreden eskiyse (çekilme zamanına göre) Exa'ya yeniden gidilir
+DEFAULT_MAX_AGE_HOURS = 6.0
+
+# Bu süreden eski haberler arşivden silinir
+DEFAULT_RETENTION_DAYS = 30
+
+# Her bu kadar eklemede bir eski kayıtlar temizlenir
+PRUNE_EVERY = 200
+
+# Aramada kullanılan en kısa kelime (daha kısalar FTS sorgusuna girmez)
+MIN_TERM_LENGTH = 3
+
+# Exa metin çıktısı: her haber "Title:" satırıyla başlar, "Text:" sonrası haberin metnidir
+_BLOCK_RE = re.compile(r"^(?=Title:)", re.MULTILINE)
+_HEADER_RE = re.compile(r"^(Title|URL|Published Date|Author):\s?(.*)$")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    domain TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    published TEXT NOT NULL DEFAULT '',
+    text TEXT NOT NULL DEFAULT '',
+    query TEXT NOT NULL DEFAULT '',
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_fetched_at ON articles (fetched_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, text, content='articles', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _now():
+    """Duvar saati (epoch saniye); testler bu fonksiyonu değiştirir"""
+    return time.time()
+
+
+def _domain(url):
+    domain = urlparse(url).netloc.lower()
+    return domain[4:] if domain.startswith("www.") else domain
+
+
+def _article(url, title="", published="", text=""):
+    url = (url or "").strip().rstrip(".,;")
+    if not url.startswith(("http://", "https://")):
+        return None
+    return {
+        "url": url,
+        "domain": _domain(url),
+        "title": (title or "").strip(),
+        "published": (published or "").strip()[:10],
+        "text": (text or "").strip(),
+    }
+
+
+def parse_results(raw):
+    """
+    Exa araç çıktısını haber listesine çevir.
+    JSON ({"results": [...]}) ve "Title:/URL:/Text:" metin biçimleri desteklenir.
+    """
+    if not raw:
+        return []
+
+    try:
+        data = json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        data = None
+
+    if isinstance(data, dict):
+        articles = [_article(item.get("url"), item.get("title"), item.get("publishedDate"), item.get("text"))
+                    for item in data.get("results") or [] if isinstance(item, dict)]
+        return [article for article in articles if article]
+
+    articles = []
+    for block in _BLOCK_RE.split(raw):
+        fields = {}
+        head, _, text = block.partition("\nText:")
+        for line in head.splitlines():
+            match = _HEADER_RE.match(line.strip())
+            if match:
+                fields[match.group(1)] = match.group(2)
+        article = _article(fields.get("URL"), fields.get("Title"), fields.get("Published Date"), text)
+        if article:
+            articles.append(article)
+    return articles
+
+
+def build_match_query(text, require_all=False):
+    """
+    Serbest metinden FTS5 sorgusu; her kelime önek aramasıdır (Türkçe ekler için).
+    require_all=False ise kelimeler OR ile bağlanır ve bm25 sıralar.
+    """
+    terms = []
+    for word in _WORD_RE.findall((text or "").replace("İ", "i").replace("I", "ı").lower()):
+        if len(word) >= MIN_TERM_LENGTH and not word.isdigit() and word not in terms:
+            terms.append(word)
+    return (" AND " if require_all else " OR ").join(f'"{term}"*' for term in terms[:12])
+
+
+def format_articles(articles):
+    """Arşiv sonuçlarını Exa metin çıktısına benzer biçimde birleştir"""
+    blocks = []
+    for article in articles:
+        blocks.append(f"Title: {article['title']}\nURL: {article['url']}\n"
+                      f"Published Date: {article['published']}\nText: {article['text']}")
+    return "\n\n".join(blocks)
+
+
+class NewsCorpus:
+    """SQLite FTS5 haber arşivi; tek bağlantı, thread'ler arası kilitle paylaşılır"""
+
+    def __init__(self, path=None, max_age_hours=None, retention_days=DEFAULT_RETENTION_DAYS):
+        self.path = path or corpus_path()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if max_age_hours is None:
+            max_age_hours = float(os.getenv("NEWS_CORPUS_MAX_AGE_HOURS") or DEFAULT_MAX_AGE_HOURS)
+        self.max_age_seconds = max_age_hours * 3600
+        self.retention_seconds = retention_days * 86400
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._inserts = 0
+        self.stats = {"stored": 0, "lookups": 0, "hits": 0, "misses": 0}
+
+    def add_results(self, raw, query=""):
+        """Exa çıktısındaki haberleri arşive ekle; yeni eklenen haber sayısını döndür"""
+        articles = parse_results(raw)
+        if not articles:
+            return 0
+
+        now = _now()
+        added = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for article in articles:
+                    cursor = self._conn.execute(
+                        "INSERT INTO articles (url, domain, title, published, text, query, fetched_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(url) DO NOTHING",
+                        (article["url"], article["domain"], article["title"], article["published"],
+                         article["text"], query, now)
+                    )
+                    if cursor.rowcount:
+                        self._conn.execute("INSERT INTO articles_fts (rowid, title, text) VALUES (?, ?, ?)",
+                                           (cursor.lastrowid, article["title"], article["text"]))
+                        added += 1
+                    else:
+                        # Zaten arşivde: yalnızca tazelik bilgisini güncelle
+                        self._conn.execute("UPDATE articles SET fetched_at = ? WHERE url = ?",
+                                           (now, article["url"]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            self._inserts += added
+            self.stats["stored"] += added
+            if self._inserts >= PRUNE_EVERY:
+                self._inserts = 0
+                self._prune(now)
+        return added
+
+    def _prune(self, now):
+        cutoff = now - self.retention_seconds
+        rows = self._conn.execute("SELECT id, title, text FROM articles WHERE fetched_at < ?", (cutoff,)).fetchall()
+        if not rows:
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany("INSERT INTO articles_fts (articles_fts, rowid, title, text) "
+                                   "VALUES ('delete', ?, ?, ?)", rows)
+            self._conn.execute("DELETE FROM articles WHERE fetched_at < ?", (cutoff,))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        print(f"🗄️ HABER ARŞİVİ: {len(rows)} eski haber silindi")
+
+    def search(self, text, limit=10, max_age_seconds=None, require_all=False):
+        """
+        Arşivde tam metin arama (bm25 sıralı).
+        Args:
+            max_age_seconds: Yalnızca bu süre içinde çekilmiş haberler (varsayılan: NEWS_CORPUS_MAX_AGE_HOURS)
+            require_all: Tüm kelimeleri içeren haberler
+        """
+        match = build_match_query(text, require_all)
+        if not match:
+            return []
+        max_age = self.max_age_seconds if max_age_seconds is None else max_age_seconds
+        since = _now() - max_age if max_age else 0
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.url, a.domain, a.title, a.published, a.text, a.fetched_at "
+                "FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+                "WHERE articles_fts MATCH ? AND a.fetched_at >= ? "
+                "ORDER BY bm25(articles_fts, 5.0, 1.0) LIMIT ?",
+                (match, since, limit)
+            ).fetchall()
+
+        columns = ("url", "domain", "title", "published", "text", "fetched_at")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def lookup(self, query, num_results, exclude_urls=(), max_age_seconds=None):
+        """
+        Bir arama yerine arşivi kullanmayı dene; sorgunun tüm kelimelerini içeren haberler aranır.
+        Args:
+            exclude_urls: Bu sohbette zaten toplanmış haberler (yalnızca yeni haberler sayılır)
+        Returns:
+            Yeterli (num_results kadar) taze ve yeni sonuç varsa Exa çıktısı biçiminde metin, yoksa None
+        """
+        try:
+            articles = self.search(query, limit=num_results + len(exclude_urls), max_age_seconds=max_age_seconds,
+                                   require_all=True)
+        except sqlite3.Error as e:
+            print(f"⚠️ Haber arşivi okunamadı: {e}")
+            articles = []
+        articles = [article for article in articles if article["url"] not in exclude_urls][:num_results]
+        with self._lock:
+            self.stats["lookups"] += 1
+            if len(articles) < num_results:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+        return format_articles(articles)
+
+    def status(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+        return {"articles": count, "max_age_hours": round(self.max_age_seconds / 3600, 1), **self.stats}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def corpus_path():
+    """NEWS_CORPUS_PATH; boş bırakılırsa arşiv kapatılır"""
+    return os.getenv("NEWS_CORPUS_PATH", DEFAULT_CORPUS_PATH)
+
+
+_shared_corpus = None
+_shared_lock = threading.Lock()
+_shared_opened = False
+
+
+def get_news_corpus():
+    """Process genelinde paylaşılan haber arşivi; kapalıysa veya açılamazsa None"""
+    global _shared_corpus, _shared_opened
+    with _shared_lock:
+        if not _shared_opened:
+            _shared_opened = True
+            path = corpus_path()
+            if path:
+                try:
+                    _shared_corpus = NewsCorpus(path)
+                except (sqlite3.Error, OSError) as e:
+                    print(f"⚠️ Haber arşivi açılamadı ({path}): {e}")
+        return _shared_corpus
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Genel Gündem Ön Belleği
+Kullanıcı girdisine bağlı olmayan sabit gündem aramalarını arka planda belirli
+aralıklarla yeniler. Sohbetler bu sıcak anlık görüntüyü okur; kritik yolda
+yalnızca anahtar kelimeye bağlı aramalar kalır.
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from src.utils.admission import BATCH, get_admission_controller
+from src.utils.exa_search import get_search_client
+
+# Varsayılan kapalı: açıkken process boşta da olsa her aralıkta Exa araması yapar
+DEFAULT_PREFETCH_INTERVAL = 0.0
+
+# Kabul kontrolünde ön bellek yenilemelerinin oturum adı
+PREFETCH_TENANT = "news-prefetch"
+
+# Anlık görüntü bu kadar yenileme aralığı boyunca güncellenmezse bayat sayılır
+STALE_AFTER_INTERVALS = 3
+
+# Sabit aramalar; "position" orijinal 8'li arama planındaki sırasıdır
+GENERAL_NEWS_QUERIES = [
+    {"position": 2, "query": "Türkiye haberleri gündem", "num_results": 6, "label": "GÜNCEL HABERLER",
+     "start_published_date": "2024-01-01", "end_published_date": "2025-12-31"},
+    {"position": 6, "query": "son dakika Türkiye", "num_results": 6, "label": "SON DAKİKA"},
+    {"position": 7, "query": "Türkiye 2023 2024 2025 haber", "num_results": 5, "label": "TARİH ARAMASI"},
+    {"position": 8, "query": "Türkiye gündem analiz", "num_results": 4, "label": "GÜNDEM ANALİZİ"},
+]
+
+
+def prefetch_interval():
+    """NEWS_PREFETCH_INTERVAL (saniye, ör. 600); verilmezse veya 0 ise ön bellek kapalı"""
+    try:
+        return max(0.0, float(os.getenv("NEWS_PREFETCH_INTERVAL", DEFAULT_PREFETCH_INTERVAL)))
+    except ValueError:
+        return DEFAULT_PREFETCH_INTERVAL
+
+
+def prefetch_summary_enabled():
+    return os.getenv("NEWS_PREFETCH_SUMMARY", "0").lower() in ("1", "true", "yes")
+
+
+class NewsPrefetcher:
+    """
+    Sabit gündem aramalarının arka plan yenileyicisi.
+    Anlık görüntü düz veri olduğundan farklı event loop'lar ve thread'ler
+    tarafından okunabilir; yenileme task'ı başlatıldığı loop'ta çalışır.
+    """
+
+    def __init__(self, search_client=None, interval=None, summarize=None):
+        """
+        Args:
+            search_client: Paylaşılan ExaSearchClient
+            interval: Yenileme aralığı (saniye, varsayılan: NEWS_PREFETCH_INTERVAL)
+            summarize: async (ham_metin, arama_sayısı) -> özet; verilirse gündem özeti de hazırlanır
+        """
+        self.search_client = search_client or get_search_client()
+        self.interval = prefetch_interval() if interval is None else interval
+        self.summarize = summarize
+
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._task = None
+        self.stats = {"refreshes": 0, "failures": 0, "hits": 0, "misses": 0}
+
+    @property
+    def enabled(self):
+        return self.interval > 0 and self.search_client.configured
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    async def refresh(self):
+        """Sabit aramaları bir kez çalıştır ve anlık görüntüyü güncelle"""
+        if not self.search_client.available:
+            print("⏸️ GÜNDEM ÖN BELLEĞİ ATLANDI: web araması devre dışı")
+            return None
+
+        results = []
+        for config in GENERAL_NEWS_QUERIES:
+            params = {name: value for name, value in config.items() if name not in ("position", "label")}
+            try:
+                text = await self.search_client.call(params)
+            except Exception as e:
+                print(f"❌ ÖN BELLEK {config['label']} HATASI: {e}")
+                text = ""
+            if text:
+                results.append((config["position"], text))
+
+            # API rate limiting için kısa bekleyiş
+            await asyncio.sleep(0.2)
+
+        if not results:
+            self.stats["failures"] += 1
+            print("⚠️ GÜNDEM ÖN BELLEĞİ YENİLENEMEDİ: sonuç yok")
+            return None
+
+        summary = ""
+        if self.summarize is not None:
+            try:
+                summary = await self.summarize("\n\n".join(text for _, text in results), len(results))
+            except Exception as e:
+                print(f"⚠️ Gündem özeti hazırlanamadı: {e}")
+
+        snapshot = {"results": results, "summary": summary, "fetched_at": time.time()}
+        with self._lock:
+            self._snapshot = snapshot
+        self.stats["refreshes"] += 1
+        print(f"🗞️ GÜNDEM ÖN BELLEĞİ YENİLENDİ: {len(results)}/{len(GENERAL_NEWS_QUERIES)} arama")
+        return snapshot
+
+    def snapshot(self):
+        """Sıcak anlık görüntü; yoksa veya bayatsa None"""
+        with self._lock:
+            snapshot = self._snapshot
+
+        if snapshot is None or not self.interval or \
+                time.time() - snapshot["fetched_at"] > self.interval * STALE_AFTER_INTERVALS:
+            self.stats["misses"] += 1
+            return None
+
+        self.stats["hits"] += 1
+        return snapshot
+
+    async def _run(self):
+        while True:
+            try:
+                # Arka plan işi: sohbetlerle aynı slotları toplu öncelikte kullanır
+                await get_admission_controller().run(PREFETCH_TENANT, self.refresh(), lane=BATCH)
+            except Exception as e:
+                self.stats["failures"] += 1
+                print(f"❌ Gündem ön belleği hatası: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Çalışan loop'ta yenileme task'ını başlat (zaten çalışıyorsa bir şey yapmaz)"""
+        if not self.enabled:
+            return False
+        if not self.running:
+            print(f"🗞️ GÜNDEM ÖN BELLEĞİ BAŞLATILDI: her {self.interval:.0f} sn")
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return True
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self):
+        with self._lock:
+            snapshot = self._snapshot
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "interval": self.interval,
+            "age_seconds": round(time.time() - snapshot["fetched_at"], 1) if snapshot else None,
+            "summary": bool(snapshot and snapshot["summary"]),
+            **self.stats,
+        }
+
+
+_shared_prefetcher = None
+_shared_lock = threading.Lock()
+
+
+def get_news_prefetcher():
+    """Process genelinde paylaşılan gündem ön belleği"""
+    global _shared_prefetcher
+    with _shared_lock:
+        if _shared_prefetcher is None:
+            _shared_prefetcher = NewsPrefetcher()
+        return _shared_prefetcher
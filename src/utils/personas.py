@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Persona Yardımcıları
+src/personas/ klasöründeki JSON persona dosyalarını listele, yükle ve prompt'a çevir
+"""
+
+import functools
+import json
+import os
+
+PERSONAS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'personas')
+
+
+def list_personas():
+    """Mevcut persona'ları (dosya adı, .json'suz) listele"""
+    try:
+        return sorted(file[:-5] for file in os.listdir(PERSONAS_DIR) if file.endswith('.json'))
+    except OSError:
+        return []
+
+
+def fallback_persona(persona_name):
+    """Fallback persona"""
+    return {
+        "name": persona_name.replace('_', ' ').title(),
+        "bio": ["Genel bir persona"],
+        "style": {"chat": ["Normal konuşur"]},
+        "lore": [""],
+        "knowledge": [""]
+    }
+
+
+def load_persona(persona_name, strict=False):
+    """
+    Persona JSON dosyasını yükle
+    Args:
+        persona_name: src/personas/ klasöründeki JSON dosya adı
+        strict: True ise dosya bulunamadığında fallback yerine hata fırlat
+    """
+    path = os.path.join(PERSONAS_DIR, f'{persona_name}.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        if strict:
+            raise
+        return fallback_persona(persona_name)
+
+
+def build_system_prompt(persona):
+    """Persona'dan sistem promptu oluştur"""
+    bio_text = "\n- ".join(persona.get("bio", ["Bilinmiyor"]))
+    style_text = "\n- ".join(persona.get("style", {}).get("chat", ["Normal konuşur"]))
+    lore_text = "\n- ".join(persona.get("lore", [""])[:15])
+    knowledge_text = "\n- ".join(persona.get("knowledge", [""])[:8])
+
+    return f"""Sen {persona["name"]}'sin. Aşağıdaki kimliğin:
+
+BİOGRAFİ:
+- {bio_text}
+
+KONUŞMA TARZI:
+- {style_text}
+
+HAYATA BAKIŞ:
+- {lore_text}
+
+BİLGİN:
+- {knowledge_text}
+
+ÖNEMLİ KURALLAR:
+- Karakterine uygun davran
+- Güncel olayları web aramalarından öğreniyorsun
+- Kendi görüşlerini belirt ama saygılı ol
+- Detaylı bilgi ver ama çok uzun olma"""
+
+
+@functools.lru_cache(maxsize=None)
+def cached_system_prompt(persona_name):
+    """Persona dosyaları çalışma sırasında değişmediğinden sistem promptu process başına bir kez üretilir"""
+    return build_system_prompt(load_persona(persona_name))
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - İstek Bazlı Profil Çıkarma
+İstenen (veya PROFILE_SAMPLE_RATE oranında rastgele seçilen) bir sohbet
+süresince ilgili thread'lerin (event loop, Streamlit script thread'i) yığını
+periyodik olarak örneklenir. İki profil yazılır:
+
+- <ad>.wall.folded: duvar saati; ağ beklemeleri event loop'un selector
+  çağrısında görünür
+- <ad>.cpu.folded: thread'in boşta beklemediği (selector veya kilit
+  beklemesinde olmadığı) örnekler; prompt kurma, JSON işleme ve render
+  maliyeti burada görünür
+
+Dosyalar "katlanmış yığın" (folded stacks) biçimindedir; flamegraph.pl,
+speedscope veya inferno ile doğrudan açılır. Örnekleme aynı loop'taki diğer
+sohbetleri de görür; tek sohbeti ölçmek için sakin bir anda profil alın.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+DEFAULT_PROFILE_DIR = "profiles"
+
+# Örnekleme aralığı (saniye)
+DEFAULT_INTERVAL_SECONDS = 0.005
+
+# Dizinde tutulan en fazla profil sayısı; eskiler silinir
+MAX_KEPT_PROFILES = 50
+
+MAX_STACK_DEPTH = 128
+
+# Profil sürerken GIL devir aralığı; örnekleyici thread ancak GIL'i alınca yığın
+# görebildiğinden varsayılan 5 ms'de kısa CPU patlamaları hiç örneklenmez
+PROFILE_SWITCH_INTERVAL = 0.0005
+
+_SLUG_RE = re.compile(r"[^\w-]+", re.UNICODE)
+PROFILE_FILE_RE = re.compile(r"^[\w.-]+\.(wall\.folded|cpu\.folded|json)$")
+
+# Yaprak çerçevesi bunlardan biriyse thread boşta bekliyordur (ağ, kuyruk veya kilit)
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+}
+
+# Aktif profil; iç içe sarılmış çağrılar (Streamlit handler -> agent.chat) ikinci profil açmaz
+_active = contextvars.ContextVar("active_profile", default=None)
+
+_switch_lock = threading.Lock()
+_switch_users = 0
+_default_switch_interval = None
+
+
+def _tighten_switch_interval():
+    global _switch_users, _default_switch_interval
+    with _switch_lock:
+        if _switch_users == 0:
+            _default_switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(PROFILE_SWITCH_INTERVAL)
+        _switch_users += 1
+
+
+def _restore_switch_interval():
+    global _switch_users
+    with _switch_lock:
+        _switch_users -= 1
+        if _switch_users == 0:
+            sys.setswitchinterval(_default_switch_interval)
+
+
+def profile_dir():
+    """PROFILE_DIR (varsayılan: ./profiles)"""
+    return os.getenv("PROFILE_DIR") or DEFAULT_PROFILE_DIR
+
+
+def sample_rate():
+    """PROFILE_SAMPLE_RATE: istenmeden profillenecek isteklerin oranı (0-1, varsayılan 0)"""
+    try:
+        return min(1.0, max(0.0, float(os.getenv("PROFILE_SAMPLE_RATE") or 0)))
+    except ValueError:
+        return 0.0
+
+
+def should_profile(requested=None):
+    """requested True/False ise ona uyulur; None ise örnekleme oranına göre seçilir"""
+    if requested is not None:
+        return bool(requested)
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def is_idle(frame):
+    """Thread'in yaprak çerçevesi bir bekleme mi (selector, Event/Condition, kuyruk)"""
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def _frame_label(code):
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def fold_stack(thread_name, frame):
+    """Yığını kökten yaprağa "thread;fonksiyon (dosya:satır);..." biçimine çevir"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(thread_name.replace(";", ":"))
+    return ";".join(reversed(labels))
+
+
+class RequestProfiler:
+    """Verilen thread'leri ayrı bir thread'den örnekleyen profil"""
+
+    def __init__(self, name, threads=None, interval=DEFAULT_INTERVAL_SECONDS):
+        self.name = name
+        self.threads = list(threads or [threading.current_thread()])
+        self.interval = interval
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{_SLUG_RE.sub('_', name)[:40]}-{uuid.uuid4().hex[:6]}"
+        self.wall = Counter()
+        self.cpu = Counter()
+        self.started = None
+        self.duration = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        _tighten_switch_interval()
+        self.started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.profile_id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        self.duration = time.perf_counter() - self.started
+        _restore_switch_interval()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread in self.threads:
+                frame = frames.get(thread.ident)
+                if frame is None:
+                    continue
+                stack = fold_stack(thread.name, frame)
+                self.wall[stack] += 1
+                if not is_idle(frame):
+                    self.cpu[stack] += 1
+
+    def save(self, directory=None):
+        """
+        Profil dosyalarını yaz ve eski profilleri temizle.
+        Returns:
+            Profil özeti (latest_profiles ile aynı biçim)
+        """
+        directory = directory or profile_dir()
+        os.makedirs(directory, exist_ok=True)
+
+        files = []
+        for kind, counts in (("wall", self.wall), ("cpu", self.cpu)):
+            if not counts:
+                continue
+            filename = f"{self.profile_id}.{kind}.folded"
+            with open(os.path.join(directory, filename), "w", encoding="utf-8") as out:
+                for stack, count in counts.most_common():
+                    out.write(f"{stack} {count}\n")
+            files.append(filename)
+
+        summary = {
+            "id": self.profile_id,
+            "name": self.name,
+            "created_at": time.time(),
+            "duration_seconds": round(self.duration or 0.0, 3),
+            "interval_ms": self.interval * 1000,
+            "threads": [thread.name for thread in self.threads],
+            "wall_samples": sum(self.wall.values()),
+            "cpu_samples": sum(self.cpu.values()),
+            "files": files,
+        }
+        with open(os.path.join(directory, f"{self.profile_id}.json"), "w", encoding="utf-8") as out:
+            json.dump(summary, out, ensure_ascii=False, indent=2)
+
+        _prune(directory)
+        return summary
+
+
+def _prune(directory, keep=MAX_KEPT_PROFILES):
+    summaries = sorted((name for name in os.listdir(directory) if name.endswith(".json")), reverse=True)
+    for name in summaries[keep:]:
+        profile_id = name[:-len(".json")]
+        for suffix in (".json", ".wall.folded", ".cpu.folded"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(directory, profile_id + suffix))
+
+
+def latest_profiles(limit=5, directory=None):
+    """Dizindeki en yeni profillerin özetleri (yeniden eskiye)"""
+    directory = directory or profile_dir()
+    try:
+        names = sorted((name for name in os.listdir(directory) if name.endswith(".json")), reverse=True)
+    except FileNotFoundError:
+        return []
+
+    summaries = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as summary:
+                summaries.append(json.load(summary))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return summaries
+
+
+def profile_file(filename, directory=None):
+    """Profil dizinindeki dosyanın yolu; geçersiz veya olmayan adlar için None"""
+    if not PROFILE_FILE_RE.match(filename or ""):
+        return None
+    path = os.path.join(directory or profile_dir(), filename)
+    return path if os.path.isfile(path) else None
+
+
+@contextlib.contextmanager
+def profile_request(name, requested=None, threads=None):
+    """
+    Bloğu profille (istenmediyse ve örneklemeye düşmediyse hiçbir şey yapmaz).
+    Args:
+        requested: True/False istek bazlı seçim; None ise PROFILE_SAMPLE_RATE uygulanır
+        threads: Örneklenecek thread'ler (varsayılan: çağıran thread)
+    Yields:
+        RequestProfiler veya None
+    """
+    if _active.get() is not None or not should_profile(requested):
+        yield None
+        return
+
+    profiler = RequestProfiler(name, threads)
+    token = _active.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _active.reset(token)
+        try:
+            summary = profiler.save()
+            print(f"🔬 PROFİL KAYDEDİLDİ: {summary['id']} ({summary['duration_seconds']} sn, "
+                  f"{summary['wall_samples']} örnek, {summary['cpu_samples']} CPU örneği)")
+        except OSError as e:
+            print(f"⚠️ Profil yazılamadı: {e}")
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Persona Prompt Ön Eki Önbelleği
+Persona sistem promptu (bio, stil, lore, bilgi) bir kez kaydedilir; istekler
+yalnızca kaydın tutamacını ve değişken son eki taşır.
+
+İki uygulama vardır:
+- LocalPromptCache: tutamacı yerelde açıp ön eki `systemInstruction` olarak
+  gönderir (test ve varsayılan; davranış düz metinle aynıdır).
+- GeminiPromptCache: ön eki Gemini `cachedContents` API'sine bir kez yükler ve
+  isteklerde yalnızca `cachedContent` adını gönderir. Önbellek kayıtları API
+  projesine bağlı olduğundan key + model başına tutulur; oluşturulamazsa (ör.
+  model veya minimum token şartı) o model için yerel yönteme düşülür. Geçici
+  hatalarda (429, 5xx) o key + model için oluşturma artan aralıklarla ertelenir.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import weakref
+
+GEMINI_CACHE_URL = "https://generativelanguage.googleapis.com/v1beta/cachedContents"
+
+DEFAULT_CACHE_TTL_SECONDS = 3600
+
+# Süresi dolmak üzere olan kayıt yerine yenisi oluşturulur
+CACHE_REFRESH_MARGIN_SECONDS = 120
+
+# Başarısız oluşturmadan sonra aynı key + model için bekleme (her hatada iki katına çıkar)
+CREATE_BACKOFF_SECONDS = 30.0
+MAX_CREATE_BACKOFF_SECONDS = 900.0
+
+# Erteleme bittikten bu kadar sonra tekrar denenmeyen key + model'in erteleme geçmişi silinir
+BACKOFF_RETENTION_SECONDS = MAX_CREATE_BACKOFF_SECONDS
+
+# Süresi dolmuş kayıtların ve eski ertelemelerin en fazla bu aralıkla toplu temizlenmesi
+SWEEP_INTERVAL_SECONDS = 60.0
+
+
+class PrefixHandle:
+    """Kaydedilmiş statik ön ek"""
+
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+    def __repr__(self):
+        return f"PrefixHandle({self.name!r}, {len(self.text)} karakter)"
+
+
+class CacheUnsupportedError(Exception):
+    """Model veya ön ek sunucu önbelleğine uygun değil (ör. minimum token şartı)"""
+
+
+def _system_instruction(handle):
+    return {"systemInstruction": {"parts": [{"text": handle.text}]}}
+
+
+class LocalPromptCache:
+    """Tutamaçları process içinde tutan yerel önbellek"""
+
+    mode = "local"
+
+    def __init__(self):
+        self._handles = {}
+        self._lock = threading.Lock()
+        self.stats = {"registered": 0, "requests": 0, "cached_requests": 0, "bytes_saved": 0}
+
+    def register(self, name, text):
+        """Ön eki kaydet; aynı ad ve metin için aynı tutamaç döner"""
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is None or handle.text != text:
+                handle = self._handles[name] = PrefixHandle(name, text)
+                self.stats["registered"] += 1
+            return handle
+
+    def get(self, name):
+        return self._handles.get(name)
+
+    async def payload_fields(self, handle, key, model, session):
+        """İstek gövdesine eklenecek alanlar"""
+        self.stats["requests"] += 1
+        return _system_instruction(handle)
+
+    def forget(self, handle, key, model):
+        """Sunucuda bulunamayan kaydı unut (yerel önbellekte bir şey yapmaz)"""
+
+    def status(self):
+        return {"mode": self.mode, "prefixes": len(self._handles), **self.stats}
+
+
+class GeminiPromptCache(LocalPromptCache):
+    """Gemini cachedContents üzerinden sunucu tarafı önbellek"""
+
+    mode = "gemini"
+
+    def __init__(self, ttl_seconds=DEFAULT_CACHE_TTL_SECONDS):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        # (key, model, digest) -> (cachedContents adı, geçerlilik sonu)
+        self._entries = {}
+        # loop -> {(key, model, digest): oluşturma future'ı}; kapanan loop'ların kayıtları kendiliğinden düşer
+        self._creating = weakref.WeakKeyDictionary()
+        # Önbelleği desteklemeyen (model, digest) çiftleri; bunlar için yerel yönteme düşülür
+        self._unsupported = set()
+        # (key, model, digest) -> (erteleme sonu, son bekleme süresi)
+        self._backoff = {}
+        self._swept_at = time.monotonic()
+        self.stats["created"] = 0
+        self.stats["create_failures"] = 0
+        self.stats["backed_off"] = 0
+
+    async def _create(self, handle, key, model, session):
+        body = {
+            "model": f"models/{model}",
+            "systemInstruction": {"parts": [{"text": handle.text}]},
+            "ttl": f"{self.ttl_seconds}s",
+            "displayName": f"microcosmos-{handle.name}"[:120],
+        }
+        async with session.post(GEMINI_CACHE_URL, params={"key": key}, json=body) as resp:
+            if resp.status != 200:
+                text = await resp.text()
+                if resp.status == 400:
+                    raise CacheUnsupportedError(text[:200])
+                raise RuntimeError(f"{resp.status}: {text[:200]}")
+            data = await resp.json()
+        return data["name"], time.monotonic() + self.ttl_seconds - CACHE_REFRESH_MARGIN_SECONDS
+
+    async def payload_fields(self, handle, key, model, session):
+        self.stats["requests"] += 1
+        if (model, handle.digest) in self._unsupported:
+            return _system_instruction(handle)
+
+        now = time.monotonic()
+        self._sweep(now)
+
+        entry_key = (key, model, handle.digest)
+        entry = self._entries.get(entry_key)
+        if entry is not None and entry[1] <= now:
+            self._entries.pop(entry_key, None)
+            entry = None
+        if entry is None:
+            backoff = self._backoff.get(entry_key)
+            if backoff is not None and backoff[0] > time.monotonic():
+                # Key sıkışıkken her istekte yeni oluşturma denemesi quota harcar
+                self.stats["backed_off"] += 1
+                return _system_instruction(handle)
+
+            # Aynı kayıt için eşzamanlı istekler tek bir oluşturma çağrısını bekler (future'lar loop'a bağlı)
+            loop = asyncio.get_running_loop()
+            flights = self._creating.get(loop)
+            if flights is None:
+                flights = self._creating.setdefault(loop, {})
+            creating = flights.get(entry_key)
+            if creating is None:
+                creating = flights[entry_key] = asyncio.ensure_future(self._create(handle, key, model, session))
+            try:
+                entry = await asyncio.shield(creating)
+            except Exception as e:
+                self.stats["create_failures"] += 1
+                if isinstance(e, CacheUnsupportedError):
+                    self._unsupported.add((model, handle.digest))
+                else:
+                    self._back_off(entry_key)
+                print(f"⚠️ Prompt önbelleği oluşturulamadı ({handle.name}, {model}), düz gönderilecek: {e}")
+                return _system_instruction(handle)
+            finally:
+                if creating.done():
+                    flights.pop(entry_key, None)
+
+            self._backoff.pop(entry_key, None)
+            if self._entries.get(entry_key) != entry:
+                self._entries[entry_key] = entry
+                self.stats["created"] += 1
+
+        self.stats["cached_requests"] += 1
+        self.stats["bytes_saved"] += len(handle.text.encode("utf-8"))
+        return {"cachedContent": entry[0]}
+
+    def _sweep(self, now):
+        """Süresi dolmuş kayıtları ve uzun süredir denenmeyen ertelemeleri temizle"""
+        if now - self._swept_at < SWEEP_INTERVAL_SECONDS:
+            return
+        self._swept_at = now
+        # Diğer loop'lar (thread'ler) aynı anda ekleyebilir; anlık kopya üzerinde dolaşılır
+        for entry_key, (_, expires_at) in list(self._entries.items()):
+            if expires_at <= now:
+                self._entries.pop(entry_key, None)
+        for entry_key, (until, _) in list(self._backoff.items()):
+            if until + BACKOFF_RETENTION_SECONDS <= now:
+                self._backoff.pop(entry_key, None)
+
+    def _back_off(self, entry_key):
+        previous = self._backoff.get(entry_key)
+        delay = CREATE_BACKOFF_SECONDS if previous is None else min(previous[1] * 2, MAX_CREATE_BACKOFF_SECONDS)
+        self._backoff[entry_key] = (time.monotonic() + delay, delay)
+
+    def forget(self, handle, key, model):
+        self._entries.pop((key, model, handle.digest), None)
+
+    def status(self):
+        now = time.monotonic()
+        return {**super().status(), "entries": len(self._entries), "unsupported": len(self._unsupported),
+                "backing_off": sum(1 for until, _ in self._backoff.values() if until > now)}
+
+
+def prompt_cache_mode():
+    """PROMPT_CACHE: "local" (varsayılan) veya "gemini" """
+    return os.getenv("PROMPT_CACHE", "local").lower()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_prompt_cache():
+    """Process genelinde paylaşılan prompt önbelleği"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            if prompt_cache_mode() == "gemini":
+                ttl = int(os.getenv("PROMPT_CACHE_TTL_SECONDS") or DEFAULT_CACHE_TTL_SECONDS)
+                _shared_cache = GeminiPromptCache(ttl_seconds=ttl)
+            else:
+                _shared_cache = LocalPromptCache()
+        return _shared_cache
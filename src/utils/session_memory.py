@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Oturum Belleği
+Oturumların ağır durumu (görüntülenen mesajlar, persona başına konuşma
+geçmişleri) process genelindeki bu depoda tutulur ve bellek bütçesine uyar:
+
+- Oturum bütçesi: mesajlar bütçeyi aşınca en eskileri diske taşınır; bellekte
+  her zaman en az son birkaç mesaj kalır.
+- Boşta kalan oturumlar (sekme kapandı, kullanıcı ayrıldı) tümüyle diske
+  yazılıp bellekten çıkarılır; oturum geri dönünce ilk erişimde yeniden kurulur.
+- Process bütçesi aşılırsa en uzun süredir kullanılmayan oturumlar diske taşınır.
+
+Sohbeti süren oturumlar (bkz. cancellation.ChatTasks) taşınmaz. Disk dosyaları
+oturum kimliğinin özetiyle adlandırılır ve belirli süre sonra silinir.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from src.utils.cancellation import get_chat_tasks
+
+DEFAULT_SPILL_DIR = os.path.join("config", "sessions")
+
+DEFAULT_SESSION_BUDGET_KB = 256
+DEFAULT_PROCESS_BUDGET_MB = 128
+DEFAULT_IDLE_SECONDS = 900
+
+# Bütçe aşılsa da bellekte tutulan son mesaj sayısı
+KEEP_RECENT_MESSAGES = 4
+
+# Boşta / bütçe taraması en fazla bu sıklıkla yapılır (erişimlerde tembel olarak)
+SWEEP_INTERVAL_SECONDS = 30.0
+
+# Bu süre içinde erişilen oturum, process bütçesi aşılsa da taşınmaz (script'i o an çalışıyor olabilir)
+ACTIVE_GRACE_SECONDS = 60.0
+
+# Diskteki oturum dosyalarının saklanma süresi ve temizlik sıklığı
+SPILL_RETENTION_SECONDS = 7 * 86400
+SPILL_CLEANUP_INTERVAL_SECONDS = 3600.0
+
+
+def _env_number(name, default):
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return float(default)
+
+
+def estimate_bytes(value):
+    """Mesaj / geçmiş yapılarının yaklaşık bellek kullanımı (bayt)"""
+    if isinstance(value, str):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(k) + estimate_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def process_rss_bytes():
+    """Process'in güncel yerleşik belleği (Linux dışında None)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SessionState:
+    """Bir oturumun ağır durumu; listeler yerinde güncellenir (agent'lar geçmişi doğrudan değiştirir)"""
+
+    def __init__(self, session_id, messages=None, histories=None, spilled_messages=0):
+        self.session_id = session_id
+        self.messages = messages if messages is not None else []
+        self.histories = histories if histories is not None else {}
+        # Diske taşınmış (bellekteki mesajlardan eski) mesaj sayısı
+        self.spilled_messages = spilled_messages
+        self.last_seen = time.monotonic()
+
+    def history(self, persona_id):
+        return self.histories.setdefault(persona_id, [])
+
+    def size(self):
+        return estimate_bytes(self.messages) + estimate_bytes(self.histories)
+
+
+class SessionMemory:
+    """Bütçeli, diske taşan oturum deposu (thread-safe)"""
+
+    def __init__(self, spill_dir=None, session_budget_bytes=None, process_budget_bytes=None, idle_seconds=None):
+        """
+        Args:
+            spill_dir: Taşınan oturumların dizini (varsayılan: SESSION_SPILL_DIR, boş = diske yazma, at)
+            session_budget_bytes: Oturum başına bellek bütçesi (varsayılan: SESSION_MEMORY_BUDGET_KB)
+            process_budget_bytes: Tüm oturumların toplam bütçesi (varsayılan: SESSION_MEMORY_PROCESS_MB)
+            idle_seconds: Bu süre erişilmeyen oturum diske taşınır (varsayılan: SESSION_IDLE_SECONDS)
+        """
+        self.spill_dir = os.getenv("SESSION_SPILL_DIR", DEFAULT_SPILL_DIR) if spill_dir is None else spill_dir
+        if session_budget_bytes is None:
+            session_budget_bytes = int(_env_number("SESSION_MEMORY_BUDGET_KB", DEFAULT_SESSION_BUDGET_KB) * 1024)
+        if process_budget_bytes is None:
+            process_budget_bytes = int(_env_number("SESSION_MEMORY_PROCESS_MB", DEFAULT_PROCESS_BUDGET_MB) * 1024 ** 2)
+        if idle_seconds is None:
+            idle_seconds = _env_number("SESSION_IDLE_SECONDS", DEFAULT_IDLE_SECONDS)
+        self.session_budget_bytes = session_budget_bytes
+        self.process_budget_bytes = process_budget_bytes
+        self.idle_seconds = idle_seconds
+
+        self._lock = threading.RLock()
+        self._sessions = OrderedDict()
+        self._sizes = {}
+        self._last_sweep = time.monotonic()
+        self._last_cleanup = 0.0
+        self.stats = {"evicted": 0, "rebuilt": 0, "spilled_messages": 0, "dropped_messages": 0}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    # Disk
+
+    def _path(self, session_id, kind):
+        digest = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.spill_dir, f"{digest}.{kind}")
+
+    def _append_messages(self, session_id, messages):
+        """Mesajları oturumun disk arşivine ekle; diske yazılamıyorsa False"""
+        if not self.spill_dir:
+            return False
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(self._path(session_id, "messages.jsonl"), "a", encoding="utf-8") as out:
+                for message in messages:
+                    out.write(json.dumps(message, ensure_ascii=False) + "\n")
+            return True
+        except OSError as e:
+            print(f"⚠️ Oturum mesajları diske yazılamadı: {e}")
+            return False
+
+    def _read_messages(self, session_id):
+        try:
+            with open(self._path(session_id, "messages.jsonl"), encoding="utf-8") as spilled:
+                return [json.loads(line) for line in spilled if line.strip()]
+        except FileNotFoundError:
+            return []
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Oturum mesajları okunamadı: {e}")
+            return []
+
+    def _write_messages(self, session_id, messages):
+        path = self._path(session_id, "messages.jsonl")
+        if not messages:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            for message in messages:
+                out.write(json.dumps(message, ensure_ascii=False) + "\n")
+        os.replace(tmp, path)
+
+    def _spill(self, state):
+        """Oturumun tamamını diske yaz; başarılıysa True"""
+        if not self._append_messages(state.session_id, state.messages):
+            return False
+        try:
+            with open(self._path(state.session_id, "state.json"), "w", encoding="utf-8") as out:
+                json.dump({"histories": state.histories,
+                           "spilled_messages": state.spilled_messages + len(state.messages)},
+                          out, ensure_ascii=False)
+            return True
+        except OSError as e:
+            print(f"⚠️ Oturum diske yazılamadı: {e}")
+            return False
+
+    def _rebuild(self, session_id):
+        """Diske taşınmış oturumu yeniden kur (yoksa None); son mesajlar belleğe geri alınır"""
+        if not self.spill_dir:
+            return None
+        path = self._path(session_id, "state.json")
+        try:
+            with open(path, encoding="utf-8") as saved:
+                data = json.load(saved)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ Oturum diskten okunamadı: {e}")
+            return None
+
+        messages = self._read_messages(session_id)
+        recent, older = messages[-KEEP_RECENT_MESSAGES:], messages[:-KEEP_RECENT_MESSAGES]
+        try:
+            self._write_messages(session_id, older)
+            os.remove(path)
+        except OSError as e:
+            print(f"⚠️ Oturum dosyaları güncellenemedi: {e}")
+        self.stats["rebuilt"] += 1
+        print(f"♻️ OTURUM DİSKTEN KURULDU: {len(recent)} mesaj bellekte, {len(older)} diskte")
+        return SessionState(session_id, recent, data.get("histories") or {}, len(older))
+
+    # Erişim
+
+    def _touch(self, session_id):
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._rebuild(session_id) or SessionState(session_id)
+            self._sessions[session_id] = state
+        else:
+            self._sessions.move_to_end(session_id)
+        # Geçmişler agent'larca yerinde değiştirildiğinden boyut her erişimde yenilenir
+        self._sizes[session_id] = state.size()
+        state.last_seen = time.monotonic()
+        return state
+
+    def get(self, session_id):
+        """Oturumun durumu; diske taşınmışsa yeniden kurulur, yoksa boş oturum açılır"""
+        with self._lock:
+            state = self._touch(session_id)
+        self.maybe_sweep()
+        return state
+
+    def history(self, session_id, persona_id):
+        """Persona'nın bu oturumdaki konuşma geçmişi (API'nin SessionStore arayüzü)"""
+        return self.get(session_id).history(persona_id)
+
+    def append_message(self, session_id, message):
+        """Görüntülenen mesajı ekle; oturum bütçesi aşılırsa en eski mesajlar diske taşınır"""
+        with self._lock:
+            state = self._touch(session_id)
+            state.messages.append(message)
+            self._enforce_session_budget(state)
+
+    def _enforce_session_budget(self, state):
+        size = state.size()
+        if size > self.session_budget_bytes and len(state.messages) > KEEP_RECENT_MESSAGES:
+            overflow = []
+            while size > self.session_budget_bytes and len(state.messages) > KEEP_RECENT_MESSAGES:
+                message = state.messages.pop(0)
+                size -= estimate_bytes(message)
+                overflow.append(message)
+            if self._append_messages(state.session_id, overflow):
+                state.spilled_messages += len(overflow)
+                self.stats["spilled_messages"] += len(overflow)
+            else:
+                self.stats["dropped_messages"] += len(overflow)
+        self._sizes[state.session_id] = size
+
+    def older_messages(self, session_id):
+        """Diske taşınmış (bellektekilerden eski) mesajlar, eskiden yeniye"""
+        return self._read_messages(session_id) if self.spill_dir else []
+
+    def clear(self, session_id):
+        """Oturumun bellekteki ve diskteki tüm durumunu sil"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._sizes.pop(session_id, None)
+            if self.spill_dir:
+                for kind in ("state.json", "messages.jsonl"):
+                    try:
+                        os.remove(self._path(session_id, kind))
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        print(f"⚠️ Oturum dosyası silinemedi: {e}")
+
+    # Tahliye
+
+    def _evict(self, session_id):
+        state = self._sessions[session_id]
+        if self.spill_dir and not self._spill(state):
+            return False
+        del self._sessions[session_id]
+        self._sizes.pop(session_id, None)
+        self.stats["evicted"] += 1
+        return True
+
+    def maybe_sweep(self, force=False):
+        """Boşta kalan oturumları ve process bütçesini aşan kısmı diske taşı (SWEEP_INTERVAL'da bir)"""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+                return
+            self._last_sweep = now
+
+            chats = get_chat_tasks()
+            idle = [session_id for session_id, state in self._sessions.items()
+                    if now - state.last_seen >= self.idle_seconds and not chats.running(session_id)]
+            evicted = sum(1 for session_id in idle if self._evict(session_id))
+
+            # En uzun süredir kullanılmayan oturumlardan başlayarak (OrderedDict sırası)
+            total = sum(self._sizes.values())
+            for session_id in list(self._sessions):
+                if total <= self.process_budget_bytes:
+                    break
+                if chats.running(session_id) or now - self._sessions[session_id].last_seen < ACTIVE_GRACE_SECONDS:
+                    continue
+                size = self._sizes.get(session_id, 0)
+                if self._evict(session_id):
+                    total -= size
+                    evicted += 1
+
+        if evicted:
+            print(f"💤 OTURUM BELLEĞİ: {evicted} oturum diske taşındı, {len(self._sessions)} bellekte")
+        if self.spill_dir and now - self._last_cleanup >= SPILL_CLEANUP_INTERVAL_SECONDS:
+            self._last_cleanup = now
+            self._cleanup_spill_dir()
+
+    def _cleanup_spill_dir(self):
+        cutoff = time.time() - SPILL_RETENTION_SECONDS
+        try:
+            names = os.listdir(self.spill_dir)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.spill_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def status(self):
+        """Durum paneli ve /health için bellek göstergeleri"""
+        with self._lock:
+            total = sum(self._sizes.values())
+            largest = max(self._sizes.values(), default=0)
+            return {
+                "sessions": len(self._sessions),
+                "bytes": total,
+                "largest_session_bytes": largest,
+                "session_budget_bytes": self.session_budget_bytes,
+                "process_budget_bytes": self.process_budget_bytes,
+                "process_usage": round(total / self.process_budget_bytes, 3) if self.process_budget_bytes else None,
+                "idle_seconds": self.idle_seconds,
+                "rss_bytes": process_rss_bytes(),
+                **self.stats,
+            }
+
+
+_shared_memory = None
+_shared_lock = threading.Lock()
+
+
+def get_session_memory():
+    """Process genelinde paylaşılan oturum belleği"""
+    global _shared_memory
+    with _shared_lock:
+        if _shared_memory is None:
+            _shared_memory = SessionMemory()
+        return _shared_memory
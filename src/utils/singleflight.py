@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Singleflight (uçuştaki istek birleştirme)
+Aynı anahtarla eşzamanlı gelen çağrılar tek bir iş paylaşır: ilk çağrı işi
+başlatır, diğerleri aynı sonucu bekler. Sonuç saklanmaz; iş bitince anahtar silinir.
+"""
+
+import asyncio
+import re
+import threading
+import weakref
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_query(text: str) -> str:
+    """
+    Sorguyu birleştirme anahtarı için normalize et:
+    Türkçe küçük harf, noktalama temizliği, tekrar eden/sıralı kelimeler.
+    """
+    text = (text or "").replace("İ", "i").replace("I", "ı").lower()
+    words = _PUNCTUATION_RE.sub(" ", text).split()
+    return " ".join(sorted(set(words)))
+
+
+class SingleFlight:
+    """
+    Anahtar başına tek uçuştaki iş.
+    İş ayrı bir task olarak çalışır; böylece ilk çağıranın iptal edilmesi
+    aynı sonucu bekleyen diğer çağıranları etkilemez. Bekleyenlerin hepsi
+    iptal edilirse (ör. sohbetler kapatıldı) iş de iptal edilir.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # Task'lar event loop'a bağlı olduğundan uçuştaki işler loop başına tutulur
+        self._inflight = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.stats = {"leader": 0, "shared": 0, "abandoned": 0}
+        # Task başına hâlâ sonucu bekleyen çağıran sayısı
+        self._waiters = {}
+
+    def _calls(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._inflight.get(loop)
+            if calls is None:
+                calls = self._inflight[loop] = {}
+            return calls
+
+    async def do(self, key, factory):
+        """
+        factory() coroutine'ini anahtar için tek sefer çalıştır.
+        Args:
+            key: Hashable birleştirme anahtarı (ör. (aşama, normalize sorgu))
+            factory: Argümansız, coroutine döndüren çağrılabilir
+        """
+        calls = self._calls()
+        task = calls.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            calls[key] = task
+            self.stats["leader"] += 1
+
+            def _forget(done_task, key=key):
+                if calls.get(key) is done_task:
+                    del calls[key]
+                self._waiters.pop(done_task, None)
+                # Tüm bekleyenler iptal edildiyse "exception never retrieved" uyarısını önle
+                if not done_task.cancelled():
+                    done_task.exception()
+
+            task.add_done_callback(_forget)
+        else:
+            self.stats["shared"] += 1
+            print(f"🔗 {self.name.upper()} PAYLAŞILDI: uçuştaki istek bekleniyor")
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Sonucu bekleyen kalmadıysa işi sürdürmek yalnızca quota harcar
+            if not task.done() and self._waiters.get(task) == 1:
+                self.stats["abandoned"] += 1
+                print(f"🛑 {self.name.upper()} İPTAL: bekleyen kalmadı")
+                task.cancel()
+            raise
+        finally:
+            if task in self._waiters:
+                self._waiters[task] -= 1
+
+    def inflight_count(self):
+        try:
+            return len(self._calls())
+        except RuntimeError:
+            return 0
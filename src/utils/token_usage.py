@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Token Muhasebesi
+Her prompt ve cevap için yerel token tahmini yapar; oturum, persona, key ve
+aşama bazında toplamları tutar. Oturum bütçesi dolmaya yaklaşınca sohbet
+hafifletilir (web araması atlanır), dolunca istek reddedilir; key başına
+dakikalık token limiti aşılırsa key dinlendirilir.
+"""
+
+import contextlib
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Gemini'nin Türkçe metinde token başına ortalama karakter sayısı (yaklaşık)
+CHARS_PER_TOKEN = 3.5
+
+DEFAULT_BUDGET_WINDOW_SECONDS = 3600.0
+
+# Bütçenin bu oranı kullanılınca oturum "hafifletilmiş" moda geçer
+DEGRADE_RATIO = 0.8
+
+MAX_TRACKED_SESSIONS = 5000
+
+SESSION_OK = "ok"
+SESSION_DEGRADED = "degraded"
+SESSION_EXHAUSTED = "exhausted"
+
+SESSION_BUDGET_TEXT = "Bu oturumun kullanım limiti doldu. Lütfen {minutes} dakika sonra tekrar deneyin."
+
+# Aktif sohbetin oturum ve persona bilgisi; LLM çağrıları bu bağlama yazılır
+_scope = contextvars.ContextVar("token_scope", default=(None, None))
+
+
+def estimate_tokens(text) -> int:
+    """Metnin yaklaşık token sayısı (tokenizer olmadan, karakter sayısından)"""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@contextlib.contextmanager
+def usage_scope(session=None, persona=None):
+    """
+    Bu bağlamdaki LLM çağrılarını oturum / persona'ya yaz.
+    Verilmeyen alan dış bağlamdan devralınır (ör. API oturumu + agent persona'sı).
+    """
+    outer_session, outer_persona = _scope.get()
+    token = _scope.set((session or outer_session, persona or outer_persona))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+async def run_in_scope(coro, session=None, persona=None):
+    """coro'yu verilen token bağlamında çalıştır (başka thread'in loop'una gönderilen işler için)"""
+    with usage_scope(session, persona):
+        return await coro
+
+
+def current_scope():
+    """(oturum, persona) - bağlam dışında (None, None)"""
+    return _scope.get()
+
+
+def _env_int(name):
+    try:
+        return max(0, int(os.getenv(name) or 0))
+    except ValueError:
+        return 0
+
+
+def _empty_totals():
+    return {"calls": 0, "prompt_tokens": 0, "output_tokens": 0}
+
+
+class TokenLedger:
+    """
+    Thread-safe token defteri.
+    Oturum bütçesi kayan pencere (varsayılan 1 saat) üzerinden, key limiti
+    dakikalık pencere üzerinden hesaplanır; 0 bütçe = sınırsız.
+    """
+
+    def __init__(self, session_budget=None, window_seconds=None, key_tpm=None):
+        """
+        Args:
+            session_budget: Oturum başına pencere içinde token bütçesi (varsayılan: SESSION_TOKEN_BUDGET)
+            window_seconds: Oturum bütçesinin penceresi (varsayılan: TOKEN_BUDGET_WINDOW_SECONDS, 1 saat)
+            key_tpm: Key başına dakikalık token limiti (varsayılan: GEMINI_TPM_PER_KEY)
+        """
+        self.session_budget = _env_int("SESSION_TOKEN_BUDGET") if session_budget is None else session_budget
+        if window_seconds is None:
+            window_seconds = float(os.getenv("TOKEN_BUDGET_WINDOW_SECONDS") or DEFAULT_BUDGET_WINDOW_SECONDS)
+        self.window_seconds = window_seconds
+        self.key_tpm = _env_int("GEMINI_TPM_PER_KEY") if key_tpm is None else key_tpm
+
+        self._lock = threading.Lock()
+        self._totals = {"session": OrderedDict(), "persona": {}, "key": {}, "stage": {}}
+        # Bütçe pencereleri: (zaman, token)
+        self._session_windows = OrderedDict()
+        self._key_windows = {}
+        self.stats = {"degraded": 0, "throttled": 0, "key_cooldowns": 0}
+
+    @staticmethod
+    def _prune(window, now, seconds):
+        while window and now - window[0][0] >= seconds:
+            window.popleft()
+
+    def _add(self, kind, name, prompt_tokens, output_tokens):
+        table = self._totals[kind]
+        totals = table.get(name)
+        if totals is None:
+            totals = table[name] = _empty_totals()
+        totals["calls"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["output_tokens"] += output_tokens
+
+        if kind == "session":
+            table.move_to_end(name)
+            while len(table) > MAX_TRACKED_SESSIONS:
+                table.popitem(last=False)
+
+    def record(self, prompt, output, key_label=None, stage=None):
+        """
+        Tek bir LLM çağrısını deftere yaz.
+        Returns:
+            Key'in dakikalık limiti aşıldıysa dinlendirilmesi gereken süre (saniye), değilse 0
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(output)
+        tokens = prompt_tokens + output_tokens
+        session, persona = _scope.get()
+        now = time.monotonic()
+
+        with self._lock:
+            self._add("persona", persona or "-", prompt_tokens, output_tokens)
+            if session:
+                self._add("session", session, prompt_tokens, output_tokens)
+                window = self._session_windows.setdefault(session, deque())
+                window.append((now, tokens))
+                self._session_windows.move_to_end(session)
+                while len(self._session_windows) > MAX_TRACKED_SESSIONS:
+                    self._session_windows.popitem(last=False)
+            if stage:
+                self._add("stage", stage, prompt_tokens, output_tokens)
+            if key_label is None:
+                return 0.0
+
+            self._add("key", key_label, prompt_tokens, output_tokens)
+            window = self._key_windows.setdefault(key_label, deque())
+            window.append((now, tokens))
+            if not self.key_tpm:
+                return 0.0
+            self._prune(window, now, 60.0)
+            if sum(used for _, used in window) < self.key_tpm:
+                return 0.0
+            self.stats["key_cooldowns"] += 1
+            return max(0.0, 60.0 - (now - window[0][0]))
+
+    def session_usage(self, session=None):
+        """Oturumun bütçe penceresindeki token kullanımı"""
+        session = session or _scope.get()[0]
+        now = time.monotonic()
+        with self._lock:
+            window = self._session_windows.get(session)
+            if not window:
+                return 0
+            self._prune(window, now, self.window_seconds)
+            return sum(tokens for _, tokens in window)
+
+    def session_state(self, session=None):
+        """SESSION_OK, SESSION_DEGRADED veya SESSION_EXHAUSTED (bütçe yoksa her zaman SESSION_OK)"""
+        if not self.session_budget:
+            return SESSION_OK
+        used = self.session_usage(session)
+        if used >= self.session_budget:
+            return SESSION_EXHAUSTED
+        if used >= self.session_budget * DEGRADE_RATIO:
+            return SESSION_DEGRADED
+        return SESSION_OK
+
+    def session_retry_after(self, session=None):
+        """Oturum bütçesinin tekrar açılmasına kalan yaklaşık süre (saniye)"""
+        session = session or _scope.get()[0]
+        now = time.monotonic()
+        with self._lock:
+            window = self._session_windows.get(session)
+            if not window:
+                return 0.0
+            # En eski kayıtlar pencereden çıktıkça bütçe açılır
+            excess = sum(tokens for _, tokens in window) - self.session_budget
+            for started, tokens in window:
+                excess -= tokens
+                if excess < 0:
+                    return max(0.0, self.window_seconds - (now - started))
+            return 0.0
+
+    def budget_text(self, session=None):
+        """Bütçesi dolan oturuma gösterilecek mesaj"""
+        return SESSION_BUDGET_TEXT.format(minutes=max(1, math.ceil(self.session_retry_after(session) / 60)))
+
+    def note(self, event):
+        """'degraded' / 'throttled' sayaçlarını artır"""
+        with self._lock:
+            self.stats[event] += 1
+
+    def snapshot(self, top_sessions=10):
+        """Durum paneli ve /health için özet; en çok harcayan oturumlar dahil"""
+        with self._lock:
+            sessions = sorted(self._totals["session"].items(),
+                              key=lambda item: item[1]["prompt_tokens"] + item[1]["output_tokens"],
+                              reverse=True)[:top_sessions]
+            total = _empty_totals()
+            for totals in self._totals["persona"].values():
+                for name in total:
+                    total[name] += totals[name]
+            return {
+                "total": total,
+                "by_persona": {name: dict(totals) for name, totals in self._totals["persona"].items()},
+                "by_key": {name: dict(totals) for name, totals in self._totals["key"].items()},
+                "by_stage": {name: dict(totals) for name, totals in self._totals["stage"].items()},
+                "top_sessions": {name: dict(totals) for name, totals in sessions},
+                "budgets": {
+                    "session_tokens": self.session_budget,
+                    "window_seconds": self.window_seconds,
+                    "key_tpm": self.key_tpm,
+                },
+                **self.stats,
+            }
+
+
+_shared_ledger = None
+_shared_lock = threading.Lock()
+
+
+def get_token_ledger():
+    """Process genelinde paylaşılan token defteri"""
+    global _shared_ledger
+    with _shared_lock:
+        if _shared_ledger is None:
+            _shared_ledger = TokenLedger()
+        return _shared_ledger
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mini Microcosmos - Soğuk Başlangıç Isıtması
+İlk kullanıcı beklemesin diye ağır modül importlarını, key havuzunu, Gemini
+istemcisini, persona promptlarını ve (arka plan loop'unda) MCP oturumunu ilk
+istekten önce hazırlar; açıksa gündem ön belleğini de arka plan loop'unda başlatır;
+import süreleri ve ilk cevaba kadar geçen süre raporlanır.
+"""
+
+import importlib
+import os
+import threading
+import time
+
+# run_app.py başlatma anını buraya yazar; doğrudan `streamlit run` ile bu modülün yüklendiği an kullanılır
+STARTED_AT_ENV = "MICROCOSMOS_STARTED_AT"
+
+_started_at = float(os.getenv(STARTED_AT_ENV) or time.time())
+_lock = threading.Lock()
+_thread = None
+_report = {
+    "imports_ms": {},
+    "steps_ms": {},
+    "errors": {},
+    "ready_seconds": None,
+    "first_answer_seconds": None,
+}
+
+
+def _elapsed():
+    return round(time.time() - _started_at, 2)
+
+
+def _timed(section, name, func):
+    started = time.perf_counter()
+    try:
+        return func()
+    except Exception as e:
+        _report["errors"][name] = str(e)
+        print(f"⚠️ ISINMA {name} hatası: {e}")
+    finally:
+        _report[section][name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def timed_import(module_name):
+    """Modülü import et ve süresini rapora yaz (zaten yüklüyse ~0 ms)"""
+    return _timed("imports_ms", module_name, lambda: importlib.import_module(module_name))
+
+
+def warm_up():
+    """Isınma adımlarını sırayla çalıştır (bloklar)"""
+    print("🔥 ISINMA BAŞLADI")
+
+    timed_import("aiohttp")
+
+    from src.utils.event_loop import get_background_loop
+    from src.utils.exa_search import get_search_client
+    from src.utils.gemini_client import get_gemini_client
+    from src.utils.personas import cached_system_prompt, list_personas
+
+    _timed("steps_ms", "gemini_client", get_gemini_client)
+    _timed("steps_ms", "persona_prompts",
+           lambda: [cached_system_prompt(persona_id) for persona_id in list_personas()])
+
+    search_client = get_search_client()
+    if search_client.configured:
+        timed_import("mcp")
+        timed_import("mcp.client.streamable_http")
+        # Oturum paylaşılan arka plan loop'unda açılır ve ilk istek için açık kalır
+        _timed("steps_ms", "mcp_session", lambda: get_background_loop().run(search_client.probe()))
+
+        from src.utils.news_prefetch import get_news_prefetcher
+        if get_news_prefetcher().enabled:
+            # Streamlit sohbetleri de sıcak gündem görüntüsünü okur; yenileme task'ı paylaşılan loop'ta yaşar
+            _timed("steps_ms", "news_prefetch", lambda: get_background_loop().run(_start_news_prefetch()))
+
+    _report["ready_seconds"] = _elapsed()
+    print(f"🔥 ISINMA TAMAMLANDI: {_report['ready_seconds']} sn | importlar: {_report['imports_ms']} | "
+          f"adımlar: {_report['steps_ms']}")
+    return report()
+
+
+async def _start_news_prefetch():
+    from src.agents.main import PersonaAgent, get_available_personas, start_news_prefetch
+    return start_news_prefetch(PersonaAgent(get_available_personas()[0]))
+
+
+def start_warmup():
+    """Isınmayı arka plan thread'inde bir kez başlat (tekrar çağrılar bir şey yapmaz)"""
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm_up, name="microcosmos-warmup", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def mark_first_answer():
+    """İlk cevap kullanıcıya ulaştığında çağrılır; başlatmadan itibaren geçen süreyi kaydeder"""
+    with _lock:
+        if _report["first_answer_seconds"] is not None:
+            return
+        _report["first_answer_seconds"] = _elapsed()
+    print(f"⏱️ İLK CEVAP: başlatmadan itibaren {_report['first_answer_seconds']} sn")
+
+
+def report():
+    with _lock:
+        return {
+            "imports_ms": dict(_report["imports_ms"]),
+            "steps_ms": dict(_report["steps_ms"]),
+            "errors": dict(_report["errors"]),
+            "ready_seconds": _report["ready_seconds"],
+            "first_answer_seconds": _report["first_answer_seconds"],
+            "uptime_seconds": _elapsed(),
+        }
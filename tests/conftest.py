@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Testler ağ kullanmaz; paylaşılan dosyalar (key durumu, haber arşivi, oturum
+dosyaları) her testte geçici dizine yönlendirilir veya kapatılır.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+    monkeypatch.setenv("KEY_STATE_PATH", "")
+    monkeypatch.setenv("NEWS_CORPUS_PATH", "")
+    monkeypatch.setenv("SESSION_SPILL_DIR", str(tmp_path / "sessions"))
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path / "profiles"))
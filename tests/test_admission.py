@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from src.utils.admission import BATCH, AdmissionController
+
+
+def test_queues_beyond_max_in_flight_and_admits_on_release():
+    controller = AdmissionController(max_in_flight=1)
+    first = controller.enqueue("a")
+    second = controller.enqueue("b")
+
+    assert first.admitted and not second.admitted
+    assert second.position() == 1
+
+    first.release()
+    assert second.admitted
+    assert controller.status()["in_flight"] == 1
+
+
+def test_release_is_idempotent():
+    controller = AdmissionController(max_in_flight=1)
+    ticket = controller.enqueue("a")
+    ticket.release()
+    ticket.release()
+    assert controller.status()["in_flight"] == 0
+
+    # Serbest kalan slotu ikinci bırakma başkasına vermez
+    other = controller.enqueue("b")
+    waiting = controller.enqueue("c")
+    ticket.release()
+    assert other.admitted and not waiting.admitted
+
+
+def test_round_robin_between_tenants():
+    controller = AdmissionController(max_in_flight=1)
+    running = controller.enqueue("x")
+    a1, a2 = controller.enqueue("a"), controller.enqueue("a")
+    b1 = controller.enqueue("b")
+
+    running.release()
+    assert a1.admitted
+    a1.release()
+    assert b1.admitted and not a2.admitted
+
+
+def test_interactive_lane_goes_first():
+    controller = AdmissionController(max_in_flight=1)
+    running = controller.enqueue("x")
+    batch = controller.enqueue("a", BATCH)
+    interactive = controller.enqueue("b")
+
+    running.release()
+    assert interactive.admitted and not batch.admitted
+
+
+def test_run_releases_after_success_and_error():
+    controller = AdmissionController(max_in_flight=1)
+
+    async def ok():
+        return 42
+
+    async def fail():
+        raise RuntimeError("x")
+
+    async def main():
+        assert await controller.run("a", ok()) == 42
+        with pytest.raises(RuntimeError):
+            await controller.run("a", fail())
+
+    asyncio.run(main())
+    assert controller.status()["in_flight"] == 0
+
+
+def test_cancelled_waiter_leaves_queue():
+    controller = AdmissionController(max_in_flight=1)
+    holder = controller.enqueue("a")
+
+    async def main():
+        ticket = controller.enqueue("b")
+        task = asyncio.ensure_future(ticket.wait())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return ticket
+
+    ticket = asyncio.run(main())
+    assert ticket.released
+    assert controller.status()["waiting"]["interactive"] == 0
+
+    holder.release()
+    assert not ticket.admitted
+    assert controller.status()["in_flight"] == 0
+
+
+def test_cancelled_run_releases_admitted_slot():
+    controller = AdmissionController(max_in_flight=1)
+
+    async def main():
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(controller.run("a", work()))
+        await started.wait()
+        assert controller.status()["in_flight"] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert controller.status()["in_flight"] == 0
+
+
+def test_release_skips_waiters_on_closed_loops():
+    controller = AdmissionController(max_in_flight=1)
+    holder = controller.enqueue("a")
+    ticket = controller.enqueue("b")
+
+    closed = asyncio.new_event_loop()
+    ticket._waiters.append((closed, closed.create_future()))
+    closed.close()
+
+    holder.release()
+    assert ticket.admitted
+    ticket.release()
+    assert controller.status()["in_flight"] == 0
+
+
+class FakeAgent:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+        self.conversation_history = []
+
+    async def chat(self, user_input, tier=None):
+        self.log.append(self.name)
+        await asyncio.sleep(0.01)
+        return f"{self.name}: {user_input}"
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 3])
+def test_panel_fan_out_uses_batch_slots_without_deadlock(max_in_flight):
+    from src.agents.panel import PersonaPanel
+
+    controller = AdmissionController(max_in_flight=max_in_flight)
+    log = []
+    agents = {name: FakeAgent(name, log) for name in ("x", "y", "z")}
+    panel = PersonaPanel(agents, client=object(), admission=controller, tenant="s")
+
+    async def main():
+        # Çağıranın slotu tutulurken ek persona'lar BATCH kuyruğundan slot alır
+        return await controller.run("s", panel.answer_individually("soru"))
+
+    answers = asyncio.run(main())
+    assert answers == {name: f"{name}: soru" for name in ("x", "y", "z")}
+    assert sorted(log) == ["x", "y", "z"]
+    assert controller.status()["in_flight"] == 0
+    assert controller.status()["waiting"] == {"interactive": 0, "batch": 0}
+    # Tek slotta çağıranın işçisi hepsini sırayla cevaplar; boş slot varsa ek biletler kabul edilir
+    assert controller.status()["admitted"] == (1 if max_in_flight == 1 else 3)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+
+from src.agents.batch import BatchSurvey, load_checkpoint, load_completed
+from src.utils.key_pool import KeyPool
+
+
+class FakeClient:
+    def __init__(self):
+        self.key_pool = KeyPool(keys=["a"])
+        self.prompts = []
+
+    async def generate(self, prompt, stage=None):
+        self.prompts.append(prompt)
+        return "cevap"
+
+
+def write_records(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def test_resume_retries_error_jobs_with_next_attempt(tmp_path):
+    output = str(tmp_path / "sonuclar.jsonl")
+    write_records(output, [
+        {"job_id": "1:elif", "status": "ok", "answer": "eski"},
+        {"job_id": "2:elif", "attempt": 1, "status": "error", "error": "503"},
+    ])
+    questions = [{"id": "1", "question": "Birinci?"}, {"id": "2", "question": "İkinci?"}]
+    client = FakeClient()
+
+    stats = asyncio.run(BatchSurvey(questions, ["elif"], output, client, concurrency=1).run())
+
+    assert stats == {"ok": 1, "error": 0, "skipped": 1}
+    assert len(client.prompts) == 1
+    records = [json.loads(line) for line in open(output, encoding='utf-8')]
+    assert [(r["job_id"], r.get("attempt")) for r in records] == [("1:elif", None), ("2:elif", 1), ("2:elif", 2)]
+
+    latest = load_checkpoint(output)
+    assert latest["2:elif"]["status"] == "ok" and latest["2:elif"]["attempt"] == 2
+    assert load_completed(output) == {"1:elif", "2:elif"}
+
+
+def test_checkpoint_keeps_highest_attempt(tmp_path):
+    output = str(tmp_path / "sonuclar.jsonl")
+    write_records(output, [
+        {"job_id": "1:elif", "attempt": 2, "status": "error"},
+        {"job_id": "1:elif", "attempt": 1, "status": "ok"},
+    ])
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write('{"job_id": "1:el')
+
+    assert load_checkpoint(output)["1:elif"]["attempt"] == 2
+    assert load_completed(output) == set()
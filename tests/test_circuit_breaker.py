@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from src.utils import circuit_breaker
+from src.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return CircuitBreaker("test", **kwargs), clock
+
+
+def test_opens_after_consecutive_failures(monkeypatch):
+    breaker, _ = make_breaker(monkeypatch, failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.status()["rejected"] == 1
+
+
+def test_success_resets_failure_count(monkeypatch):
+    breaker, _ = make_breaker(monkeypatch, failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_a_single_probe(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch, failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    assert not breaker.available()
+
+    breaker.release_probe()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_doubles_open_time_up_to_limit(monkeypatch):
+    breaker, clock = make_breaker(monkeypatch, failure_threshold=1, reset_timeout=100)
+    breaker.record_failure()
+
+    for expected in (200, 300, 300):
+        clock.now += breaker.status()["retry_in"]
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.status()["retry_in"] == expected
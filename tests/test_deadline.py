@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from src.utils.deadline import (DeadlineExceeded, chat_deadline_seconds, deadline_scope, has_budget, remaining,
+                                run_within, stage_timeout)
+
+
+def test_no_scope_means_no_limit():
+    assert remaining() is None
+    assert has_budget(1e9)
+    assert stage_timeout(reserve=100) is None
+
+
+def test_nested_scope_keeps_earlier_deadline():
+    with deadline_scope(10):
+        with deadline_scope(100):
+            assert remaining() <= 10
+        with deadline_scope(2):
+            assert remaining() <= 2
+        # 0 / None yeni sınır koymaz, dıştakini korur
+        with deadline_scope(0):
+            assert 2 < remaining() <= 10
+    assert remaining() is None
+
+
+def test_stage_timeout_subtracts_reserve():
+    with deadline_scope(20):
+        assert 14 < stage_timeout(reserve=5) <= 15
+        with pytest.raises(DeadlineExceeded):
+            stage_timeout(reserve=19.5, minimum=1.0)
+
+
+def test_run_within_raises_deadline_exceeded():
+    async def slow():
+        await asyncio.sleep(1)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run_within(slow(), 0.01))
+
+
+def test_scope_is_visible_in_child_tasks():
+    async def child():
+        return remaining()
+
+    async def main():
+        with deadline_scope(5):
+            return await asyncio.ensure_future(child())
+
+    assert 0 < asyncio.run(main()) <= 5
+
+
+@pytest.mark.parametrize("value, expected", [("30", 30.0), ("0", 0.0), ("-5", 0.0), ("abc", 45.0)])
+def test_chat_deadline_seconds_from_env(monkeypatch, value, expected):
+    monkeypatch.setenv("CHAT_DEADLINE_SECONDS", value)
+    assert chat_deadline_seconds() == expected
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.utils.gemini_client import GeminiClient, InvalidKeyError, QuotaError, TransientError
+from src.utils.key_pool import KeyPool
+from src.utils.key_store import DAILY_EXHAUSTION_STRIKES, KeyHealthStore, key_id, next_quota_reset
+
+
+def quota_body(quota_id, retry_delay="39s"):
+    return json.dumps({"error": {
+        "code": 429,
+        "message": "You exceeded your current quota. Quota exceeded for metric: generate_content_free_tier_requests",
+        "status": "RESOURCE_EXHAUSTED",
+        "details": [
+            {"@type": "type.googleapis.com/google.rpc.QuotaFailure",
+             "violations": [{"quotaMetric": "generate_content_free_tier_requests", "quotaId": quota_id}]},
+            {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": retry_delay},
+        ],
+    }})
+
+
+class ScriptedClient(GeminiClient):
+    """_stream_with_key yerine key başına önceden yazılmış parçalar ve hata"""
+
+    def __init__(self, script):
+        super().__init__(key_pool=KeyPool(keys=list(script)))
+        self.script = script
+        self.calls = []
+
+    async def _stream_with_key(self, key, prompt, model=None, generation_config=None, prefix=None):
+        self.calls.append(key)
+        chunks, error = self.script[key]
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+
+
+def collect(client):
+    async def main():
+        return [chunk async for chunk in client.stream("soru")]
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("error", [QuotaError("429"), TransientError("503")])
+def test_stream_retries_on_another_key_before_output(error):
+    client = ScriptedClient({"a": ([], error), "b": (["mer", "haba"], None)})
+    # Havuz boştaki key'leri sırayla seçer: önce "a"
+    assert collect(client) == ["mer", "haba"]
+    assert client.calls == ["a", "b"]
+
+
+def test_stream_retries_when_key_is_invalid_before_output():
+    client = ScriptedClient({"a": ([], InvalidKeyError("403")), "b": (["tamam"], None)})
+    assert collect(client) == ["tamam"]
+    assert client.key_pool.stats()["invalid"] == 1
+
+
+@pytest.mark.parametrize("error", [QuotaError("429"), InvalidKeyError("403"), TransientError("kopma")])
+def test_stream_does_not_restart_after_partial_output(error):
+    client = ScriptedClient({"a": (["yarım "], error), "b": (["ikinci cevap"], None)})
+    received = []
+
+    async def main():
+        async for chunk in client.stream("soru"):
+            received.append(chunk)
+
+    with pytest.raises(type(error)):
+        asyncio.run(main())
+    assert received == ["yarım "]
+    assert client.calls == ["a"]
+
+
+def raised_quota_error(body):
+    with pytest.raises(QuotaError) as info:
+        GeminiClient._raise_for_status(429, body)
+    return info.value
+
+
+def test_quota_error_reads_quota_type_and_retry_delay():
+    minute = raised_quota_error(quota_body("GenerateRequestsPerMinutePerProjectPerModel-FreeTier"))
+    assert not minute.daily and minute.retry_after == 39.0
+
+    day = raised_quota_error(quota_body("GenerateRequestsPerDayPerProjectPerModel-FreeTier", "3600s"))
+    assert day.daily and day.retry_after == 3600.0
+
+    assert not raised_quota_error("Quota exceeded ... per minute").daily
+
+
+@pytest.mark.parametrize("quota_id, parked", [
+    ("GenerateRequestsPerMinutePerProjectPerModel-FreeTier", False),
+    ("GenerateRequestsPerDayPerProjectPerModel-FreeTier", True),
+])
+def test_only_daily_quota_errors_park_key_until_reset(tmp_path, quota_id, parked):
+    store = KeyHealthStore(str(tmp_path / "keys.sqlite3"))
+    try:
+        client = GeminiClient(key_pool=KeyPool(keys=["a"], store=store))
+        error = raised_quota_error(quota_body(quota_id))
+        for _ in range(DAILY_EXHAUSTION_STRIKES + 1):
+            client._report_failure("a", error, time.monotonic())
+        assert client.key_pool.flush(timeout=5)
+
+        state = store.load([key_id("a")])[key_id("a")]
+        assert (state["cooldown_until"] >= next_quota_reset()) == parked
+        assert state["quota_errors"] == DAILY_EXHAUSTION_STRIKES + 1
+    finally:
+        store.close()
+
+
+def test_quota_after_partial_output_is_reported_to_pool():
+    client = ScriptedClient({"a": (["yarım "], QuotaError("429", retry_after=30)), "b": (["ikinci"], None)})
+    with pytest.raises(QuotaError):
+        collect(client)
+    assert client.key_pool.healthy_keys() == ["b"]
+    assert client.key_pool.stats()["requests"]["quota"] == 1
+
+
+def test_agent_keeps_partial_answer_when_stream_hits_quota():
+    from src.agents.main import PersonaAgent
+
+    client = ScriptedClient({"a": (["yarım ", "cevap"], QuotaError("429"))})
+    agent = PersonaAgent("elif", client=client, search_client=None)
+    assert asyncio.run(agent.stream_with_api_rotation("soru")) == "yarım cevap"
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import time
+from datetime import datetime
+
+import pytest
+
+from src.utils import key_store
+from src.utils.key_store import (DAILY_EXHAUSTION_STRIKES, QUOTA_TIMEZONE, KeyHealthStore, key_id,
+                                 next_quota_reset, quota_day)
+from src.utils.key_pool import KeyPool
+
+# 2026-03-10 23:30 Pasifik: sıfırlanmaya yarım saat var
+LATE_EVENING = datetime(2026, 3, 10, 23, 30, tzinfo=QUOTA_TIMEZONE).timestamp()
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(LATE_EVENING)
+    monkeypatch.setattr(key_store, "_now", clock)
+    return clock
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    """Aynı dosyaya yeni bağlantı açar; açılan tüm depolar test sonunda kapatılır"""
+    stores = []
+
+    def open_store():
+        store = KeyHealthStore(str(tmp_path / "keys.sqlite3"))
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.close()
+
+
+@pytest.fixture
+def store(open_store):
+    return open_store()
+
+
+def test_quota_day_follows_pacific_midnight():
+    assert quota_day(LATE_EVENING) == "2026-03-10"
+    assert quota_day(LATE_EVENING + 3600) == "2026-03-11"
+    assert next_quota_reset(LATE_EVENING) - LATE_EVENING == pytest.approx(1800)
+
+
+def test_key_ids_are_hashes():
+    assert key_id("secret") != "secret"
+    assert len(key_id("secret")) == 32
+
+
+def test_consecutive_quota_errors_park_key_until_reset(store, clock):
+    kid = key_id("a")
+    for _ in range(DAILY_EXHAUSTION_STRIKES - 1):
+        store.record_quota(kid, clock.now + 60)
+    assert store.load([kid])[kid]["cooldown_until"] == pytest.approx(clock.now + 60)
+
+    store.record_quota(kid, clock.now + 60)
+    assert store.load([kid])[kid]["cooldown_until"] == pytest.approx(next_quota_reset(clock.now))
+
+
+def test_success_resets_strikes(store, clock):
+    kid = key_id("a")
+    for _ in range(DAILY_EXHAUSTION_STRIKES - 1):
+        store.record_quota(kid, clock.now + 60)
+    store.record_success(kid)
+    store.record_quota(kid, clock.now + 60)
+    assert store.load([kid])[kid]["strikes"] == 1
+
+
+def test_day_rollover_resets_counters_and_invalid(store, clock):
+    kid = key_id("a")
+    store.record_quota(kid, clock.now + 60)
+    store.record_error(kid)
+    store.mark_invalid(kid)
+    state = store.load([kid])[kid]
+    assert state["invalid"] and state["requests"] == 2
+
+    clock.now += 3600
+    state = store.load([kid])[kid]
+    assert not state["invalid"]
+    assert (state["requests"], state["quota_errors"], state["errors"], state["strikes"]) == (0, 0, 0, 0)
+
+
+def test_preflight_quota_does_not_strike(open_store):
+    for _ in range(DAILY_EXHAUSTION_STRIKES + 1):
+        pool = KeyPool(keys=["a"], store=open_store())
+        pool.report_quota("a", strike=False)
+        assert pool.flush(timeout=5)
+
+    # KeyPool cooldown'ı gerçek saatle yazar; key günlük sıfırlanmaya kadar değil, yalnızca cooldown kadar dinlenir
+    state = open_store().load([key_id("a")])[key_id("a")]
+    assert state["strikes"] == 0
+    assert state["cooldown_until"] <= time.time() + pool.cooldown_seconds
+
+
+def test_load_is_read_only_and_does_not_wait_for_writers(open_store, clock):
+    store, writer = open_store(), open_store()
+    store.record_error(key_id("a"))
+
+    # Başka bir process yazma kilidini tutarken okuma beklemeden döner
+    writer._conn.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        states = store.load([key_id("a"), key_id("b")])
+        assert time.monotonic() - started < 1.0
+    finally:
+        writer._conn.execute("ROLLBACK")
+
+    assert set(states) == {key_id("a")}
+    assert store._conn.execute("SELECT COUNT(*) FROM key_health").fetchone()[0] == 1
+
+
+def test_pool_reports_do_not_wait_for_the_store(open_store):
+    class SlowStore:
+        def __init__(self, store):
+            self.store = store
+
+        def load(self, key_ids):
+            return self.store.load(key_ids)
+
+        def record_error(self, kid):
+            time.sleep(0.3)
+            self.store.record_error(kid)
+
+    store = open_store()
+    pool = KeyPool(keys=["a"], store=SlowStore(store))
+    started = time.monotonic()
+    pool.report_error("a")
+    assert time.monotonic() - started < 0.1
+
+    assert pool.flush(timeout=5)
+    assert store.load([key_id("a")])[key_id("a")]["errors"] == 1
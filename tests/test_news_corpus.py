@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from src.utils import news_corpus
+from src.utils.news_corpus import NewsCorpus, build_match_query, parse_results
+
+TEXT_OUTPUT = """Title: Merkez Bankası faiz kararını açıkladı
+URL: https://www.example.com/faiz.
+Published Date: 2026-10-18T09:00:00Z
+Author: Muhabir
+Text: Merkez Bankası politika faizini sabit tuttu.
+
+Title: Deprem tatbikatı yapıldı
+URL: https://haber.example.org/deprem
+Published Date: 2026-10-17
+Text: İstanbul'da okullarda deprem tatbikatı yapıldı.
+
+Title: Bağlantısız haber
+URL: ftp://example.com/x
+Text: geçersiz adres
+"""
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    corpus = NewsCorpus(str(tmp_path / "corpus.sqlite3"), max_age_hours=1)
+    yield corpus
+    corpus.close()
+
+
+def test_parse_text_output():
+    articles = parse_results(TEXT_OUTPUT)
+    assert [a["url"] for a in articles] == ["https://www.example.com/faiz", "https://haber.example.org/deprem"]
+    assert articles[0]["domain"] == "example.com"
+    assert articles[0]["published"] == "2026-10-18"
+    assert articles[0]["text"] == "Merkez Bankası politika faizini sabit tuttu."
+
+
+def test_parse_json_output():
+    raw = json.dumps({"results": [
+        {"url": "https://example.com/a", "title": "A", "publishedDate": "2026-10-18T00:00:00Z", "text": "metin"},
+        {"url": "", "title": "adres yok"},
+        "bozuk",
+    ]})
+    assert parse_results(raw) == [{"url": "https://example.com/a", "domain": "example.com", "title": "A",
+                                   "published": "2026-10-18", "text": "metin"}]
+    assert parse_results("") == []
+
+
+def test_build_match_query_lowercases_turkish():
+    assert build_match_query("İstanbul IRAK 2026 ve faiz") == '"istanbul"* OR "ırak"* OR "faiz"*'
+    assert build_match_query("faiz faiz kararı", require_all=True) == '"faiz"* AND "kararı"*'
+    assert build_match_query("ve 12") == ""
+
+
+def test_add_results_dedupes_by_url(corpus):
+    assert corpus.add_results(TEXT_OUTPUT, query="gündem") == 2
+    assert corpus.add_results(TEXT_OUTPUT, query="gündem") == 0
+    assert corpus.status()["articles"] == 2
+
+
+def test_search_matches_prefixes(corpus):
+    corpus.add_results(TEXT_OUTPUT)
+    assert [a["url"] for a in corpus.search("faizler")] == []
+    assert [a["url"] for a in corpus.search("faiz")] == ["https://www.example.com/faiz"]
+    assert len(corpus.search("faiz deprem")) == 2
+    assert corpus.search("faiz deprem", require_all=True) == []
+
+
+def test_search_skips_stale_articles(corpus, monkeypatch):
+    now = news_corpus._now()
+    monkeypatch.setattr(news_corpus, "_now", lambda: now - 7200)
+    corpus.add_results(TEXT_OUTPUT)
+    monkeypatch.setattr(news_corpus, "_now", lambda: now)
+
+    assert corpus.search("faiz") == []
+    assert len(corpus.search("faiz", max_age_seconds=0)) == 1
+
+
+def test_lookup_requires_enough_new_results(corpus):
+    corpus.add_results(TEXT_OUTPUT)
+
+    text = corpus.lookup("merkez faiz", num_results=1)
+    assert text.startswith("Title: Merkez Bankası faiz kararını açıkladı\nURL: https://www.example.com/faiz")
+    assert corpus.lookup("merkez faiz", num_results=2) is None
+    assert corpus.lookup("merkez faiz", num_results=1, exclude_urls={"https://www.example.com/faiz"}) is None
+
+    stats = corpus.status()
+    assert (stats["lookups"], stats["hits"], stats["misses"]) == (3, 1, 2)
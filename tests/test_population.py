@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import argparse
+import asyncio
+import math
+import random
+
+import pytest
+
+from src.agents import population
+from src.agents.population import (STANCE_UNKNOWN, STANCES, PopulationResults, _perturb_age, extract_stance,
+                                   generate_variants, parse_population_response)
+
+AGAINST, UNDECIDED, SUPPORT = (STANCES.index(stance) for stance in ("karşı", "kararsız", "destekliyor"))
+
+PERSONA = {
+    "name": "Test",
+    "bio": ["30'lu yaşlarında bir öğretmen", "İstanbul'da yaşıyor", "İki çocuğu var"],
+    "lore": ["a", "b", "c"],
+    "knowledge": ["x", "y"],
+    "style": {"chat": ["kısa", "net"]},
+}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Bunu kesinlikle destekliyorum.", SUPPORT),
+    ("Desteklemek lazım bence.", SUPPORT),
+    ("Ben bunu desteklemiyorum.", AGAINST),
+    ("Asla desteklemem.", AGAINST),
+    ("Hükümet bunu desteklemez.", AGAINST),
+    ("Bu karara katılmıyorum.", AGAINST),
+    ("Bunu desteklemeyeceğim.", AGAINST),
+    ("Bu politikayı desteklemeyi doğru buluyorum.", SUPPORT),
+    ("Ben buna karşıyım.", AGAINST),
+    ("Bu ücret ihtiyacı karşılıyor.", STANCE_UNKNOWN),
+    ("Hayırlı olsun.", STANCE_UNKNOWN),
+    ("Emin değilim, bakalım.", UNDECIDED),
+    ("", STANCE_UNKNOWN),
+])
+def test_extract_stance(text, expected):
+    assert extract_stance(text) == expected
+
+
+DECADE_SUFFIXES = {20: "li", 30: "lu", 40: "lı", 50: "li", 60: "lı", 70: "li", 80: "li"}
+
+
+@pytest.mark.parametrize("decade", sorted(DECADE_SUFFIXES))
+def test_perturb_age_uses_matching_decade_suffix(decade):
+    for seed in range(20):
+        output = _perturb_age(f"{decade}'li yaşlarında", random.Random(seed))
+        shown = int(output[:2])
+        assert output == f"{shown}’{DECADE_SUFFIXES[shown]} yaşlarında"
+
+
+def test_variants_are_reproducible_only_with_seed():
+    assert generate_variants("test", PERSONA, 5, seed=7) == generate_variants("test", PERSONA, 5, seed=7)
+    unseeded = [generate_variants("test", PERSONA, 20) for _ in range(3)]
+    assert unseeded[0] != unseeded[1] or unseeded[1] != unseeded[2]
+
+
+def test_parse_population_response_falls_back_to_answer_text():
+    text = 'Sonuç: [{"id": "a", "stance": "destekliyor", "score": 2}, ' \
+           '{"id": "b", "stance": "?", "answer": "Desteklemiyorum."}, {"id": "zzz", "stance": "karşı"}]'
+    parsed = parse_population_response(text, ["a", "b"])
+
+    assert parsed["a"][:2] == (SUPPORT, 1.0)
+    assert parsed["b"][0] == AGAINST and parsed["b"][1] == -1.0
+    assert "zzz" not in parsed
+
+
+def test_report_aggregates_per_archetype():
+    results = PopulationResults(["x", "y"], 5)
+    results.archetype_idx[:] = [0, 0, 0, 1, 1]
+    results.stance[:] = [SUPPORT, SUPPORT, AGAINST, UNDECIDED, STANCE_UNKNOWN]
+    results.score[:] = [1.0, 0.5, -1.0, 0.0, float("nan")]
+
+    report = results.report()
+    x, y = report["archetypes"]["x"], report["archetypes"]["y"]
+    assert x["distribution"] == {"karşı": pytest.approx(1 / 3, abs=1e-4), "kararsız": 0.0,
+                                 "destekliyor": pytest.approx(2 / 3, abs=1e-4)}
+    assert x["mean_score"] == pytest.approx(1 / 6, abs=1e-4)
+    assert y["n"] == 2 and y["unparsed"] == 1
+    assert y["distribution"]["kararsız"] == 1.0
+    assert report["overall"]["unparsed"] == 1
+    assert math.isclose(sum(report["overall"]["distribution"].values()), 1.0, abs_tol=1e-3)
+
+
+def test_run_population_shares_key_store(monkeypatch):
+    class FakeStore:
+        closed = False
+
+        def load(self, key_ids):
+            return {}
+
+        def close(self):
+            self.closed = True
+
+    class StopRun(Exception):
+        pass
+
+    seen = {}
+
+    class FakeEngine:
+        def __init__(self, client, **kwargs):
+            seen["store"] = client.key_pool.store
+
+        async def run(self, *args, **kwargs):
+            raise StopRun()
+
+    store = FakeStore()
+    monkeypatch.setattr(population, "open_key_store", lambda: store)
+    monkeypatch.setattr(population, "PopulationEngine", FakeEngine)
+
+    args = argparse.Namespace(rpm=None, batch_size=8, concurrency=None, archetypes=["x"], per_archetype=1,
+                              question="?", seed=None, output=None)
+    with pytest.raises(StopRun):
+        asyncio.run(population.run_population(args))
+
+    assert seen["store"] is store
+    assert store.closed
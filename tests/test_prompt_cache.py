@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+import gc
+
+from src.utils import prompt_cache
+from src.utils.prompt_cache import (BACKOFF_RETENTION_SECONDS, CREATE_BACKOFF_SECONDS, SWEEP_INTERVAL_SECONDS,
+                                    GeminiPromptCache)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ScriptedCache(GeminiPromptCache):
+    """_create yerine sırayla verilen sonuçlar (ad veya hata)"""
+
+    def __init__(self, results, **kwargs):
+        super().__init__(**kwargs)
+        self.results = list(results)
+        self.created = 0
+
+    async def _create(self, handle, key, model, session):
+        self.created += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result, prompt_cache.time.monotonic() + self.ttl_seconds
+
+
+def fields(cache, handle, key="k"):
+    return asyncio.run(cache.payload_fields(handle, key, "m", session=None))
+
+
+def test_expired_entry_is_dropped_and_recreated(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(prompt_cache.time, "monotonic", clock)
+    cache = ScriptedCache(["cached/1", "cached/2"], ttl_seconds=100)
+    handle = cache.register("elif", "persona")
+
+    assert fields(cache, handle) == {"cachedContent": "cached/1"}
+    clock.now += 101
+    assert fields(cache, handle) == {"cachedContent": "cached/2"}
+    assert cache.created == 2
+    assert cache.status()["entries"] == 1
+
+
+def test_sweep_drops_expired_entries_and_stale_backoff(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(prompt_cache.time, "monotonic", clock)
+    cache = ScriptedCache(["cached/a", RuntimeError("429"), "cached/c"], ttl_seconds=100)
+    handle = cache.register("elif", "persona")
+
+    fields(cache, handle, key="a")
+    assert "systemInstruction" in fields(cache, handle, key="b")
+    assert cache.status()["entries"] == 1 and len(cache._backoff) == 1
+
+    # Ne "a" ne de "b" tekrar istenmez; başka bir key'in isteği eski kayıtları temizler
+    clock.now += max(100, CREATE_BACKOFF_SECONDS + BACKOFF_RETENTION_SECONDS, SWEEP_INTERVAL_SECONDS) + 1
+    fields(cache, handle, key="c")
+    assert set(cache._entries) == {("c", "m", handle.digest)}
+    assert cache._backoff == {}
+    # Her asyncio.run yeni bir loop açar; kapanan loop'ların oluşturma kayıtları tutulmaz
+    gc.collect()
+    assert len(cache._creating) == 0
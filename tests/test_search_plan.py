@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import pytest
+
+from src.agents.search_plan import build_search_plan, classify_question
+
+
+@pytest.mark.parametrize("question", [
+    "Bu zamanda gençler ne düşünüyor?",
+    "Oyun sektörü nasıl?",
+    "Boyun ağrısı için ne önerirsin?",
+    "Kurban bayramı nasıl geçti?",
+])
+def test_short_roots_do_not_match_inside_other_words(question):
+    categories = classify_question(question)
+    assert "ekonomi" not in categories
+    assert "siyaset" not in categories
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Asgari ücrete gelen zam yeterli mi?", "ekonomi"),
+    ("Doların kuru neden yükseliyor?", "ekonomi"),
+    ("Kiralardaki artış hakkında ne düşünüyorsun?", "ekonomi"),
+    ("Seçimlerde oyunu kime vereceksin?", "siyaset"),
+    ("İYİ Parti'nin oyları artar mı?", "siyaset"),
+    ("Üniversitelerdeki eğitim kalitesi nasıl?", "sosyal"),
+])
+def test_inflected_keywords_still_match(question, expected):
+    assert classify_question(question)[0] == expected
+
+
+def test_unclassified_question_searches_every_category():
+    plan = build_search_plan("oyun sektörü", classify_question("Oyun sektörü nasıl?"), include_general=False)
+    labels = [step["label"] for step in plan]
+    assert labels == ["ANA ARAMA", "EKONOMİ ARAMASI", "SİYASET ARAMASI", "SOSYAL ARAMASI"]
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from concurrent.futures import Future
+
+from src.utils.cancellation import get_chat_tasks
+from src.utils.session_memory import KEEP_RECENT_MESSAGES, SessionMemory
+
+
+def message(i, size=100):
+    return {"role": "user", "content": f"{i}:" + "x" * size}
+
+
+def test_session_budget_spills_oldest_messages(tmp_path):
+    memory = SessionMemory(spill_dir=str(tmp_path), session_budget_bytes=2000)
+    for i in range(20):
+        memory.append_message("s", message(i))
+
+    state = memory.get("s")
+    assert KEEP_RECENT_MESSAGES <= len(state.messages) < 20
+    assert state.spilled_messages == 20 - len(state.messages)
+    older = memory.older_messages("s")
+    assert [m["content"].split(":")[0] for m in older + state.messages] == [str(i) for i in range(20)]
+
+
+def test_recent_messages_stay_even_over_budget(tmp_path):
+    memory = SessionMemory(spill_dir=str(tmp_path), session_budget_bytes=1)
+    for i in range(10):
+        memory.append_message("s", message(i, 1000))
+    assert len(memory.get("s").messages) == KEEP_RECENT_MESSAGES
+
+
+def test_without_spill_dir_overflow_is_dropped():
+    memory = SessionMemory(spill_dir="", session_budget_bytes=1)
+    for i in range(10):
+        memory.append_message("s", message(i))
+    state = memory.get("s")
+    assert len(state.messages) == KEEP_RECENT_MESSAGES and state.spilled_messages == 0
+    assert memory.status()["dropped_messages"] == 10 - KEEP_RECENT_MESSAGES
+
+
+def test_idle_session_is_evicted_and_rebuilt(tmp_path):
+    memory = SessionMemory(spill_dir=str(tmp_path), idle_seconds=0)
+    for i in range(6):
+        memory.append_message("s", message(i))
+    memory.history("s", "elif").append({"user": "soru", "assistant": "cevap"})
+
+    memory.maybe_sweep(force=True)
+    assert len(memory) == 0
+
+    state = memory.get("s")
+    assert len(state.messages) == KEEP_RECENT_MESSAGES
+    assert state.spilled_messages == 6 - KEEP_RECENT_MESSAGES
+    assert state.history("elif") == [{"user": "soru", "assistant": "cevap"}]
+    assert len(memory.older_messages("s")) == 6 - KEEP_RECENT_MESSAGES
+
+
+def test_running_chat_is_not_evicted(tmp_path):
+    memory = SessionMemory(spill_dir=str(tmp_path), idle_seconds=0)
+    memory.append_message("busy", message(0))
+    memory.append_message("idle", message(1))
+
+    chat = Future()
+    get_chat_tasks().start("busy", chat)
+    try:
+        memory.maybe_sweep(force=True)
+    finally:
+        get_chat_tasks().cancel("busy")
+
+    assert len(memory) == 1
+    assert memory.status()["evicted"] == 1
+
+
+def test_clear_removes_memory_and_disk(tmp_path):
+    memory = SessionMemory(spill_dir=str(tmp_path), session_budget_bytes=1, idle_seconds=0)
+    for i in range(10):
+        memory.append_message("s", message(i))
+    memory.maybe_sweep(force=True)
+    memory.clear("s")
+
+    assert list(tmp_path.iterdir()) == []
+    state = memory.get("s")
+    assert state.messages == [] and state.spilled_messages == 0
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+from src.utils.singleflight import SingleFlight, normalize_query
+
+
+def test_normalize_query_ignores_case_punctuation_and_order():
+    assert normalize_query("İstanbul, ekonomi!") == normalize_query("ekonomi istanbul")
+    assert normalize_query("IRAK") == "ırak"
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "sonuç"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["sonuç"] * 5
+    assert len(calls) == 1
+    assert flight.stats["leader"] == 1 and flight.stats["shared"] == 4
+
+
+def test_key_is_forgotten_after_completion():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await flight.do("k", work)
+        second = await flight.do("k", work)
+        return first, second, flight.inflight_count()
+
+    assert asyncio.run(main()) == (1, 2, 0)
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("hata")
+
+    async def main():
+        return await asyncio.gather(flight.do("k", work), flight.do("k", work), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_cancelling_one_waiter_keeps_shared_work_running():
+    flight = SingleFlight("test")
+
+    async def main():
+        async def work():
+            await asyncio.sleep(0.05)
+            return "sonuç"
+
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "sonuç"
+    assert flight.stats["abandoned"] == 0
+
+
+def test_work_is_cancelled_when_last_waiter_leaves():
+    flight = SingleFlight("test")
+    cancelled = []
+
+    async def main():
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        waiters = [asyncio.ensure_future(flight.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert cancelled == [True]
+    assert flight.stats["abandoned"] == 1